@@ -1,39 +1,62 @@
-<<<<<<< HEAD
-# app/__init__.py
-from flask import Flask
-from config import Config
-from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate 
-from flask_login import LoginManager
-from flask_wtf.csrf import CSRFProtect
-
-app = Flask(__name__)
-app.config.from_object(Config)
-db = SQLAlchemy(app)
-csrf = CSRFProtect(app)
-migrate = Migrate(app, db)
-
-login = LoginManager(app)
-login.login_view = 'login'
-
-from app import routes, models
-=======
 # app/__init__.py
 from flask import Flask
+import sqlalchemy as sa
 from config import Config
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate 
 from flask_login import LoginManager
 from flask_wtf.csrf import CSRFProtect
 
-app = Flask(__name__)
-app.config.from_object(Config)
-db = SQLAlchemy(app)
-csrf = CSRFProtect(app)
-migrate = Migrate(app, db)
+db = SQLAlchemy()
+csrf = CSRFProtect()
+migrate = Migrate()
 
-login = LoginManager(app)
-login.login_view = 'login'
+login = LoginManager()
+login.login_view = 'auth.login'
 
-from app import routes, models
->>>>>>> upstream/main
+
+@sa.event.listens_for(sa.Engine, 'connect')
+def _chaves_estrangeiras(dbapi_connection, connection_record):
+    # O SQLite só aplica ON DELETE CASCADE com foreign_keys ligado, por conexão
+    if type(dbapi_connection).__module__.startswith('sqlite3'):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
+
+def create_app(config_class=Config):
+    """
+    Cria uma aplicação com a configuração dada.
+
+    Os blueprints (e, com eles, models e rotas) só são importados aqui,
+    então importar o pacote não carrega a aplicação inteira.
+    """
+    app = Flask(__name__)
+    app.config.from_object(config_class)
+
+    db.init_app(app)
+    csrf.init_app(app)
+    migrate.init_app(app, db)
+    login.init_app(app)
+
+    from app import assets, custos, eventos, identity, templating
+    # Registra as tarefas do worker (app.jobs)
+    from app import tarefas
+    assets.init_app(app)
+    eventos.init_app(app)
+    identity.init_app(app)
+    templating.init_app(app)
+
+    from app.main import bp as main_bp
+    app.register_blueprint(main_bp)
+
+    from app.auth import bp as auth_bp
+    app.register_blueprint(auth_bp)
+
+    from app.api import bp as api_bp
+    app.register_blueprint(api_bp, url_prefix='/api')
+
+    from app.cli import bp as cli_bp
+    app.register_blueprint(cli_bp)
+
+    return app
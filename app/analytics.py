@@ -0,0 +1,375 @@
+# app/analytics.py
+"""
+Snapshot colunar dos registros UV usado pela página de estatísticas.
+
+Cada coluna de UVRegister é guardada em um arquivo binário próprio
+(append-only) e lida com memory-map pelo NumPy. A atualização é
+incremental: só as linhas com id maior que o último id do snapshot são
+buscadas no banco, usando a chave primária. Como um id menor pode ficar
+visível depois de um maior (uma transação que fez commit depois da outra,
+no PostgreSQL), os JANELA_IDS ids abaixo do último são conferidos de novo
+a cada atualização. Leituras marcadas como
+suspeitas (flag != 0) ficam fora do snapshot. Um snapshot novo (ou
+reconstruído) começa pelos blocos arquivados (app.arquivo), com id 0; as
+linhas arquivadas depois continuam nele, copiadas quando ainda estavam em
+UVRegister.
+
+Cada organização tem o seu snapshot, em uma subpasta, então o tamanho dos
+dados de uma não pesa nas estatísticas das outras. Quem grava é a tarefa
+periódica atualizar-snapshots (app.tarefas), no worker; as requisições só
+leem os arquivos.
+
+NumPy é opcional. Sem ele `disponivel()` retorna False e as rotas
+continuam usando as consultas SQL.
+"""
+import json
+import os
+import threading
+from datetime import timedelta, timezone
+
+import sqlalchemy as sa
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+from app import arquivo
+from app.models import Organization, UVChunk, UVRegister
+
+COLUNAS = {
+    'id'         : 'int64',
+    'arduino_id' : 'int64',
+    'location_id': 'int64',
+    'timestamp'  : 'int64',    # segundos desde a época, UTC
+    'frequency'  : 'float64',
+}
+
+TAMANHO_LOTE = 50_000
+
+# Ids abaixo do último copiado conferidos de novo a cada atualização
+JANELA_IDS = 20_000
+
+
+def disponivel():
+    return np is not None
+
+
+def _epoch(data):
+    if data.tzinfo is None:
+        data = data.replace(tzinfo=timezone.utc)
+    return int(data.timestamp())
+
+
+class ColumnarSnapshot:
+    """
+    Snapshot colunar dos registros de uma organização em `pasta`.
+
+    meta.json guarda quantas linhas existem, o último id copiado, a geração,
+    que muda a cada reconstrução, e se os blocos arquivados já foram copiados.
+    """
+
+    def __init__(self, pasta, org_id):
+        self.pasta = pasta
+        self.org_id = org_id
+        self._lock = threading.Lock()
+        self._cache = None
+        self._cache_chave = None
+
+    def _caminho(self, nome):
+        return os.path.join(self.pasta, nome)
+
+    def _ler_meta(self):
+        try:
+            with open(self._caminho('meta.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'linhas': 0, 'ultimo_id': 0, 'geracao': 0, 'arquivados': False}
+
+    def _gravar_meta(self, meta):
+        temp = self._caminho('meta.json.tmp')
+        with open(temp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(temp, self._caminho('meta.json'))
+
+    def _truncar(self):
+        geracao = self._ler_meta().get('geracao', 0) + 1
+        for nome in COLUNAS:
+            caminho = self._caminho(f'{nome}.bin')
+            if os.path.exists(caminho):
+                os.remove(caminho)
+        self._gravar_meta({'linhas': 0, 'ultimo_id': 0, 'geracao': geracao, 'arquivados': False})
+
+    def _anexar(self, colunas):
+        for nome, tipo in COLUNAS.items():
+            with open(self._caminho(f'{nome}.bin'), 'ab') as f:
+                np.asarray(colunas[nome], dtype=tipo).tofile(f)
+
+    def _copiar_arquivados(self, session):
+        # Só num snapshot vazio: se parou no meio, os arquivos têm linhas que o meta não conta
+        self._truncar()
+        linhas = 0
+        for bloco, datas, frequencias in arquivo.blocos(session, UVChunk.org_id == self.org_id):
+            self._anexar({
+                'id'         : [0] * len(datas),
+                'arduino_id' : [bloco.arduino_id] * len(datas),
+                'location_id': [bloco.location_id] * len(datas),
+                'timestamp'  : [_epoch(data) for data in datas],
+                'frequency'  : frequencias,
+            })
+            linhas += len(datas)
+        meta = self._ler_meta()
+        meta.update(linhas=linhas, arquivados=True)
+        self._gravar_meta(meta)
+        return linhas
+
+    def _linha(self, registros):
+        return {
+            'id'         : [r.id for r in registros],
+            'arduino_id' : [r.arduino_id for r in registros],
+            'location_id': [r.location_id for r in registros],
+            'timestamp'  : [_epoch(r.register_date) for r in registros],
+            'frequency'  : [r.frequency for r in registros],
+        }
+
+    def _consulta(self):
+        return sa.select(
+            UVRegister.id,
+            UVRegister.arduino_id,
+            UVRegister.location_id,
+            UVRegister.register_date,
+            UVRegister.frequency,
+            UVRegister.flag,
+        ).where(UVRegister.org_id == self.org_id)
+
+    def _copiar_atrasados(self, session, meta):
+        """
+        Copia as linhas válidas com id em (ultimo_id - JANELA_IDS, ultimo_id]
+        que ainda não estão no snapshot: as de transações que fizeram commit
+        depois de uma com id maior já copiada. Retorna o meta novo.
+        """
+        piso = max(meta['ultimo_id'] - JANELA_IDS, 0)
+        # Só os ids, pelo índice (org_id, id)
+        ids = session.scalars(
+            sa.select(UVRegister.id)
+            .where(UVRegister.org_id == self.org_id,
+                   UVRegister.id > piso, UVRegister.id <= meta['ultimo_id'])
+        ).all()
+        if not ids:
+            return meta
+        copiados = np.fromfile(self._caminho('id.bin'), dtype=COLUNAS['id'], count=meta['linhas']) \
+            if meta['linhas'] else np.empty(0, dtype=COLUNAS['id'])
+        faltando = np.setdiff1d(np.asarray(ids, dtype=COLUNAS['id']), copiados[copiados > piso])
+        if not len(faltando):
+            return meta
+
+        # As suspeitas também aparecem aqui (ficam fora do snapshot); são poucas
+        atrasados = [
+            linha
+            for i in range(0, len(faltando), 500)
+            for linha in session.execute(
+                self._consulta().where(UVRegister.id.in_(faltando[i:i + 500].tolist()),
+                                       UVRegister.flag == 0)
+            )
+        ]
+        if not atrasados:
+            return meta
+        self._anexar(self._linha(atrasados))
+        meta = dict(meta, linhas=meta['linhas'] + len(atrasados))
+        self._gravar_meta(meta)
+        return meta
+
+    def invalidar(self):
+        """
+        Descarta o snapshot; o próximo `refresh` copia tudo de novo do banco.
+        Usado quando registros antigos somem (ver app.exclusao), o que a
+        cópia incremental por id não percebe.
+        """
+        if not os.path.isdir(self.pasta):
+            return
+        with self._lock, open(self._caminho('.lock'), 'w') as trava:
+            if fcntl is not None:
+                fcntl.flock(trava, fcntl.LOCK_EX)
+            self._truncar()
+
+    def refresh(self, session):
+        """
+        Copia para o snapshot os registros novos. Retorna quantas linhas entraram.
+        """
+        os.makedirs(self.pasta, exist_ok=True)
+        with self._lock, open(self._caminho('.lock'), 'w') as trava:
+            if fcntl is not None:
+                fcntl.flock(trava, fcntl.LOCK_EX)
+
+            meta = self._ler_meta()
+            maior_id = session.scalar(
+                sa.select(sa.func.max(UVRegister.id)).where(UVRegister.org_id == self.org_id)
+            ) or 0
+            if maior_id < meta['ultimo_id']:
+                # O banco foi recriado ou teve registros apagados: reconstrói
+                self._truncar()
+                meta = self._ler_meta()
+
+            novos = 0
+            # Snapshots anteriores a esta chave já têm as linhas arquivadas depois
+            if not meta.get('arquivados', True):
+                novos = self._copiar_arquivados(session)
+                meta = self._ler_meta()
+
+            linhas_antes = meta['linhas']
+            meta = self._copiar_atrasados(session, meta)
+            novos += meta['linhas'] - linhas_antes
+
+            while True:
+                linhas = session.execute(
+                    self._consulta()
+                    .where(UVRegister.id > meta['ultimo_id'])
+                    .order_by(UVRegister.id)
+                    .limit(TAMANHO_LOTE)
+                ).all()
+                if not linhas:
+                    break
+
+                ultimo_id = linhas[-1].id
+                linhas = [l for l in linhas if not l.flag]
+                self._anexar(self._linha(linhas))
+
+                meta = dict(meta, linhas=meta['linhas'] + len(linhas), ultimo_id=ultimo_id)
+                self._gravar_meta(meta)
+                novos += len(linhas)
+
+            return novos
+
+    def pronto(self):
+        """
+        Se o snapshot já foi montado (e não está sendo reconstruído).
+        """
+        return os.path.exists(self._caminho('meta.json')) and self._ler_meta().get('arquivados', True)
+
+    def colunas(self):
+        """
+        Retorna as colunas do snapshot como arrays mapeados em memória, ou
+        None se os arquivos mudaram durante a leitura (uma reconstrução).
+        """
+        meta = self._ler_meta()
+        # Depois de uma reconstrução os arquivos são outros, mesmo com o mesmo número de linhas
+        chave = (meta.get('geracao', 0), meta['linhas'])
+        if chave == self._cache_chave:
+            return self._cache
+
+        if meta['linhas'] == 0:
+            dados = {nome: np.empty(0, dtype=tipo) for nome, tipo in COLUNAS.items()}
+        else:
+            try:
+                dados = {
+                    nome: np.memmap(self._caminho(f'{nome}.bin'), dtype=tipo,
+                                    mode='r', shape=(meta['linhas'],))
+                    for nome, tipo in COLUNAS.items()
+                }
+            except (OSError, ValueError):
+                return None
+        self._cache, self._cache_chave = dados, chave
+        return dados
+
+
+def resumo(colunas):
+    """
+    Total de registros, média e percentis p50/p95/p99 da frequência.
+    """
+    frequencia = colunas['frequency']
+    if len(frequencia) == 0:
+        return {'count': 0, 'average': 0, 'p50': None, 'p95': None, 'p99': None}
+
+    p50, p95, p99 = np.percentile(frequencia, [50, 95, 99])
+    return {
+        'count'  : int(len(frequencia)),
+        'average': float(frequencia.mean()),
+        'p50'    : float(p50),
+        'p95'    : float(p95),
+        'p99'    : float(p99),
+    }
+
+
+def _agrupar(chaves, valores):
+    """
+    Agrupa `valores` por `chaves`: retorna (chaves únicas, contagem, média).
+    """
+    unicas, inverso = np.unique(chaves, return_inverse=True)
+    contagem = np.bincount(inverso, minlength=len(unicas))
+    soma = np.bincount(inverso, weights=valores, minlength=len(unicas))
+    return unicas, contagem, soma / np.maximum(contagem, 1)
+
+
+def top_locations(colunas, limite=5):
+    """
+    Locais com mais registros: lista de (location_id, registros, média).
+    """
+    if len(colunas['location_id']) == 0:
+        return []
+
+    ids, contagem, media = _agrupar(colunas['location_id'], colunas['frequency'])
+    ordem = np.argsort(-contagem, kind='stable')[:limite]
+    return [(int(ids[i]), int(contagem[i]), float(media[i])) for i in ordem]
+
+
+def media_por_dia(colunas, inicio, dias):
+    """
+    Média de frequência em cada um dos `dias` dias a partir de `inicio` (com
+    fuso), nos mesmos intervalos de app.series.serie. Dias sem registros
+    ficam com None.
+    """
+    numero = (colunas['timestamp'] - int(inicio.timestamp())) // 86400
+    dentro = (numero >= 0) & (numero < dias)
+    contagem = np.bincount(numero[dentro], minlength=dias)
+    soma = np.bincount(numero[dentro], weights=colunas['frequency'][dentro], minlength=dias)
+
+    labels = [(inicio + timedelta(days=n)).date().isoformat() for n in range(dias)]
+    return labels, [float(soma[n] / contagem[n]) if contagem[n] else None for n in range(dias)]
+
+
+def histograma_horario(colunas):
+    """
+    Quantidade de registros e média de frequência por hora do dia (UTC).
+    """
+    horas = (colunas['timestamp'] // 3600) % 24
+    contagem = np.bincount(horas, minlength=24)
+    soma = np.bincount(horas, weights=colunas['frequency'], minlength=24)
+    media = soma / np.maximum(contagem, 1)
+    return [int(c) for c in contagem], [float(m) for m in media]
+
+
+_snapshots = {}
+
+
+def get_snapshot(pasta, org_id):
+    """
+    Retorna o snapshot da organização dentro de `pasta`, compartilhado entre
+    as requisições do processo.
+    """
+    chave = (pasta, org_id)
+    if chave not in _snapshots:
+        _snapshots[chave] = ColumnarSnapshot(os.path.join(pasta, f'org_{org_id}'), org_id)
+    return _snapshots[chave]
+
+
+def atualizar(session, pasta):
+    """
+    Atualiza o snapshot de cada organização. Retorna quantas linhas entraram.
+    """
+    return sum(
+        get_snapshot(pasta, org_id).refresh(session)
+        for org_id in session.scalars(sa.select(Organization.id).order_by(Organization.id)).all()
+    )
+
+
+def invalidar(pasta, org_id):
+    """
+    Descarta o snapshot da organização, também o dos outros processos (que
+    leem o meta.json a cada consulta).
+    """
+    get_snapshot(pasta, org_id).invalidar()
@@ -0,0 +1,198 @@
+# app/anomaly.py
+"""
+Validação em fluxo das leituras: detecta sensores travados ou com picos.
+
+Cada arduino tem um pequeno estado em memória (EWMA da frequência e da
+variância, último valor e quantas vezes ele se repetiu). As leituras
+suspeitas recebem bits em UVRegister.flag e ficam fora das estatísticas.
+
+O estado fica em memória, por aplicação. Quando um arduino ainda não tem
+estado, ele é iniciado com a média e a variância persistidas em ArduinoStats;
+quando é excluído (app.exclusao), o estado dele é descartado com `esquecer`.
+`avaliar` trabalha sobre uma cópia do estado, que só passa a valer quando
+a transação do envio faz commit (ver `aplicar_no_commit`): um envio que
+falha não deixa rastro no detector.
+"""
+import math
+import threading
+from collections import OrderedDict
+from datetime import timezone
+
+import sqlalchemy as sa
+import sqlalchemy.orm as so
+
+# Bits de UVRegister.flag
+FORA_FAIXA = 1   # frequência negativa ou acima do máximo físico
+PICO       = 2   # z-score contra a EWMA acima do limite
+TRAVADO    = 4   # mesmo valor repetido por muitas leituras seguidas
+
+# Leituras antes de começar a marcar picos
+AQUECIMENTO = 30
+
+# Picos seguidos a partir dos quais o novo nível passa a ser o normal
+# (ex.: o céu abriu); senão uma mudança de patamar ficaria marcada para sempre
+MUDANCA_NIVEL = 5
+
+
+class EstadoSensor:
+    __slots__ = ('n', 'media', 'variancia', 'ultimo', 'repeticoes', 'picos')
+
+    def __init__(self, n=0, media=0.0, variancia=0.0):
+        self.n = n
+        self.media = media
+        self.variancia = variancia
+        self.ultimo = None
+        self.repeticoes = 0
+        self.picos = 0
+
+    def copia(self):
+        estado = EstadoSensor(self.n, self.media, self.variancia)
+        estado.ultimo = self.ultimo
+        estado.repeticoes = self.repeticoes
+        estado.picos = self.picos
+        return estado
+
+
+class Detector:
+    """
+    Guarda o estado de até `max_arduinos` arduinos (os menos recentes saem).
+    """
+
+    def __init__(self, alpha=0.05, limite_z=4.0, limite_travado=20,
+                 maximo=20.0, max_arduinos=100_000):
+        self.alpha = alpha
+        self.limite_z = limite_z
+        self.limite_travado = limite_travado
+        self.maximo = maximo
+        self.max_arduinos = max_arduinos
+        self._estados = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _guardar(self, arduino_id, estado):
+        self._estados[arduino_id] = estado
+        self._estados.move_to_end(arduino_id)
+        if len(self._estados) > self.max_arduinos:
+            self._estados.popitem(last=False)
+
+    def _avaliar(self, estado, frequencia):
+        # NaN passaria pelas comparações e estragaria a média para sempre
+        if not math.isfinite(frequencia) or frequencia < 0 or frequencia > self.maximo:
+            return FORA_FAIXA
+
+        flag = 0
+        if estado.n >= AQUECIMENTO and estado.variancia > 0:
+            z = abs(frequencia - estado.media) / math.sqrt(estado.variancia)
+            if z > self.limite_z:
+                estado.picos += 1
+                if estado.picos >= MUDANCA_NIVEL:
+                    estado.media = frequencia
+                    estado.picos = 0
+                else:
+                    flag |= PICO
+            else:
+                estado.picos = 0
+
+        # Zero repetido é normal (noite); só valores positivos contam como travado
+        if frequencia > 0 and frequencia == estado.ultimo:
+            estado.repeticoes += 1
+            if estado.repeticoes >= self.limite_travado:
+                flag |= TRAVADO
+        else:
+            estado.repeticoes = 1
+        estado.ultimo = frequencia
+
+        if not flag & PICO:
+            # Picos não entram na média para não contaminar o estado
+            if estado.n == 0:
+                estado.media = frequencia
+            delta = frequencia - estado.media
+            estado.media += self.alpha * delta
+            estado.variancia = (1 - self.alpha) * (estado.variancia + self.alpha * delta * delta)
+            estado.n += 1
+        return flag
+
+    def avaliar(self, arduino_id, leituras, semente=None):
+        """
+        Preenche leitura['flag'] de cada leitura, em ordem de coleta.
+
+        `semente` é chamada só se o arduino ainda não tem estado e deve
+        retornar (n, média, variância). O estado guardado não muda: retorna
+        o estado novo, para `aplicar` depois que as leituras forem gravadas.
+        """
+        inicial = None
+        if semente is not None and arduino_id not in self._estados:
+            # Consulta ao banco fora da trava
+            inicial = semente()
+
+        with self._lock:
+            atual = self._estados.get(arduino_id)
+        if atual is not None:
+            estado = atual.copia()
+        else:
+            estado = EstadoSensor(*inicial) if inicial else EstadoSensor()
+        for leitura in sorted(leituras, key=lambda l: _chave(l['register_date'])):
+            leitura['flag'] = self._avaliar(estado, leitura['frequency'])
+        return estado
+
+    def aplicar(self, arduino_id, estado):
+        with self._lock:
+            self._guardar(arduino_id, estado)
+
+    def esquecer(self, arduino_id):
+        with self._lock:
+            self._estados.pop(arduino_id, None)
+
+
+def aplicar_no_commit(session, detector, arduino_id, estado):
+    """
+    Guarda `estado` no detector quando a transação de `session` fizer
+    commit; se ela for desfeita, o estado anterior continua valendo.
+    """
+    session.info.setdefault('anomaly', []).append((detector, arduino_id, estado))
+
+
+@sa.event.listens_for(so.Session, 'after_commit')
+def _aplicar_pendentes(session):
+    for detector, arduino_id, estado in session.info.pop('anomaly', ()):
+        detector.aplicar(arduino_id, estado)
+
+
+@sa.event.listens_for(so.Session, 'after_transaction_end')
+def _descartar_pendentes(session, transacao):
+    # Rollback (ou sessão fechada sem commit): os estados novos não valem
+    if transacao.parent is None:
+        session.info.pop('anomaly', None)
+
+
+def _chave(data):
+    if data.tzinfo is None:
+        data = data.replace(tzinfo=timezone.utc)
+    return data
+
+
+_lock_detectores = threading.Lock()
+
+
+def get_detector(app):
+    """
+    Detector da aplicação, criado no primeiro uso.
+    """
+    with _lock_detectores:
+        if 'anomaly' not in app.extensions:
+            config = app.config
+            app.extensions['anomaly'] = Detector(
+                config['ANOMALY_ALPHA'],
+                config['ANOMALY_Z'],
+                config['ANOMALY_FLATLINE'],
+                config['UV_MAX_FREQUENCY'],
+            )
+        return app.extensions['anomaly']
+
+
+def esquecer(app, arduino_id):
+    """
+    Descarta o estado do arduino (excluído) no detector da aplicação, se houver.
+    """
+    detector = app.extensions.get('anomaly')
+    if detector is not None:
+        detector.esquecer(arduino_id)
@@ -0,0 +1,285 @@
+# app/api/routes.py
+from app          import db, csrf, ingest, binario, eventos, provisioning, exclusao, busca, feed, jobs, arquivo, series
+from app.api      import bp
+from app.device_auth import dispositivo_required
+from flask        import request, jsonify, g, Response
+from app.models   import UVRegister, Arduino, User, Job
+from flask_login import current_user, login_required
+from datetime     import datetime, timedelta
+import sqlalchemy as sa
+
+
+def _receber_registros(arduino_id):
+    try:
+        # JSON ou o formato binário compacto (app.binario)
+        if request.mimetype == binario.TIPO:
+            leituras = binario.ler(request.get_data(), arduino_id)
+        else:
+            leituras = ingest.ler_leituras(request.get_json(silent=True))
+        registros = ingest.registrar_leituras(db.session, arduino_id, leituras)
+        db.session.commit()
+    except ingest.LeituraInvalida as e:
+        db.session.rollback()
+        return jsonify({'erro': str(e)}), 400
+
+    eventos.publicar_registros(db.session, registros)
+    return jsonify({'inseridos': len(registros)}), 201
+
+@bp.route('/arduino/<int:arduino_id>/registros', methods=['POST'])
+@login_required
+def registros(arduino_id):
+    arduino = db.session.scalar(
+        sa.select(Arduino)
+        .where(Arduino.id == arduino_id, Arduino.user_id == current_user.id,
+               Arduino.deleted_at.is_(None))
+    )
+    if not arduino:
+        return jsonify({'erro': 'Arduino não encontrado'}), 404
+    return _receber_registros(arduino.id)
+
+@bp.route('/arduino/<int:arduino_id>/leituras')
+@login_required
+def leituras_arduino(arduino_id):
+    # Leituras válidas de [inicio, fim), arquivadas ou não (ver app.arquivo)
+    arduino = db.session.scalar(
+        sa.select(Arduino)
+        .where(Arduino.id == arduino_id, Arduino.user_id == current_user.id,
+               Arduino.deleted_at.is_(None))
+    )
+    if not arduino:
+        return jsonify({'erro': 'Arduino não encontrado'}), 404
+    try:
+        inicio = series.para_utc(datetime.fromisoformat(request.args['inicio']))
+        fim = series.para_utc(datetime.fromisoformat(request.args['fim']))
+    except (KeyError, ValueError):
+        return jsonify({'erro': 'Informe inicio e fim em ISO 8601'}), 400
+    if not timedelta(0) < fim - inicio <= timedelta(days=arquivo.MAX_DIAS_CONSULTA):
+        return jsonify({'erro': f'O intervalo deve ter até {arquivo.MAX_DIAS_CONSULTA} dias'}), 400
+
+    return jsonify({
+        'leituras': [
+            {
+                'register_date': leitura.register_date.isoformat(),
+                'location_id'  : leitura.location_id,
+                'frequency'    : leitura.frequency,
+            }
+            for leitura in arquivo.leituras(db.session, arduino.id, inicio, fim)
+        ],
+    })
+
+@bp.route('/dispositivo/registros', methods=['POST'])
+@csrf.exempt
+@dispositivo_required
+def dispositivo_registros():
+    # Envio direto do arduino, autenticado pela chave de API
+    return _receber_registros(g.arduino_id)
+
+@bp.route('/posts')
+@login_required
+def posts():
+    # Feed dos usuários da organização, ou de um com ?usuario=. A próxima
+    # página vem com ?depois=<proximo>
+    user_id = None
+    if request.args.get('usuario'):
+        user_id = db.session.scalar(
+            sa.select(User.id).where(User.username == request.args['usuario'],
+                                     User.org_id == current_user.org_id)
+        )
+        if user_id is None:
+            return jsonify({'erro': 'Usuário não encontrado'}), 404
+    try:
+        pagina, proximo = feed.pagina(
+            db.session,
+            user_id,
+            request.args.get('depois'),
+            request.args.get('limite', 20, type=int),
+            current_user.org_id,
+        )
+    except feed.CursorInvalido as e:
+        return jsonify({'erro': str(e)}), 400
+    return jsonify({
+        'posts'  : [feed.como_dict(post) for post in pagina],
+        'proximo': proximo,
+    })
+
+@bp.route('/busca')
+@login_required
+def buscar():
+    # ?q=texto&tipo=componentes|locais|posts&page=&per_page=. Sem tipo,
+    # devolve a primeira página de cada um
+    texto = request.args.get('q', '')
+    tipo = request.args.get('tipo')
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    try:
+        if tipo is None:
+            return jsonify({
+                tipo: busca.buscar(db.session, tipo, texto, 1, per_page, current_user.org_id)[0]
+                for tipo in busca.TIPOS
+            })
+        itens, tem_mais = busca.buscar(db.session, tipo, texto, page, per_page,
+                                       current_user.org_id)
+    except busca.BuscaInvalida as e:
+        return jsonify({'erro': str(e)}), 400
+    return jsonify({'resultados': itens, 'page': page, 'tem_mais': tem_mais})
+
+@bp.route('/jobs/<int:job_id>')
+@login_required
+def estado_job(job_id):
+    # Estado e progresso de uma tarefa em segundo plano do usuário
+    job = db.session.scalar(
+        sa.select(Job).where(Job.id == job_id, Job.user_id == current_user.id)
+    )
+    if job is None:
+        return jsonify({'erro': 'Tarefa não encontrada'}), 404
+    return jsonify(jobs.como_dict(job))
+
+@bp.route('/arduino/<int:arduino_id>/exclusao')
+@login_required
+def exclusao_arduino(arduino_id):
+    # Progresso da exclusão em segundo plano iniciada por main.excluir_arduino
+    job = exclusao.job(db.session, arduino_id, current_user.id)
+    if job is not None:
+        return jsonify({
+            'arduino_id': arduino_id,
+            'job'       : job.id,
+            'total'     : job.total,
+            'apagados'  : job.done,
+            'concluida' : job.state == jobs.CONCLUIDO,
+            'erro'      : job.error if job.state == jobs.FALHOU else None,
+        })
+
+    # Marcado antes da fila de tarefas (ver flask uv excluir-pendentes)
+    marcado = db.session.scalar(
+        sa.select(Arduino.id)
+        .where(Arduino.id == arduino_id, Arduino.user_id == current_user.id,
+               Arduino.deleted_at.is_not(None))
+    )
+    if marcado is None:
+        return jsonify({'erro': 'Exclusão não encontrada'}), 404
+    return jsonify({
+        'arduino_id': arduino_id,
+        'job'       : None,
+        'total'     : None,
+        'apagados'  : 0,
+        'concluida' : False,
+        'erro'      : None,
+    })
+
+@bp.route('/arduinos/provisionar', methods=['POST'])
+@login_required
+def provisionar_arduinos():
+    # {"quantidade": N, "modelo_arduino_id": id} ou
+    # {"quantidade": N, "componentes": [{"component_id": ..., "quantity": ...}]}
+    dados = request.get_json(silent=True)
+    try:
+        if not isinstance(dados, dict):
+            raise provisioning.ProvisionamentoInvalido('Envie um objeto JSON')
+        if dados.get('modelo_arduino_id') is not None:
+            componentes = provisioning.componentes_do_modelo(
+                db.session, current_user.id, dados['modelo_arduino_id']
+            )
+        else:
+            componentes = provisioning.ler_componentes(dados.get('componentes'))
+        criados = provisioning.provisionar(
+            db.session, current_user.id, dados.get('quantidade'), componentes
+        )
+        db.session.commit()
+    except provisioning.ProvisionamentoInvalido as e:
+        db.session.rollback()
+        return jsonify({'erro': str(e)}), 400
+
+    return jsonify({
+        'arduinos': [{'id': arduino_id, 'chave': token} for arduino_id, token in criados],
+    }), 201
+
+@bp.route('/registros/novos')
+@login_required
+def registros_novos():
+    # Leituras válidas com id maior que `depois`. No modo ASGI (app.asgi),
+    # com `espera`, a resposta vazia aguarda um novo envio antes de sair
+    depois = request.args.get('depois', 0, type=int)
+    registros = db.session.execute(
+        sa.select(
+            UVRegister.id,
+            UVRegister.arduino_id,
+            UVRegister.location_id,
+            UVRegister.register_date,
+            UVRegister.frequency,
+        )
+        .where(UVRegister.org_id == current_user.org_id,
+               UVRegister.id > depois, UVRegister.flag == 0)
+        .order_by(UVRegister.id)
+        .limit(500)
+    ).all()
+
+    resposta = jsonify({
+        'registros': [
+            {
+                'id'           : r.id,
+                'arduino_id'   : r.arduino_id,
+                'location_id'  : r.location_id,
+                'register_date': r.register_date.isoformat(),
+                'frequency'    : r.frequency,
+            }
+            for r in registros
+        ],
+        'ultimo_id': registros[-1].id if registros else depois,
+    })
+    resposta.headers['X-Registros'] = str(len(registros))
+    return resposta
+
+@bp.route('/registros/stream')
+@login_required
+def registros_stream():
+    # Server-Sent Events com as leituras válidas de cada novo envio e o total
+    # delas por dia. O cliente informa o último id que já tem (Last-Event-ID
+    # ou `depois`) e recebe primeiro o que perdeu
+    depois = request.headers.get('Last-Event-ID', type=int) \
+        or request.args.get('depois', type=int)
+
+    # Só os envios da organização do usuário. No modo ASGI a assinatura
+    # fica com o app.asgi, que a consome no event loop
+    canal = eventos.do_app().canal(current_user.org_id)
+    asgi = request.environ.get('app.asgi')
+    assinatura = asgi(canal) if asgi else canal.assinar()
+
+    inicio = b'retry: 3000\n\n'
+    if depois is not None:
+        perdidos = db.session.execute(
+            sa.select(
+                UVRegister.id,
+                UVRegister.arduino_id,
+                UVRegister.location_id,
+                UVRegister.register_date,
+                UVRegister.frequency,
+                UVRegister.flag,
+            )
+            .where(UVRegister.org_id == current_user.org_id,
+                   UVRegister.id > depois, UVRegister.flag == 0)
+            .order_by(UVRegister.id)
+            .limit(500)
+        ).all()
+        inicio += eventos.mensagem_registros(db.session, perdidos) or b''
+    db.session.close()
+
+    cabecalhos = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    if asgi:
+        # app.asgi envia o início e continua a transmissão no event loop
+        cabecalhos['X-Stream'] = 'registros'
+        return Response(inicio, mimetype='text/event-stream', headers=cabecalhos)
+
+    def transmitir():
+        try:
+            yield inicio
+            while not assinatura.encerrada:
+                if not assinatura.esperar(15):
+                    yield eventos.PING
+                    continue
+                mensagens = assinatura.retirar()
+                if mensagens:
+                    yield b''.join(mensagens)
+        finally:
+            assinatura.cancelar()
+
+    return Response(transmitir(), mimetype='text/event-stream', headers=cabecalhos)
@@ -0,0 +1,403 @@
+# app/arquivo.py
+"""
+Arquivo comprimido dos registros antigos.
+
+Uma linha de UVRegister ocupa mais de 50 bytes no SQLite, contando a
+linha e os índices. `arquivar` move os registros válidos com mais de
+ARCHIVE_AFTER_DAYS dias para UVChunk: um bloco por arduino, localização
+e dia (UTC), com as datas e as frequências comprimidas como no Gorilla:
+
+- datas: a primeira inteira e, depois, a diferença entre intervalos
+  seguidos (delta-of-delta). Para um arduino que coleta em intervalo
+  fixo ela é quase sempre 0 e ocupa 1 bit;
+- frequências: XOR com a anterior. Um valor repetido ocupa 1 bit e um
+  parecido, só os bits do meio que mudaram.
+
+As datas do bloco usam a maior unidade que não perde precisão (segundo,
+milissegundo ou microssegundo). Nada se perde: as leituras voltam como
+entraram, só sem o id.
+
+`leituras` consulta um intervalo de um arduino e só descomprime os
+blocos dos dias do intervalo (pela chave primária de UVChunk), junto com
+os registros que ainda estão em UVRegister. Quem percorre todos os
+registros (a exportação, app.health.reconstruir e o snapshot de
+app.analytics) lê os blocos com `blocos`; a reconstrução dos rollups
+(app.backfill), no mesmo SELECT dos registros. As estatísticas SQL dos
+dias arquivados vêm dos rollups, sem descomprimir nada.
+
+Os registros marcados como suspeitos (flag) ficam em UVRegister. No
+SQLite, o espaço liberado só volta ao disco com VACUUM.
+"""
+import struct
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from datetime import datetime, time, timedelta, timezone
+
+import sqlalchemy as sa
+
+from app import rollups
+from app.models import Organization, RollupBackfill, UVChunk, UVRegister
+
+VERSAO = 1
+
+# Maior intervalo de uma consulta em `leituras` pela API
+MAX_DIAS_CONSULTA = 31
+
+Leitura = namedtuple('Leitura', 'register_date location_id frequency')
+
+# Versão, unidade das datas (índice de _UNIDADES) e quantidade de leituras
+_CABECALHO = struct.Struct('<BBI')
+# Microssegundos por unidade, da maior para a menor
+_UNIDADES = (1_000_000, 1000, 1)
+_EPOCA = datetime(1970, 1, 1)
+_64_BITS = (1 << 64) - 1
+
+# Delta-of-delta diferente de 0: (prefixo, bits do prefixo, bits do valor)
+_FAIXAS = (
+    (0b10, 2, 7),
+    (0b110, 3, 9),
+    (0b1110, 4, 12),
+    (0b11110, 5, 32),
+    (0b11111, 5, 64),
+)
+
+
+class BlocoInvalido(ValueError):
+    pass
+
+
+class ArquivamentoAdiado(RuntimeError):
+    pass
+
+
+class _Bits:
+    """
+    Sequência de bits, do mais significativo para o menos.
+    """
+
+    def __init__(self):
+        self.saida = bytearray()
+        self._valor = 0
+        self._bits = 0
+
+    def escrever(self, valor, bits):
+        self._valor = (self._valor << bits) | valor
+        self._bits += bits
+        # Passa os bytes completos para a saída; o acumulador fica pequeno
+        if self._bits >= 64:
+            sobra = self._bits & 7
+            self.saida += (self._valor >> sobra).to_bytes(self._bits >> 3, 'big')
+            self._valor &= (1 << sobra) - 1
+            self._bits = sobra
+
+    def bytes(self):
+        # Completa o último byte com zeros
+        sobra = -self._bits & 7
+        return bytes(self.saida) + (self._valor << sobra).to_bytes((self._bits + sobra) >> 3, 'big')
+
+
+class _LeitorBits:
+
+    def __init__(self, dados, inicio):
+        self.dados = dados
+        self.pos = inicio * 8
+        self.fim = len(dados) * 8
+
+    def ler(self, bits):
+        fim = self.pos + bits
+        if fim > self.fim:
+            raise BlocoInvalido('Bloco truncado')
+        i, j = self.pos >> 3, (fim + 7) >> 3
+        valor = int.from_bytes(self.dados[i:j], 'big') >> ((j << 3) - fim)
+        self.pos = fim
+        return valor & ((1 << bits) - 1)
+
+
+def comprimir(datas, frequencias):
+    """
+    Comprime as leituras de um bloco. `datas` são microssegundos desde a
+    época (UTC), em ordem; `frequencias`, as frequências na mesma ordem.
+    """
+    unidade = next(u for u in _UNIDADES if all(data % u == 0 for data in datas))
+    datas = [data // unidade for data in datas]
+    valores = array('Q', array('d', frequencias).tobytes())
+
+    saida = _Bits()
+    saida.escrever(datas[0] & _64_BITS, 64)
+    saida.escrever(valores[0], 64)
+    anterior, intervalo = datas[0], 0
+    # Sem janela de bits ainda: a primeira diferença sempre abre uma
+    valor_anterior, zeros_esq, zeros_dir = valores[0], 64, 64
+
+    for i in range(1, len(datas)):
+        novo = datas[i] - anterior
+        dod = novo - intervalo
+        anterior, intervalo = datas[i], novo
+        if dod == 0:
+            saida.escrever(0, 1)
+        else:
+            for prefixo, bits_prefixo, bits in _FAIXAS:
+                metade = 1 << (bits - 1)
+                if -metade < dod <= metade:
+                    saida.escrever(prefixo, bits_prefixo)
+                    saida.escrever(dod + metade - 1, bits)
+                    break
+
+        xor = valores[i] ^ valor_anterior
+        valor_anterior = valores[i]
+        if xor == 0:
+            saida.escrever(0, 1)
+            continue
+        esq = min(64 - xor.bit_length(), 31)
+        dir = (xor & -xor).bit_length() - 1
+        if esq >= zeros_esq and dir >= zeros_dir:
+            # Cabe na janela da diferença anterior
+            saida.escrever(0b10, 2)
+            saida.escrever(xor >> zeros_dir, 64 - zeros_esq - zeros_dir)
+        else:
+            zeros_esq, zeros_dir = esq, dir
+            tamanho = 64 - esq - dir
+            saida.escrever(0b11, 2)
+            saida.escrever(esq, 5)
+            saida.escrever(tamanho - 1, 6)
+            saida.escrever(xor >> dir, tamanho)
+
+    return _CABECALHO.pack(VERSAO, _UNIDADES.index(unidade), len(datas)) + saida.bytes()
+
+
+def descomprimir(dados):
+    """
+    Datas (microssegundos desde a época, UTC) e frequências de um bloco.
+    """
+    if len(dados) < _CABECALHO.size:
+        raise BlocoInvalido('Bloco truncado')
+    versao, unidade, quantidade = _CABECALHO.unpack_from(dados)
+    if versao != VERSAO or unidade >= len(_UNIDADES) or quantidade == 0:
+        raise BlocoInvalido(f'Bloco inválido (versão {versao}, unidade {unidade})')
+
+    ler = _LeitorBits(dados, _CABECALHO.size).ler
+    data = ler(64)
+    if data >> 63:
+        data -= 1 << 64
+    valor = ler(64)
+    datas = [data]
+    valores = array('Q', [valor])
+    intervalo = zeros_esq = zeros_dir = 0
+
+    for _ in range(quantidade - 1):
+        if ler(1):
+            faixa = 0
+            while faixa < len(_FAIXAS) - 1 and ler(1):
+                faixa += 1
+            bits = _FAIXAS[faixa][2]
+            intervalo += ler(bits) - (1 << (bits - 1)) + 1
+        data += intervalo
+        datas.append(data)
+
+        if ler(1):
+            if ler(1):
+                zeros_esq = ler(5)
+                tamanho = ler(6) + 1
+                zeros_dir = 64 - zeros_esq - tamanho
+                if zeros_dir < 0:
+                    raise BlocoInvalido('Bloco com diferença inválida')
+            valor ^= ler(64 - zeros_esq - zeros_dir) << zeros_dir
+        valores.append(valor)
+
+    escala = _UNIDADES[unidade]
+    return [data * escala for data in datas], array('d', valores.tobytes()).tolist()
+
+
+def _utc(data):
+    # As datas ficam em UTC sem fuso; o SQLite as devolve assim
+    if data.tzinfo is not None:
+        data = data.astimezone(timezone.utc).replace(tzinfo=None)
+    return data
+
+
+def _micros(data):
+    return (_utc(data) - _EPOCA) // timedelta(microseconds=1)
+
+
+def _data(micros):
+    return _EPOCA + timedelta(microseconds=micros)
+
+
+def _meia_noite(dia):
+    return datetime.combine(dia, time())
+
+
+def _arquivar_dia(session, org_id, dia):
+    """
+    Passa os registros válidos de um dia de uma organização para os
+    blocos. Não faz commit. Retorna quantos foram arquivados.
+    """
+    filtros = (
+        UVRegister.org_id == org_id,
+        UVRegister.register_date >= _meia_noite(dia),
+        UVRegister.register_date < _meia_noite(dia + timedelta(days=1)),
+        UVRegister.flag == 0,
+    )
+    linhas = session.execute(
+        sa.select(
+            UVRegister.id,
+            UVRegister.arduino_id,
+            UVRegister.location_id,
+            UVRegister.register_date,
+            UVRegister.frequency,
+        )
+        .where(*filtros)
+        .order_by(UVRegister.arduino_id, UVRegister.location_id,
+                  UVRegister.register_date, UVRegister.id)
+    ).all()
+    if not linhas:
+        return 0
+
+    grupos = {}
+    for linha in linhas:
+        grupos.setdefault((linha.arduino_id, linha.location_id), []).append(
+            (_micros(linha.register_date), linha.frequency)
+        )
+
+    for (arduino_id, location_id), leituras in grupos.items():
+        bloco = session.get(UVChunk, (arduino_id, dia, location_id))
+        if bloco is None:
+            bloco = UVChunk(arduino_id=arduino_id, day=dia, location_id=location_id, org_id=org_id)
+            session.add(bloco)
+        else:
+            # Registros que chegaram atrasados para um dia já arquivado
+            leituras = sorted([*zip(*descomprimir(bloco.data)), *leituras], key=lambda leitura: leitura[0])
+        datas, frequencias = zip(*leituras)
+        bloco.data = comprimir(datas, frequencias)
+        bloco.start = _data(datas[0])
+        bloco.end = _data(datas[-1])
+        bloco.count = len(datas)
+
+    # Os ids crescem: o que chegou depois da leitura acima fica para a próxima vez
+    session.execute(
+        sa.delete(UVRegister).where(*filtros, UVRegister.id <= max(linha.id for linha in linhas)),
+        execution_options={'synchronize_session': False},
+    )
+    return len(linhas)
+
+
+def arquivar(session, dias, ao_avancar=None):
+    """
+    Arquiva os registros válidos de antes dos últimos `dias` dias (UTC),
+    um dia de uma organização por transação.
+
+    `ao_avancar(arquivados, total)` é chamada a cada dia arquivado.
+    Retorna quantos registros foram arquivados.
+    """
+    # Os registros arquivados perdem o id, com o qual app.backfill refaz os
+    # rollups dos que chegaram durante a reconstrução
+    pendente = session.scalar(
+        sa.select(RollupBackfill.start).where(RollupBackfill.finished_at.is_(None)).limit(1)
+    )
+    if pendente is not None:
+        raise ArquivamentoAdiado('Há uma reconstrução dos rollups pendente; '
+                                 'conclua-a com flask uv reconstruir-rollups --retomar')
+
+    limite = _meia_noite(datetime.now(timezone.utc).date() - timedelta(days=dias))
+    total = session.scalar(
+        sa.select(sa.func.count())
+        .select_from(UVRegister)
+        .where(UVRegister.register_date < limite, UVRegister.flag == 0)
+    )
+    arquivados = 0
+    for org_id in session.scalars(sa.select(Organization.id)).all():
+        dia = None
+        while True:
+            # Próximo dia com registros, pelo índice (org_id, register_date)
+            consulta = sa.select(sa.func.min(UVRegister.register_date)).where(
+                UVRegister.org_id == org_id,
+                UVRegister.register_date < limite,
+                UVRegister.flag == 0,
+            )
+            if dia is not None:
+                consulta = consulta.where(
+                    UVRegister.register_date >= _meia_noite(dia + timedelta(days=1))
+                )
+            primeira = session.scalar(consulta)
+            if primeira is None:
+                break
+            dia = rollups._dia(primeira)
+            arquivados += _arquivar_dia(session, org_id, dia)
+            session.commit()
+            if ao_avancar is not None:
+                ao_avancar(arquivados, max(total, arquivados))
+    session.rollback()
+    return arquivados
+
+
+def leituras(session, arduino_id, inicio, fim):
+    """
+    Leituras válidas de um arduino em [inicio, fim), arquivadas ou não, em
+    ordem de data. Só os blocos dos dias do intervalo são descomprimidos.
+
+    Retorna uma lista de Leitura(register_date, location_id, frequency),
+    com as datas em UTC sem fuso.
+    """
+    inicio, fim = _utc(inicio), _utc(fim)
+    resultado = []
+
+    blocos = session.execute(
+        sa.select(UVChunk.location_id, UVChunk.data)
+        .where(UVChunk.arduino_id == arduino_id,
+               UVChunk.day >= inicio.date(), UVChunk.day <= fim.date(),
+               UVChunk.start < fim, UVChunk.end >= inicio)
+    ).all()
+    de, ate = _micros(inicio), _micros(fim)
+    for bloco in blocos:
+        datas, frequencias = descomprimir(bloco.data)
+        # As datas de um bloco estão em ordem
+        i, j = bisect_left(datas, de), bisect_left(datas, ate)
+        resultado.extend(
+            Leitura(_data(data), bloco.location_id, frequencia)
+            for data, frequencia in zip(datas[i:j], frequencias[i:j])
+        )
+
+    registros = session.execute(
+        sa.select(UVRegister.register_date, UVRegister.location_id, UVRegister.frequency)
+        .where(UVRegister.arduino_id == arduino_id,
+               UVRegister.register_date >= inicio,
+               UVRegister.register_date < fim,
+               UVRegister.flag == 0)
+    ).all()
+    resultado.extend(
+        Leitura(_utc(registro.register_date), registro.location_id, registro.frequency)
+        for registro in registros
+    )
+
+    resultado.sort(key=lambda leitura: leitura.register_date)
+    return resultado
+
+
+def blocos(session, *filtros, colunas=(), tamanho_lote=500):
+    """
+    Percorre os blocos que passam em `filtros`, em ordem da chave primária
+    (arduino, dia, localização), `tamanho_lote` blocos por consulta.
+
+    Gera (bloco, datas, frequencias): `bloco` tem arduino_id, day,
+    location_id e as `colunas` pedidas; as datas estão em UTC sem fuso e em
+    ordem.
+    """
+    chave = (UVChunk.arduino_id, UVChunk.day, UVChunk.location_id)
+    ultimo = None
+    while True:
+        consulta = (
+            sa.select(*chave, UVChunk.data, *colunas)
+            .where(*filtros)
+            .order_by(*chave)
+            .limit(tamanho_lote)
+        )
+        if ultimo is not None:
+            consulta = consulta.where(sa.tuple_(*chave) > sa.tuple_(*ultimo))
+        linhas = session.execute(consulta).all()
+        if not linhas:
+            return
+        for linha in linhas:
+            datas, frequencias = descomprimir(linha.data)
+            yield linha, [_data(data) for data in datas], frequencias
+        ultimo = (linhas[-1].arduino_id, linhas[-1].day, linhas[-1].location_id)
@@ -0,0 +1,260 @@
+# app/asgi.py
+"""
+Modo de execução ASGI:
+
+    uvicorn app.asgi:application --workers 4
+
+O servidor ASGI mantém as conexões no event loop: conexões ociosas e
+corpos de requisição ainda chegando (arduinos em redes lentas) não ocupam
+threads. Só o processamento da requisição pela aplicação Flask roda em um
+pool de ASGI_THREADS threads, com o corpo já lido e a resposta montada
+inteira antes de ser enviada.
+
+Em /api/registros/novos com `espera=<segundos>`, uma resposta sem
+registros não é enviada na hora: a conexão espera no event loop até um
+novo envio ser gravado neste processo (app.eventos) ou o tempo acabar,
+e então a consulta é refeita.
+
+/api/registros/stream (Server-Sent Events) é transmitido no event loop:
+a view Flask só autentica, assina o canal da organização do usuário e
+monta o início do stream; depois disso cada cliente conectado custa uma
+assinatura de app.eventos, não uma thread.
+"""
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from app import create_app, eventos
+
+flask_app = create_app()
+
+ROTA_NOVOS = '/api/registros/novos'
+ROTA_STREAM = '/api/registros/stream'
+
+# Intervalo dos comentários que mantêm o stream vivo e detectam desconexões
+PING_SEGUNDOS = 15
+
+_executor = ThreadPoolExecutor(
+    max_workers=flask_app.config['ASGI_THREADS'],
+    thread_name_prefix='asgi',
+)
+
+
+class Desconectado(Exception):
+    pass
+
+
+async def _ler_corpo(receive):
+    limite = flask_app.config.get('MAX_CONTENT_LENGTH')
+    partes = []
+    total = 0
+    while True:
+        mensagem = await receive()
+        if mensagem['type'] == 'http.disconnect':
+            raise Desconectado()
+        parte = mensagem.get('body', b'')
+        total += len(parte)
+        if limite is not None and total > limite:
+            return None
+        partes.append(parte)
+        if not mensagem.get('more_body'):
+            return b''.join(partes)
+
+
+def _environ(scope, corpo):
+    servidor = scope.get('server') or ('localhost', 80)
+    cliente = scope.get('client') or ('', 0)
+    raiz = scope.get('root_path', '')
+    caminho = scope['path']
+    if raiz and caminho.startswith(raiz):
+        caminho = caminho[len(raiz):]
+
+    environ = {
+        'REQUEST_METHOD'   : scope['method'],
+        # WSGI representa o caminho como bytes em latin-1
+        'SCRIPT_NAME'      : raiz.encode('utf-8').decode('latin-1'),
+        'PATH_INFO'        : caminho.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING'     : scope['query_string'].decode('latin-1'),
+        'SERVER_NAME'      : servidor[0],
+        'SERVER_PORT'      : str(servidor[1]),
+        'SERVER_PROTOCOL'  : 'HTTP/' + scope.get('http_version', '1.1'),
+        'REMOTE_ADDR'      : cliente[0],
+        'CONTENT_LENGTH'   : str(len(corpo)),
+        'wsgi.version'     : (1, 0),
+        'wsgi.url_scheme'  : scope.get('scheme', 'http'),
+        'wsgi.input'       : io.BytesIO(corpo),
+        'wsgi.errors'      : sys.stderr,
+        'wsgi.multithread' : True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once'    : False,
+    }
+    for nome, valor in scope['headers']:
+        nome = nome.decode('latin-1')
+        valor = valor.decode('latin-1')
+        if nome == 'content-length':
+            continue
+        if nome == 'content-type':
+            environ['CONTENT_TYPE'] = valor
+            continue
+        chave = 'HTTP_' + nome.upper().replace('-', '_')
+        environ[chave] = environ[chave] + ',' + valor if chave in environ else valor
+    return environ
+
+
+def _executar(environ):
+    """
+    Roda a aplicação Flask (em uma thread do pool). Retorna (status, cabeçalhos, corpo).
+    """
+    inicio = {}
+
+    def start_response(status, cabecalhos, exc_info=None):
+        inicio['status'] = int(status.split(' ', 1)[0])
+        inicio['cabecalhos'] = cabecalhos
+
+    resultado = flask_app(environ, start_response)
+    try:
+        corpo = b''.join(resultado)
+    finally:
+        if hasattr(resultado, 'close'):
+            resultado.close()
+    return inicio['status'], inicio['cabecalhos'], corpo
+
+
+async def _responder(send, status, cabecalhos, corpo):
+    await send({
+        'type'   : 'http.response.start',
+        'status' : status,
+        'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in cabecalhos],
+    })
+    await send({'type': 'http.response.body', 'body': corpo})
+
+
+async def _aguardar(receive, versao, espera):
+    """
+    Espera um novo envio de registros. Retorna False se o cliente desconectou.
+    """
+    aviso = asyncio.ensure_future(
+        eventos.do_app(flask_app).novos_registros.esperar(versao, espera))
+    saida = asyncio.ensure_future(receive())
+    try:
+        await asyncio.wait({aviso, saida}, return_when=asyncio.FIRST_COMPLETED)
+        return not saida.done()
+    finally:
+        aviso.cancel()
+        saida.cancel()
+
+
+def _espera(scope):
+    if scope['path'] != ROTA_NOVOS or scope['method'] != 'GET':
+        return 0
+    valores = parse_qs(scope['query_string'].decode('latin-1')).get('espera')
+    try:
+        espera = float(valores[0]) if valores else 0
+    except ValueError:
+        return 0
+    return max(0, min(espera, flask_app.config['LONGPOLL_MAX_SECONDS']))
+
+
+async def _transmitir(scope, receive, send, corpo):
+    loop = asyncio.get_running_loop()
+    assinaturas = []
+
+    def assinar(canal):
+        # Chamada pela view (na thread do pool) antes de consultar o que o
+        # cliente perdeu; o cliente ignora registros repetidos pelo id
+        assinatura = canal.assinar_async(loop)
+        assinaturas.append(assinatura)
+        return assinatura
+
+    saida = None
+    try:
+        environ = _environ(scope, corpo)
+        environ['app.asgi'] = assinar
+        status, cabecalhos, inicio = await loop.run_in_executor(_executor, _executar, environ)
+        if dict(cabecalhos).get('X-Stream') != 'registros' or not assinaturas:
+            # Não autenticado ou erro: resposta normal
+            await _responder(send, status, cabecalhos, inicio)
+            return
+
+        await send({
+            'type'   : 'http.response.start',
+            'status' : status,
+            'headers': [(k.lower().encode('latin-1'), v.encode('latin-1'))
+                        for k, v in cabecalhos if k != 'X-Stream'],
+        })
+        await send({'type': 'http.response.body', 'body': inicio, 'more_body': True})
+
+        assinatura = assinaturas[0]
+        saida = asyncio.ensure_future(receive())
+        while not assinatura.encerrada:
+            espera = asyncio.ensure_future(assinatura.esperar(PING_SEGUNDOS))
+            await asyncio.wait({espera, saida}, return_when=asyncio.FIRST_COMPLETED)
+            if saida.done():
+                espera.cancel()
+                return
+            if not espera.result():
+                await send({'type': 'http.response.body', 'body': eventos.PING, 'more_body': True})
+                continue
+            mensagens = assinatura.retirar()
+            if mensagens:
+                await send({'type': 'http.response.body', 'body': b''.join(mensagens), 'more_body': True})
+
+        # Cliente lento: encerra; o navegador reconecta com Last-Event-ID
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        for assinatura in assinaturas:
+            assinatura.cancelar()
+        if saida is not None:
+            saida.cancel()
+
+
+async def _http(scope, receive, send):
+    try:
+        corpo = await _ler_corpo(receive)
+    except Desconectado:
+        return
+    if corpo is None:
+        await _responder(send, 413, [('Content-Type', 'text/plain')], b'Payload Too Large')
+        return
+
+    if scope['path'] == ROTA_STREAM and scope['method'] == 'GET':
+        await _transmitir(scope, receive, send, corpo)
+        return
+
+    loop = asyncio.get_running_loop()
+    espera = _espera(scope)
+    # Lida antes da consulta para não perder um envio gravado no meio dela
+    versao = eventos.do_app(flask_app).novos_registros.versao
+    status, cabecalhos, resposta = await loop.run_in_executor(
+        _executor, _executar, _environ(scope, corpo))
+
+    vazia = dict(cabecalhos).get('X-Registros') == '0'
+    if espera and vazia:
+        if not await _aguardar(receive, versao, espera):
+            return
+        status, cabecalhos, resposta = await loop.run_in_executor(
+            _executor, _executar, _environ(scope, corpo))
+
+    await _responder(send, status, cabecalhos, resposta)
+
+
+async def _lifespan(receive, send):
+    while True:
+        mensagem = await receive()
+        if mensagem['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif mensagem['type'] == 'lifespan.shutdown':
+            _executor.shutdown(wait=True)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http':
+        await _http(scope, receive, send)
+    elif scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+    else:
+        raise ValueError(f'Tipo de conexão não suportado: {scope["type"]}')
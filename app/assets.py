@@ -0,0 +1,154 @@
+# app/assets.py
+"""
+Pipeline dos arquivos estáticos.
+
+`flask uv assets` junta e minifica os CSS de cada pacote (BUNDLES), copia
+os outros arquivos de app/static e grava tudo em app/static/dist com o
+hash do conteúdo no nome, mais as versões .gz (e .br, se o pacote brotli
+estiver instalado). O manifest.json liga o nome lógico ao nome com hash.
+
+Com o manifest presente, url_for('static', filename=...) aponta para o
+arquivo com hash, servido por /static/dist/ com cache de um ano
+(immutable) e na compressão aceita pelo navegador. Sem o manifest (em
+desenvolvimento) tudo continua vindo dos arquivos originais.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+
+from flask import Blueprint, current_app, request, send_from_directory, url_for
+
+# Pacotes de CSS: nome lógico -> arquivos de app/static, na ordem
+BUNDLES = {
+    'base.css': ['css/custom.css'],
+}
+
+# Só texto vale a pena comprimir; imagens já vêm comprimidas
+COMPRIMIVEIS = {'.css', '.js', '.json', '.map', '.svg', '.txt'}
+
+PASTA_DIST = 'dist'
+MANIFEST = 'manifest.json'
+UM_ANO = 365 * 24 * 3600
+
+bp = Blueprint('assets', __name__)
+
+
+def minificar_css(css):
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    # ':' fica de fora: em seletores o espaço antes dele tem significado
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    return css.replace(';}', '}').strip()
+
+
+def _nome_com_hash(nome, conteudo):
+    raiz, extensao = os.path.splitext(nome)
+    return f'{raiz}.{hashlib.sha256(conteudo).hexdigest()[:12]}{extensao}'
+
+
+def _gravar(destino, conteudo):
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    with open(destino, 'wb') as arquivo:
+        arquivo.write(conteudo)
+    if os.path.splitext(destino)[1] not in COMPRIMIVEIS:
+        return
+    # mtime=0 deixa o .gz igual entre builds do mesmo conteúdo
+    with open(destino + '.gz', 'wb') as arquivo:
+        arquivo.write(gzip.compress(conteudo, compresslevel=9, mtime=0))
+    try:
+        import brotli
+    except ImportError:
+        return
+    with open(destino + '.br', 'wb') as arquivo:
+        arquivo.write(brotli.compress(conteudo, quality=11))
+
+
+def construir(pasta_static):
+    """
+    Gera app/static/dist e o manifesto. Retorna o manifesto.
+    """
+    dist = os.path.join(pasta_static, PASTA_DIST)
+    shutil.rmtree(dist, ignore_errors=True)
+    manifesto = {}
+
+    for nome, fontes in BUNDLES.items():
+        partes = []
+        for fonte in fontes:
+            with open(os.path.join(pasta_static, fonte), encoding='utf-8') as arquivo:
+                partes.append(minificar_css(arquivo.read()))
+        conteudo = '\n'.join(partes).encode('utf-8')
+        final = _nome_com_hash(nome, conteudo)
+        _gravar(os.path.join(dist, final), conteudo)
+        manifesto[nome] = f'{PASTA_DIST}/{final}'
+
+    for raiz, pastas, arquivos in os.walk(pasta_static):
+        if os.path.abspath(raiz) == os.path.abspath(pasta_static):
+            pastas[:] = [p for p in pastas if p != PASTA_DIST]
+        for arquivo in arquivos:
+            caminho = os.path.join(raiz, arquivo)
+            nome = os.path.relpath(caminho, pasta_static).replace(os.sep, '/')
+            with open(caminho, 'rb') as origem:
+                conteudo = origem.read()
+            final = _nome_com_hash(nome, conteudo)
+            _gravar(os.path.join(dist, final), conteudo)
+            manifesto[nome] = f'{PASTA_DIST}/{final}'
+
+    with open(os.path.join(dist, MANIFEST), 'w', encoding='utf-8') as arquivo:
+        json.dump(manifesto, arquivo, indent=2, sort_keys=True)
+    return manifesto
+
+
+def carregar_manifesto(pasta_static):
+    try:
+        with open(os.path.join(pasta_static, PASTA_DIST, MANIFEST), encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except FileNotFoundError:
+        return {}
+
+
+def asset_urls(nome):
+    """
+    URLs de um pacote: o arquivo com hash, ou as fontes sem o build.
+    """
+    if nome in current_app.extensions['assets']:
+        return [url_for('static', filename=nome)]
+    return [url_for('static', filename=fonte) for fonte in BUNDLES[nome]]
+
+
+@bp.app_url_defaults
+def _com_hash(endpoint, values):
+    if endpoint == 'static':
+        final = current_app.extensions['assets'].get(values.get('filename'))
+        if final is not None:
+            values['filename'] = final
+
+
+@bp.route('/static/dist/<path:filename>')
+def servir(filename):
+    pasta = os.path.join(current_app.static_folder, PASTA_DIST)
+    tipo = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    aceitas = request.headers.get('Accept-Encoding', '')
+
+    codificacao = None
+    for sufixo, nome in (('.br', 'br'), ('.gz', 'gzip')):
+        if nome in aceitas and os.path.isfile(os.path.join(pasta, filename + sufixo)):
+            codificacao = nome
+            filename += sufixo
+            break
+
+    resposta = send_from_directory(pasta, filename, mimetype=tipo, max_age=UM_ANO)
+    resposta.headers['Cache-Control'] = f'public, max-age={UM_ANO}, immutable'
+    resposta.headers['Vary'] = 'Accept-Encoding'
+    if codificacao:
+        resposta.headers['Content-Encoding'] = codificacao
+    return resposta
+
+
+def init_app(app):
+    app.extensions['assets'] = carregar_manifesto(app.static_folder)
+    app.jinja_env.globals['asset_urls'] = asset_urls
+    app.register_blueprint(bp)
@@ -0,0 +1,6 @@
+# app/auth/__init__.py
+from flask import Blueprint
+
+bp = Blueprint('auth', __name__)
+
+from app.auth import routes
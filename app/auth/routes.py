@@ -0,0 +1,67 @@
+# app/auth/routes.py
+from urllib.parse import urlsplit
+from app          import db, passwords
+from app.auth     import bp
+from flask        import render_template, flash, redirect, url_for, request, current_app
+from app.forms    import LoginForm, RegistrationForm
+from app.models   import User, Organization
+from flask_login import login_user, logout_user, current_user
+import sqlalchemy as sa
+
+
+@bp.route('/login', methods=('GET', 'POST'))
+def login():
+    if current_user.is_authenticated:
+        return redirect(url_for('main.index'))
+
+    form = LoginForm()
+    if form.validate_on_submit():
+        user = db.session.scalar(
+            sa.select(User).where(User.username == form.username.data))
+        try:
+            valid = user is not None and passwords.verificar(user, form.password.data)
+        except passwords.LoginSobrecarregado:
+            flash('Muitos acessos no momento. Tente novamente em alguns segundos.')
+            return redirect(url_for('auth.login'))
+        if not valid:
+            flash('Invalid username or password')
+            return redirect(url_for('auth.login'))
+
+        login_user(user, remember=form.remember_me.data)
+        # Grava a senha refeita com os parâmetros atuais, se for o caso
+        db.session.commit()
+
+        next_page = request.args.get('next')
+        if next_page:
+            parsed_url = urlsplit(next_page)
+            if parsed_url.netloc == '' and parsed_url.path.startswith('/'):
+                return redirect(next_page) 
+        return redirect(url_for('main.index'))
+    return render_template('login.html', title='Sign In', form=form)
+
+@bp.route('/logout')
+def logout():
+    logout_user()
+    return redirect(url_for('main.index'))
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if current_user.is_authenticated:
+        return redirect(url_for('main.index'))
+    form = RegistrationForm()
+    if form.validate_on_submit():
+        slug = form.organization.data or current_app.config['DEFAULT_ORG_SLUG']
+        org_id = db.session.scalar(sa.select(Organization.id).where(Organization.slug == slug))
+        if org_id is None:
+            # Sem código e DEFAULT_ORG_SLUG sem organização (só a migration cria a padrão)
+            current_app.logger.warning('DEFAULT_ORG_SLUG %r não existe', slug)
+            form.organization.errors.append('Informe o código da sua organização.')
+            return render_template('register.html', title='Register', form=form,
+                                   exibir_botao_voltar=True)
+        user = User(username = form.username.data, email = form.email.data, org_id = org_id)
+        user.set_password(form.password.data)
+        db.session.add(user)
+        db.session.commit()
+        flash('Congratulations, you are now a registered user!')
+        return redirect(url_for('auth.login'))
+    return render_template('register.html', title='Register', form=form, exibir_botao_voltar=True)
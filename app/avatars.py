@@ -0,0 +1,49 @@
+# app/avatars.py
+"""
+Avatares gerados no servidor.
+
+User.avatar aponta para /avatar/<md5 do email>, e o identicon (um padrão
+5x5 espelhado, como o d=identicon do Gravatar) é desenhado aqui em SVG a
+partir do hash. Não há chamada a serviços externos, o que funciona também
+em instalações sem internet. Como a imagem depende só da URL, ela é
+servida com cache de um ano e os SVGs mais pedidos ficam em memória.
+"""
+import re
+from functools import lru_cache
+
+TAMANHO_MAXIMO = 512
+
+DIGEST = re.compile(r'^[0-9a-f]{32}$')
+
+
+def digest_valido(digest):
+    return bool(DIGEST.match(digest))
+
+
+@lru_cache(maxsize=2048)
+def identicon(digest, tamanho):
+    """
+    SVG do identicon de `digest` (md5 em hexadecimal) com `tamanho` pixels.
+    """
+    tamanho = max(1, min(int(tamanho), TAMANHO_MAXIMO))
+    matiz = int(digest[-7:], 16) % 360
+    cor = f'hsl({matiz}, 55%, 50%)'
+
+    # 15 bits decidem as 3 primeiras colunas; as 2 últimas são o espelho
+    celulas = []
+    for i in range(15):
+        if int(digest[i], 16) % 2 == 0:
+            coluna, linha = divmod(i, 5)
+            celulas.append((coluna, linha))
+            if coluna != 2:
+                celulas.append((4 - coluna, linha))
+
+    retangulos = ''.join(
+        f'<rect x="{x}" y="{y}" width="1" height="1"/>' for x, y in sorted(celulas)
+    )
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{tamanho}" height="{tamanho}" '
+        f'viewBox="-0.5 -0.5 6 6" shape-rendering="crispEdges">'
+        f'<rect x="-0.5" y="-0.5" width="6" height="6" fill="#f0f0f0"/>'
+        f'<g fill="{cor}">{retangulos}</g></svg>'
+    )
@@ -0,0 +1,261 @@
+# app/backfill.py
+"""
+Reconstrução dos rollups em paralelo, por partições de dias.
+
+O intervalo de datas de UVRegister é dividido em partições de `dias`
+dias. Cada partição é resumida em um processo de um ProcessPoolExecutor,
+com a sua própria conexão somente leitura, e devolve os rollups prontos
+(contagem, soma, mínimo, máximo, histograma e DDSketch por arduino,
+localização e dia). Como os rollups são por dia, partições diferentes
+nunca produzem o mesmo rollup: o processo principal só grava o
+resultado de cada partição, uma transação por partição, enquanto as
+outras ainda estão sendo calculadas.
+
+A reconstrução considera os registros até o maior id existente no
+início (limit_id). Os que chegam durante ela continuam sendo incluídos
+por rollups.atualizar; ao gravar uma partição, os que atualizar já tinha
+incluído (id entre limit_id e o último resumido) são somados de novo aos
+rollups novos, então nada se perde nem é contado duas vezes.
+
+Os dias arquivados (app.arquivo) são resumidos a partir dos blocos de
+UVChunk, lidos na mesma consulta que os registros do dia.
+
+As partições ficam em RollupBackfill; uma reconstrução interrompida
+continua das que faltam.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, time, timedelta, timezone
+
+import sqlalchemy as sa
+from sqlalchemy.pool import NullPool
+
+from app import arquivo, rollups
+from app.models import Organization, RollupBackfill, UVChunk, UVRegister, UVRollup
+from app.sketches import DDSketch
+
+# Conexão somente leitura de cada processo do pool
+_engine = None
+
+
+def _iniciar_processo(url):
+    global _engine
+    url = sa.engine.make_url(url)
+    if url.get_backend_name() == 'sqlite':
+        url = f'sqlite:///file:{url.database}?mode=ro&uri=true'
+        _engine = sa.create_engine(url, poolclass=NullPool)
+    else:
+        _engine = sa.create_engine(url, poolclass=NullPool,
+                                   execution_options={'postgresql_readonly': True})
+
+
+def _meia_noite(dia):
+    # As datas ficam em UTC sem fuso no banco
+    return datetime.combine(dia, time())
+
+
+def _resumir(inicio, fim, limite, orgs):
+    """
+    Rollups da partição [inicio, fim), com os registros de id até `limite`.
+
+    Roda em um processo do pool. Lê um dia de uma organização por vez,
+    pelo índice (org_id, register_date), para não segurar o banco durante
+    a partição inteira. Os blocos arquivados vêm no mesmo SELECT: um
+    arquivamento no meio não faz um registro ser contado duas vezes nem
+    nenhuma.
+    """
+    resultado = []
+    dia = inicio
+    with _engine.connect() as conexao:
+        while dia < fim:
+            grupos = {}
+            for org_id in orgs:
+                linhas = conexao.execute(sa.union_all(
+                    sa.select(
+                        UVRegister.id,
+                        UVRegister.arduino_id,
+                        UVRegister.location_id,
+                        UVRegister.frequency,
+                        sa.null().label('data'),
+                    )
+                    .where(UVRegister.org_id == org_id,
+                           UVRegister.register_date >= _meia_noite(dia),
+                           UVRegister.register_date < _meia_noite(dia + timedelta(days=1)),
+                           UVRegister.id <= limite,
+                           UVRegister.flag == 0),
+                    sa.select(
+                        sa.null(),
+                        UVChunk.arduino_id,
+                        UVChunk.location_id,
+                        sa.null(),
+                        UVChunk.data,
+                    )
+                    .where(UVChunk.org_id == org_id, UVChunk.day == dia),
+                )).all()
+                for linha in linhas:
+                    chave = (linha.arduino_id, linha.location_id)
+                    if chave not in grupos:
+                        grupos[chave] = (org_id, DDSketch(), [0] * len(rollups.FAIXAS), [0])
+                    _, sketch, histograma, ultimo = grupos[chave]
+                    if linha.data is None:
+                        frequencias = (linha.frequency,)
+                        ultimo[0] = max(ultimo[0], linha.id)
+                    else:
+                        # Bloco arquivado: as leituras não têm mais id
+                        frequencias = arquivo.descomprimir(linha.data)[1]
+                    for frequencia in frequencias:
+                        sketch.add(frequencia)
+                        histograma[rollups._faixa(frequencia)] += 1
+                conexao.rollback()
+
+            for (arduino_id, location_id), (org_id, sketch, histograma, ultimo) in grupos.items():
+                resultado.append({
+                    'arduino_id' : arduino_id,
+                    'location_id': location_id,
+                    'org_id'     : org_id,
+                    'day'        : dia,
+                    'count'      : sketch.count,
+                    'total'      : sketch.total,
+                    'minimum'    : sketch.min,
+                    'maximum'    : sketch.max,
+                    'histogram'  : histograma,
+                    'sketch'     : sketch.to_bytes(),
+                    'last_id'    : ultimo[0],
+                })
+            dia += timedelta(days=1)
+    return resultado
+
+
+def _planejar(session, dias):
+    """
+    Divide o intervalo de datas de UVRegister em partições novas.
+    """
+    session.execute(sa.delete(RollupBackfill))
+    limite = session.scalar(sa.select(sa.func.max(UVRegister.id))) or 0
+
+    # Mínimo e máximo por organização: cada um é uma busca no índice
+    # (org_id, register_date)
+    extremos = []
+    for org_id in session.scalars(sa.select(Organization.id)):
+        datas = session.execute(
+            sa.select(sa.func.min(UVRegister.register_date), sa.func.max(UVRegister.register_date))
+            .where(UVRegister.org_id == org_id)
+        ).one()
+        extremos.extend(rollups._dia(data) for data in datas if data is not None)
+        # Dias arquivados, pelo índice (org_id, day) de UVChunk
+        extremos.extend(dia for dia in session.execute(
+            sa.select(sa.func.min(UVChunk.day), sa.func.max(UVChunk.day))
+            .where(UVChunk.org_id == org_id)
+        ).one() if dia is not None)
+    if not extremos:
+        session.commit()
+        return
+
+    inicio, fim = min(extremos), max(extremos) + timedelta(days=1)
+    particao = inicio
+    while particao < fim:
+        proxima = min(particao + timedelta(days=dias), fim)
+        session.add(RollupBackfill(start=particao, end=proxima, limit_id=limite))
+        particao = proxima
+
+    # Rollups fora do intervalo são de registros que não existem mais
+    session.execute(
+        sa.delete(UVRollup)
+        .where(sa.or_(UVRollup.day < inicio, UVRollup.day >= fim), UVRollup.last_id <= limite),
+        execution_options={'synchronize_session': False},
+    )
+    session.commit()
+
+
+def _gravar(session, particao, resumos):
+    """
+    Troca os rollups dos dias da partição pelos recalculados, em uma transação.
+    """
+    if session.get_bind().dialect.name == 'postgresql':
+        # Ninguém mais grava rollups até o commit (rollups.atualizar espera)
+        session.execute(sa.text('LOCK TABLE uv_rollup IN SHARE ROW EXCLUSIVE MODE'))
+
+    # Último id já resumido, lido dentro da transação de escrita; os
+    # rollups apagados também contam
+    apagados = session.scalars(
+        sa.delete(UVRollup)
+        .where(UVRollup.day >= particao.start, UVRollup.day < particao.end)
+        .returning(UVRollup.last_id),
+        execution_options={'synchronize_session': False},
+    ).all()
+    restante = session.scalar(sa.select(sa.func.max(UVRollup.last_id))) or 0
+    ultimo = max(apagados + [restante])
+
+    if resumos:
+        session.execute(sa.insert(UVRollup), resumos)
+
+    # Registros que chegaram depois do início e rollups.atualizar já resumiu
+    if ultimo > particao.limit_id:
+        rollups.registrar(session, session.execute(
+            sa.select(
+                UVRegister.id,
+                UVRegister.arduino_id,
+                UVRegister.org_id,
+                UVRegister.location_id,
+                UVRegister.register_date,
+                UVRegister.frequency,
+                UVRegister.flag,
+            )
+            .where(UVRegister.id > particao.limit_id, UVRegister.id <= ultimo,
+                   UVRegister.register_date >= _meia_noite(particao.start),
+                   UVRegister.register_date < _meia_noite(particao.end))
+        ).all())
+
+    particao.readings = sum(resumo['count'] for resumo in resumos)
+    particao.finished_at = datetime.now(timezone.utc)
+    session.commit()
+
+
+def reconstruir(session, processos=None, dias=7, retomar=False, ao_avancar=None):
+    """
+    Recalcula os rollups em `processos` processos (padrão: um por CPU).
+
+    Com `retomar`, continua a última reconstrução se ela não terminou.
+    `ao_avancar(particoes_feitas, particoes)` é chamada a cada partição
+    gravada. Retorna quantos registros foram resumidos.
+    """
+    pendentes = session.scalars(
+        sa.select(RollupBackfill)
+        .where(RollupBackfill.finished_at.is_(None))
+        .order_by(RollupBackfill.start)
+    ).all()
+    if not (retomar and pendentes):
+        _planejar(session, dias)
+        pendentes = session.scalars(
+            sa.select(RollupBackfill).order_by(RollupBackfill.start)
+        ).all()
+    if not pendentes:
+        return 0
+
+    particoes = session.scalar(sa.select(sa.func.count()).select_from(RollupBackfill))
+    feitas = particoes - len(pendentes)
+    orgs = list(session.scalars(sa.select(Organization.id)))
+    url = session.get_bind().url.render_as_string(hide_password=False)
+    total = 0
+
+    pool = ProcessPoolExecutor(max_workers=processos or os.cpu_count(),
+                               initializer=_iniciar_processo, initargs=(url,))
+    try:
+        futuros = {
+            pool.submit(_resumir, particao.start, particao.end, particao.limit_id, orgs): particao
+            for particao in pendentes
+        }
+        for futuro in as_completed(futuros):
+            particao = futuros[futuro]
+            _gravar(session, particao, futuro.result())
+            total += particao.readings
+            feitas += 1
+            if ao_avancar is not None:
+                ao_avancar(feitas, particoes)
+    except BaseException:
+        # As partições já gravadas ficam; o resto continua com `retomar`
+        session.rollback()
+        pool.shutdown(wait=True, cancel_futures=True)
+        raise
+    pool.shutdown()
+    return total
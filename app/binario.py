@@ -0,0 +1,202 @@
+# app/binario.py
+"""
+Formato binário compacto dos envios de registros dos arduinos.
+
+Alternativa ao JSON em /api/dispositivo/registros e
+/api/arduino/<id>/registros, com Content-Type application/x-uv-lote.
+Montar e transmitir JSON custa caro para um ESP32; aqui cada leitura
+ocupa em geral 5 bytes (2 da frequência, 2 do intervalo desde a
+anterior e 1 da localização).
+
+Versão 1, little-endian:
+
+    offset  tamanho  campo
+    0       2        b'UV'
+    2       1        versão (1)
+    3       1        casas decimais da frequência (0 a 6)
+    4       2        n: quantidade de leituras (1 a ingest.MAX_LEITURAS)
+    6       8        t0: data da primeira leitura, em milissegundos desde a época (UTC, int64)
+    14      2n       frequências, uint16: frequência * 10^casas, arredondada
+    14+2n   ...      varints (LEB128, sem sinal), nesta ordem:
+                       arduino_id
+                       n-1 intervalos em ms entre leituras seguidas, em zigzag
+                       (0, -1, 1, -2... viram 0, 1, 2, 3...)
+                       n location_id
+
+O lote não pode ter bytes sobrando. `codificar` é a referência para o
+firmware. `ler` decodifica com struct e, com NumPy, sem laço em Python
+(np.frombuffer e varints vetorizados), e devolve as leituras no mesmo
+formato de ingest.ler_leituras, para o mesmo INSERT em lote.
+"""
+import struct
+from datetime import datetime, timedelta, timezone
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from app.ingest import MAX_LEITURAS, LeituraInvalida
+
+TIPO = 'application/x-uv-lote'
+VERSAO = 1
+MAX_CASAS = 6
+
+_CABECALHO = struct.Struct('<2sBBHq')
+_EPOCA = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# Até 9999-12-31, o limite do datetime
+_MAX_MS = 253402300799999
+# Maior location_id aceito, o mesmo nos dois decodificadores
+_MAX_ID = 2 ** 62
+
+
+def _varint(valor):
+    partes = bytearray()
+    while True:
+        byte = valor & 0x7f
+        valor >>= 7
+        if valor:
+            partes.append(byte | 0x80)
+        else:
+            partes.append(byte)
+            return bytes(partes)
+
+
+def _zigzag(valor):
+    return (valor << 1) ^ (valor >> 63)
+
+
+def _ms(data):
+    if isinstance(data, (int, float)):
+        return round(data * 1000)
+    if data.tzinfo is None:
+        data = data.replace(tzinfo=timezone.utc)
+    return (data - _EPOCA) // timedelta(milliseconds=1)
+
+
+def codificar(arduino_id, leituras, casas=3):
+    """
+    Codificação de referência de um lote.
+
+    `leituras` é uma sequência de (register_date, location_id, frequency),
+    com register_date em datetime ou segundos desde a época.
+    """
+    if not 1 <= len(leituras) <= MAX_LEITURAS:
+        raise ValueError(f'Um lote tem de 1 a {MAX_LEITURAS} leituras')
+    if not 0 <= casas <= MAX_CASAS:
+        raise ValueError(f'casas deve ser de 0 a {MAX_CASAS}')
+
+    datas = [_ms(data) for data, _, _ in leituras]
+    escala = 10 ** casas
+    frequencias = [round(frequencia * escala) for _, _, frequencia in leituras]
+    if min(frequencias) < 0 or max(frequencias) > 0xffff:
+        raise ValueError(f'Frequência fora do intervalo de 0 a {0xffff / escala}')
+
+    partes = [
+        _CABECALHO.pack(b'UV', VERSAO, casas, len(leituras), datas[0]),
+        struct.pack(f'<{len(frequencias)}H', *frequencias),
+        _varint(arduino_id),
+    ]
+    partes.extend(_varint(_zigzag(b - a)) for a, b in zip(datas, datas[1:]))
+    partes.extend(_varint(location_id) for _, location_id, _ in leituras)
+    return b''.join(partes)
+
+
+def _varints_numpy(dados, quantidade):
+    b = np.frombuffer(dados, dtype=np.uint8)
+    fins = np.flatnonzero(b < 0x80)
+    if len(fins) != quantidade or fins[-1] != len(b) - 1:
+        raise LeituraInvalida('Lote binário com tamanho inválido')
+    inicios = np.concatenate(([0], fins[:-1] + 1))
+    if (fins - inicios).max() > 8:
+        raise LeituraInvalida('Varint longo demais')
+    # Posição de cada byte dentro do seu varint
+    numero = np.repeat(np.arange(quantidade), fins - inicios + 1)
+    posicao = np.arange(len(b)) - inicios[numero]
+    partes = (b & 0x7f).astype(np.uint64) << (7 * posicao).astype(np.uint64)
+    return np.add.reduceat(partes, inicios)
+
+
+def _ler_numpy(dados, n, casas, t0):
+    fim = _CABECALHO.size + 2 * n
+    frequencias = np.frombuffer(dados, dtype='<u2', count=n, offset=_CABECALHO.size)
+    varints = _varints_numpy(memoryview(dados)[fim:], 2 * n)
+
+    arduino_id = int(varints[0])
+    intervalos = varints[1:n]
+    intervalos = (intervalos >> np.uint64(1)).astype(np.int64) ^ -(intervalos & np.uint64(1)).astype(np.int64)
+    if n > 1 and np.abs(intervalos).max() > _MAX_MS:
+        raise LeituraInvalida('Lote binário com valores fora do intervalo')
+    datas = t0 + np.concatenate(([0], np.cumsum(intervalos)))
+    locais = varints[n:].astype(np.int64)
+    if datas.min() < 0 or datas.max() > _MAX_MS or locais.max() > _MAX_ID:
+        raise LeituraInvalida('Lote binário com valores fora do intervalo')
+
+    return (
+        arduino_id,
+        # Em UTC, sem o fuso: como o banco guarda
+        datas.astype('datetime64[ms]').astype('datetime64[us]').tolist(),
+        locais.tolist(),
+        (frequencias / 10 ** casas).tolist(),
+    )
+
+
+def _ler_struct(dados, n, casas, t0):
+    frequencias = struct.unpack_from(f'<{n}H', dados, _CABECALHO.size)
+    varints = []
+    valor = deslocamento = 0
+    for byte in memoryview(dados)[_CABECALHO.size + 2 * n:]:
+        valor |= (byte & 0x7f) << deslocamento
+        deslocamento += 7
+        if deslocamento > 63:
+            raise LeituraInvalida('Varint longo demais')
+        if byte < 0x80:
+            varints.append(valor)
+            valor = deslocamento = 0
+    if deslocamento or len(varints) != 2 * n:
+        raise LeituraInvalida('Lote binário com tamanho inválido')
+
+    datas = [t0]
+    for intervalo in varints[1:n]:
+        datas.append(datas[-1] + ((intervalo >> 1) ^ -(intervalo & 1)))
+    if min(datas) < 0 or max(datas) > _MAX_MS or max(varints[n:]) > _MAX_ID:
+        raise LeituraInvalida('Lote binário com valores fora do intervalo')
+
+    escala = 10 ** casas
+    return (
+        varints[0],
+        [datetime(1970, 1, 1) + timedelta(milliseconds=ms) for ms in datas],
+        varints[n:],
+        [frequencia / escala for frequencia in frequencias],
+    )
+
+
+def ler(dados, arduino_id):
+    """
+    Decodifica um lote do arduino `arduino_id` nas leituras de
+    ingest.ler_leituras. O arduino do lote tem de ser o mesmo.
+    """
+    if len(dados) < _CABECALHO.size:
+        raise LeituraInvalida('Lote binário incompleto')
+    magico, versao, casas, n, t0 = _CABECALHO.unpack_from(dados)
+    if magico != b'UV':
+        raise LeituraInvalida('Não é um lote binário de registros')
+    if versao != VERSAO:
+        raise LeituraInvalida(f'Versão de lote não suportada: {versao}')
+    if casas > MAX_CASAS:
+        raise LeituraInvalida(f'Casas decimais inválidas: {casas}')
+    if not 1 <= n <= MAX_LEITURAS:
+        raise LeituraInvalida(f'Um lote tem de 1 a {MAX_LEITURAS} registros')
+    if len(dados) < _CABECALHO.size + 3 * n + 1:
+        raise LeituraInvalida('Lote binário incompleto')
+
+    ler_colunas = _ler_numpy if np is not None else _ler_struct
+    do_lote, datas, locais, frequencias = ler_colunas(dados, n, casas, t0)
+    if do_lote != arduino_id:
+        raise LeituraInvalida(f'O lote é do arduino {do_lote}')
+
+    # Os parâmetros do INSERT em lote, direto das colunas
+    return [
+        {'register_date': data, 'location_id': local, 'frequency': frequencia}
+        for data, local, frequencia in zip(datas, locais, frequencias)
+    ]
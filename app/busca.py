@@ -0,0 +1,165 @@
+# app/busca.py
+"""
+Busca textual em componentes, localizações e posts.
+
+No SQLite usa tabelas FTS5 de conteúdo externo (components_fts,
+location_fts, post_fts), mantidas por triggers. A migration as cria, e
+também `db.create_all` (bancos de teste), pelo evento after_create. No
+PostgreSQL usa to_tsvector com índices GIN de expressão. Cada palavra da
+busca vale como prefixo ("guv uv" acha "GUVA-S12SD UV"), e os resultados
+saem ordenados por relevância (bm25 / ts_rank), paginados.
+"""
+import re
+
+import sqlalchemy as sa
+
+from app import db
+from app.models import Components, Location, Post, User
+
+MAX_POR_PAGINA = 50
+
+# Tabela FTS5 e colunas indexadas de cada tipo. Os pesos do bm25 seguem a
+# ordem das colunas
+TIPOS = {
+    'componentes': ('components_fts', Components, (Components.name, Components.especifies), (10.0, 1.0)),
+    'locais'     : ('location_fts', Location, (Location.city, Location.state, Location.country), (10.0, 5.0, 1.0)),
+    'posts'      : ('post_fts', Post, (Post.body,), (1.0,)),
+}
+
+
+class BuscaInvalida(ValueError):
+    pass
+
+
+def _ddl_sqlite(indice, modelo, colunas):
+    tabela = modelo.__tablename__
+    lista = ', '.join(coluna.name for coluna in colunas)
+    novos = ', '.join(f'new.{coluna.name}' for coluna in colunas)
+    antigos = ', '.join(f'old.{coluna.name}' for coluna in colunas)
+    # Os mesmos comandos da migration 72e8679dde67
+    return [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {indice} USING fts5(
+            {lista}, content='{tabela}', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )""",
+        f"""CREATE TRIGGER IF NOT EXISTS {indice}_ai AFTER INSERT ON {tabela} BEGIN
+            INSERT INTO {indice}(rowid, {lista}) VALUES (new.id, {novos});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {indice}_ad AFTER DELETE ON {tabela} BEGIN
+            INSERT INTO {indice}({indice}, rowid, {lista}) VALUES ('delete', old.id, {antigos});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {indice}_au AFTER UPDATE ON {tabela} BEGIN
+            INSERT INTO {indice}({indice}, rowid, {lista}) VALUES ('delete', old.id, {antigos});
+            INSERT INTO {indice}(rowid, {lista}) VALUES (new.id, {novos});
+        END""",
+        f"INSERT INTO {indice}({indice}) VALUES ('rebuild')",
+    ]
+
+
+@sa.event.listens_for(db.metadata, 'after_create')
+def _criar_indices(metadata, connection, **kw):
+    # db.create_all não passa pela migration
+    if connection.dialect.name != 'sqlite':
+        return
+    for indice, modelo, colunas, _ in TIPOS.values():
+        for comando in _ddl_sqlite(indice, modelo, colunas):
+            connection.exec_driver_sql(comando)
+
+
+def _palavras(texto):
+    palavras = re.findall(r'\w+', texto or '')
+    if not palavras:
+        raise BuscaInvalida('Informe o que buscar')
+    return palavras[:10]
+
+
+def _consulta_sqlite(tipo, palavras):
+    tabela, modelo, _, pesos = TIPOS[tipo]
+    fts = sa.table(tabela, sa.column('rowid'))
+    # Cada palavra entre aspas (sem operadores do FTS5) e com * de prefixo
+    expressao = ' '.join('"{}"*'.format(p) for p in palavras)
+    rank = sa.func.bm25(sa.literal_column(tabela), *pesos)
+    return (
+        sa.select(modelo, rank.label('rank'))
+        .join(fts, fts.c.rowid == modelo.id)
+        .where(sa.literal_column(tabela).op('MATCH')(expressao))
+        .order_by(rank, modelo.id)
+    )
+
+
+def _consulta_postgresql(tipo, palavras):
+    _, modelo, colunas, _ = TIPOS[tipo]
+    # Mesma expressão dos índices GIN da migration, para o índice ser usado
+    texto = sa.func.coalesce(colunas[0], '')
+    for coluna in colunas[1:]:
+        texto = texto + ' ' + sa.func.coalesce(coluna, '')
+    documento = sa.func.to_tsvector(sa.literal_column("'simple'::regconfig"), texto)
+    expressao = sa.func.to_tsquery(sa.literal_column("'simple'::regconfig"),
+                                   ' & '.join(f'{p}:*' for p in palavras))
+    rank = sa.func.ts_rank(documento, expressao)
+    return (
+        sa.select(modelo, rank.label('rank'))
+        .where(documento.op('@@')(expressao))
+        .order_by(rank.desc(), modelo.id)
+    )
+
+
+def _consulta(session, tipo, palavras):
+    if tipo not in TIPOS:
+        raise BuscaInvalida(f'Tipo de busca inválido: {tipo}')
+    if session.get_bind().dialect.name == 'postgresql':
+        return _consulta_postgresql(tipo, palavras)
+    return _consulta_sqlite(tipo, palavras)
+
+
+def _item(tipo, objeto, autor=None):
+    if tipo == 'componentes':
+        return {'id': objeto.id, 'name': objeto.name, 'especifies': objeto.especifies,
+                'category_id': objeto.category_id, 'price': objeto.price}
+    if tipo == 'locais':
+        return {'id': objeto.id, 'city': objeto.city, 'state': objeto.state,
+                'country': objeto.country}
+    return {'id': objeto.id, 'body': objeto.body, 'timestamp': objeto.timestamp.isoformat(),
+            'author': autor}
+
+
+def buscar(session, tipo, texto, page=1, per_page=20, org_id=None):
+    """
+    Uma página de resultados do tipo, do mais para o menos relevante.
+    Com `org_id`, os posts ficam restritos aos autores da organização
+    (componentes e localizações são um catálogo comum).
+
+    Retorna (itens, tem_mais). Os itens são dicts prontos para JSON.
+    """
+    palavras = _palavras(texto)
+    page = max(page, 1)
+    per_page = min(max(per_page, 1), MAX_POR_PAGINA)
+
+    consulta = _consulta(session, tipo, palavras)
+    if tipo == 'posts':
+        # O autor vem na mesma consulta, sem um SELECT por post
+        consulta = consulta.add_columns(User.username).join(User, User.id == Post.user_id)
+        if org_id is not None:
+            consulta = consulta.where(User.org_id == org_id)
+
+    # Uma linha a mais só para saber se existe a próxima página
+    linhas = session.execute(
+        consulta.limit(per_page + 1).offset((page - 1) * per_page)
+    ).all()
+    itens = [
+        _item(tipo, linha[0], linha[2] if tipo == 'posts' else None)
+        for linha in linhas[:per_page]
+    ]
+    return itens, len(linhas) > per_page
+
+
+def reconstruir(session):
+    """
+    Refaz os índices FTS5 a partir das tabelas (só SQLite).
+    """
+    if session.get_bind().dialect.name != 'sqlite':
+        return 0
+    for tabela, *_ in TIPOS.values():
+        session.execute(sa.text(f"INSERT INTO {tabela}({tabela}) VALUES ('rebuild')"))
+    session.commit()
+    return len(TIPOS)
@@ -0,0 +1,181 @@
+# app/cli.py
+import csv
+import json
+import sys
+
+import click
+import sqlalchemy as sa
+from flask import Blueprint, current_app
+from app import db, health, templating, assets, custos, provisioning, exclusao, busca, jobs, backfill, arquivo
+from app.models import Organization, User
+
+bp = Blueprint('cli', __name__, cli_group='uv')
+bp.cli.help = 'Comandos de manutenção dos registros UV.'
+
+
+@bp.cli.command('reconstruir-rollups')
+@click.option('--processos', type=int, help='Processos em paralelo (padrão: número de CPUs).')
+@click.option('--dias', type=int, default=7, show_default=True, help='Dias por partição.')
+@click.option('--retomar', is_flag=True, help='Continua a última reconstrução, se ela não terminou.')
+def reconstruir_rollups(processos, dias, retomar):
+    """Recalcula os rollups diários a partir de UVRegister."""
+    def ao_avancar(feitas, particoes):
+        click.echo(f'\rPartição {feitas}/{particoes}', nl=False)
+
+    total = backfill.reconstruir(db.session, processos, dias, retomar, ao_avancar)
+    click.echo(f'\n{total} registros resumidos')
+
+
+@bp.cli.command('arquivar')
+@click.option('--dias', type=int, help='Idade mínima dos registros (padrão: ARCHIVE_AFTER_DAYS).')
+def arquivar(dias):
+    """Comprime os registros antigos em blocos (UVChunk)."""
+    def ao_avancar(arquivados, total):
+        click.echo(f'\r{arquivados}/{total} registros', nl=False)
+
+    try:
+        total = arquivo.arquivar(db.session, dias or current_app.config['ARCHIVE_AFTER_DAYS'],
+                                 ao_avancar)
+    except arquivo.ArquivamentoAdiado as e:
+        click.echo(str(e), err=True)
+        sys.exit(1)
+    click.echo(f'\n{total} registros arquivados')
+
+
+@bp.cli.command('reconstruir-saude')
+def reconstruir_saude():
+    """Recalcula as métricas de saúde de todos os arduinos."""
+    total = health.reconstruir(db.session, current_app.config['DEVICE_GAP_SECONDS'])
+    click.echo(f'Métricas de {total} arduinos recalculadas')
+
+
+@bp.cli.command('reconstruir-busca')
+def reconstruir_busca():
+    """Refaz os índices de busca textual (FTS5)."""
+    total = busca.reconstruir(db.session)
+    click.echo(f'{total} índices reconstruídos')
+
+
+@bp.cli.command('recalcular-custos')
+def recalcular_custos():
+    """Recalcula custo e quantidade de componentes de todos os arduinos."""
+    custos.recalcular(db.session.connection())
+    db.session.commit()
+    click.echo('Custos recalculados')
+
+
+@bp.cli.command('criar-organizacao')
+@click.argument('nome')
+@click.argument('codigo')
+def criar_organizacao(nome, codigo):
+    """Cria uma organização; CODIGO é o informado no cadastro."""
+    if db.session.scalar(sa.select(Organization.id).where(Organization.slug == codigo)):
+        click.echo(f'Já existe uma organização com o código {codigo}', err=True)
+        sys.exit(1)
+    organizacao = Organization(name=nome, slug=codigo)
+    db.session.add(organizacao)
+    db.session.commit()
+    click.echo(f'Organização {organizacao.id} criada')
+
+
+@bp.cli.command('provisionar')
+@click.option('--usuario', required=True, help='Username do dono dos arduinos.')
+@click.option('--quantidade', required=True, type=int, help='Quantos arduinos criar.')
+@click.option('--modelo', type=int, help='Arduino cujos componentes serão copiados.')
+@click.option('--componente', multiple=True, metavar='ID:QTD',
+              help='Componente e quantidade, se não houver modelo. Pode repetir.')
+def provisionar(usuario, quantidade, modelo, componente):
+    """Cria arduinos em lote e imprime id,chave em CSV."""
+    user_id = db.session.scalar(sa.select(User.id).where(User.username == usuario))
+    if user_id is None:
+        raise click.BadParameter(f'usuário {usuario!r} não existe', param_hint='--usuario')
+
+    try:
+        if modelo is not None:
+            componentes = provisioning.componentes_do_modelo(db.session, user_id, modelo)
+        else:
+            itens = []
+            for item in componente:
+                component_id, _, qtd = item.partition(':')
+                itens.append({'component_id': component_id, 'quantity': qtd or 1})
+            componentes = provisioning.ler_componentes(itens)
+        criados = provisioning.provisionar(db.session, user_id, quantidade, componentes)
+        db.session.commit()
+    except provisioning.ProvisionamentoInvalido as e:
+        db.session.rollback()
+        raise click.ClickException(str(e))
+
+    saida = csv.writer(sys.stdout)
+    saida.writerow(['id', 'chave'])
+    saida.writerows(criados)
+
+
+@bp.cli.command('excluir-pendentes')
+def excluir_pendentes():
+    """Termina as exclusões de arduinos que o worker não terminou (tentativas esgotadas)."""
+    for arduino_id in exclusao.pendentes(db.session):
+        def ao_avancar(apagados, total):
+            click.echo(f'\rArduino {arduino_id}: {apagados}/{total} registros', nl=False)
+
+        exclusao.apagar(
+            db.session,
+            arduino_id,
+            current_app.config['DELETE_BATCH_SIZE'],
+            ao_avancar=ao_avancar,
+        )
+        click.echo(' - excluído')
+
+
+@bp.cli.command('worker')
+@click.option('--paralelo', type=int, help='Tarefas ao mesmo tempo (padrão: JOBS_WORKERS).')
+@click.option('--processos', is_flag=True, help='Executa as tarefas em processos, não em threads.')
+@click.option('--ate-esvaziar', is_flag=True, help='Sai quando não houver tarefas prontas.')
+def worker(paralelo, processos, ate_esvaziar):
+    """Executa as tarefas em segundo plano da fila (app.jobs)."""
+    worker = jobs.Worker(
+        current_app._get_current_object(),
+        paralelo or current_app.config['JOBS_WORKERS'],
+        processos,
+    )
+    click.echo(f'Worker {worker.nome} com {worker.paralelo} '
+               f'{"processos" if processos else "threads"}')
+    try:
+        worker.rodar(ate_esvaziar)
+    except KeyboardInterrupt:
+        worker.parar.set()
+
+
+@bp.cli.command('job')
+@click.argument('tipo')
+@click.option('--param', multiple=True, metavar='NOME=VALOR',
+              help='Parâmetro da tarefa (VALOR em JSON, ou texto). Pode repetir.')
+def job(tipo, param):
+    """Põe uma tarefa na fila do worker."""
+    params = {}
+    for item in param:
+        nome, _, valor = item.partition('=')
+        try:
+            params[nome] = json.loads(valor)
+        except ValueError:
+            params[nome] = valor
+    try:
+        novo = jobs.enfileirar(db.session, tipo, params)
+        db.session.commit()
+    except jobs.JobInvalido as e:
+        click.echo(f'{e}. Tarefas: {", ".join(jobs.tipos())}', err=True)
+        sys.exit(1)
+    click.echo(f'Job {novo.id} na fila')
+
+
+@bp.cli.command('compilar-templates')
+def compilar_templates():
+    """Grava o bytecode de todos os templates em JINJA_CACHE_DIR."""
+    total = templating.compilar(current_app)
+    click.echo(f'{total} templates compilados')
+
+
+@bp.cli.command('assets')
+def construir_assets():
+    """Gera os arquivos estáticos com hash em app/static/dist."""
+    manifesto = assets.construir(current_app.static_folder)
+    click.echo(f'{len(manifesto)} arquivos em {assets.PASTA_DIST}/')
@@ -0,0 +1,129 @@
+# app/custos.py
+"""
+Custo e quantidade de componentes de cada arduino, mantidos na própria
+tabela arduino (total_cost, component_count).
+
+Os totais são recalculados no banco, na mesma transação, sempre que um
+flush cria, altera ou remove linhas de arduino_components ou muda o
+preço de um componente. INSERT/UPDATE/DELETE em lote pelo ORM também contam.
+Assim relatórios e ordenações por custo são uma consulta só na tabela
+arduino.
+"""
+import sqlalchemy as sa
+import sqlalchemy.orm as so
+
+from app.models import Arduino, Arduino_Components, Components
+
+
+def _custo():
+    return sa.select(
+        sa.func.coalesce(sa.func.sum(Arduino_Components.quantity * Components.price), 0.0)
+    ).join(Components, Arduino_Components.component_id == Components.id)\
+     .where(Arduino_Components.arduino_id == Arduino.id)\
+     .scalar_subquery()
+
+
+def _quantidade():
+    return sa.select(sa.func.coalesce(sa.func.sum(Arduino_Components.quantity), 0))\
+             .where(Arduino_Components.arduino_id == Arduino.id)\
+             .scalar_subquery()
+
+
+def recalcular(connection, arduino_ids=None):
+    """
+    Recalcula os totais dos arduinos dados (ou de todos, com None).
+    """
+    comando = sa.update(Arduino).values(total_cost=_custo(), component_count=_quantidade())
+    if arduino_ids is not None:
+        if not arduino_ids:
+            return
+        comando = comando.where(Arduino.id.in_(list(arduino_ids)))
+    connection.execute(comando)
+
+
+def _por_componentes(connection, component_ids):
+    return set(connection.scalars(
+        sa.select(Arduino_Components.arduino_id)
+        .where(Arduino_Components.component_id.in_(list(component_ids)))
+        .distinct()
+    ))
+
+
+def _expirar(session, arduino_ids):
+    # Os objetos já carregados passam a ler os totais novos do banco
+    for objeto in session.identity_map.values():
+        if isinstance(objeto, Arduino) and objeto.id in arduino_ids:
+            session.expire(objeto, ['total_cost', 'component_count'])
+
+
+@sa.event.listens_for(so.Session, 'after_flush')
+def _depois_do_flush(session, flush_context):
+    # Aqui new/dirty/deleted ainda mostram o que o flush gravou
+    arduinos = set()
+    componentes = set()
+    for objeto in session.new | session.dirty | session.deleted:
+        if isinstance(objeto, Arduino_Components):
+            estado = sa.inspect(objeto)
+            arduinos.add(objeto.arduino_id)
+            # Se o componente foi trocado de arduino, o antigo também muda
+            arduinos.update(v for v in estado.attrs.arduino_id.history.deleted if v is not None)
+        elif isinstance(objeto, Components) and sa.inspect(objeto).attrs.price.history.deleted:
+            componentes.add(objeto.id)
+    if not (arduinos or componentes):
+        return
+
+    connection = session.connection()
+    if componentes:
+        arduinos |= _por_componentes(connection, componentes)
+    recalcular(connection, arduinos)
+    session.info.setdefault('custos_expirar', set()).update(arduinos)
+
+
+@sa.event.listens_for(so.Session, 'after_flush_postexec')
+def _expirar_depois_do_flush(session, flush_context):
+    arduinos = session.info.pop('custos_expirar', None)
+    if arduinos:
+        _expirar(session, arduinos)
+
+
+def _inseridos(estado):
+    parametros = estado.parameters or {}
+    if isinstance(parametros, dict):
+        parametros = [parametros]
+    return {linha['arduino_id'] for linha in parametros if 'arduino_id' in linha}
+
+
+@sa.event.listens_for(so.Session, 'do_orm_execute')
+def _em_lote(estado):
+    # session.execute(sa.insert/update/delete(...)) não passa pelo flush
+    if not (estado.is_insert or estado.is_update or estado.is_delete) or estado.bind_mapper is None:
+        return
+    mapper = estado.bind_mapper
+    if mapper.class_ not in (Arduino_Components, Components):
+        return
+
+    connection = estado.session.connection()
+    if estado.is_insert:
+        # Componente novo não está em nenhum arduino ainda
+        arduinos = _inseridos(estado) if mapper.class_ is Arduino_Components else set()
+        resultado = estado.invoke_statement()
+        recalcular(connection, arduinos)
+        _expirar(estado.session, arduinos)
+        return resultado
+
+    criterio = estado.statement.whereclause
+    if mapper.class_ is Arduino_Components:
+        consulta = sa.select(Arduino_Components.arduino_id).distinct()
+        if criterio is not None:
+            consulta = consulta.where(criterio)
+        arduinos = set(connection.scalars(consulta))
+    else:
+        consulta = sa.select(Components.id)
+        if criterio is not None:
+            consulta = consulta.where(criterio)
+        arduinos = _por_componentes(connection, connection.scalars(consulta).all())
+
+    resultado = estado.invoke_statement()
+    recalcular(connection, arduinos)
+    _expirar(estado.session, arduinos)
+    return resultado
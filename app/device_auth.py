@@ -0,0 +1,194 @@
+# app/device_auth.py
+"""
+Autenticação dos arduinos por chave de API.
+
+As chaves são tokens aleatórios guardados como HMAC-SHA256 (com
+DEVICE_KEY_SECRET), então a verificação é um hash rápido e uma busca pelo
+índice único de key_hash, sem o custo de scrypt/pbkdf2 das senhas. As
+chaves válidas ficam em um cache LRU em memória; revogar uma chave a
+remove do cache do processo, e o TTL limita quanto tempo os outros
+processos ainda a aceitam.
+
+O arduino envia `Authorization: Bearer <chave>`. Opcionalmente assina o
+corpo com `X-Timestamp` e `X-Signature` = HMAC-SHA256(chave, "<timestamp>.<corpo>").
+"""
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+
+import sqlalchemy as sa
+from flask import current_app, g, jsonify, request
+
+from app import db
+from app.models import ArduinoKey
+
+PREFIXO = 'uvk_'
+
+
+class CacheVerificacao:
+    """
+    LRU de key_hash -> (arduino_id, key_id, validade).
+    """
+
+    def __init__(self, tamanho, ttl):
+        self.tamanho = tamanho
+        self.ttl = ttl
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key_hash):
+        with self._lock:
+            item = self._itens.get(key_hash)
+            if item is None:
+                return None
+            if item[2] < time.monotonic():
+                del self._itens[key_hash]
+                return None
+            self._itens.move_to_end(key_hash)
+            return item[:2]
+
+    def put(self, key_hash, arduino_id, key_id):
+        with self._lock:
+            self._itens[key_hash] = (arduino_id, key_id, time.monotonic() + self.ttl)
+            self._itens.move_to_end(key_hash)
+            while len(self._itens) > self.tamanho:
+                self._itens.popitem(last=False)
+
+    def remover(self, key_hash):
+        with self._lock:
+            self._itens.pop(key_hash, None)
+
+
+_lock_caches = threading.Lock()
+
+
+def _cache():
+    # Um cache por aplicação, criado no primeiro uso
+    app = current_app
+    with _lock_caches:
+        if 'device_auth' not in app.extensions:
+            app.extensions['device_auth'] = CacheVerificacao(
+                app.config['DEVICE_KEY_CACHE_SIZE'],
+                app.config['DEVICE_KEY_CACHE_TTL'],
+            )
+        return app.extensions['device_auth']
+
+
+def hash_chave(token):
+    segredo = current_app.config['DEVICE_KEY_SECRET'].encode('utf-8')
+    return hmac.new(segredo, token.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def gerar_chave(session, arduino_id):
+    """
+    Cria uma chave para o arduino. Retorna (ArduinoKey, token).
+
+    O token só existe neste retorno; não é possível recuperá-lo depois.
+    Não faz commit.
+    """
+    token = PREFIXO + secrets.token_urlsafe(32)
+    chave = ArduinoKey(
+        arduino_id=arduino_id,
+        key_hash=hash_chave(token),
+        prefix=token[:12],
+    )
+    session.add(chave)
+    return chave, token
+
+
+def gerar_chaves(session, arduino_ids):
+    """
+    Cria uma chave para cada arduino em um único INSERT em lote.
+    Retorna {arduino_id: token}. Não faz commit.
+    """
+    tokens = {arduino_id: PREFIXO + secrets.token_urlsafe(32) for arduino_id in arduino_ids}
+    if tokens:
+        session.execute(sa.insert(ArduinoKey), [
+            {'arduino_id': arduino_id, 'key_hash': hash_chave(token), 'prefix': token[:12]}
+            for arduino_id, token in tokens.items()
+        ])
+    return tokens
+
+
+def revogar(session, chave):
+    """
+    Revoga a chave e a remove do cache deste processo. Não faz commit.
+    """
+    chave.revoked_at = datetime.now(timezone.utc)
+    _cache().remover(chave.key_hash)
+
+
+def verificar(session, token):
+    """
+    Retorna o arduino_id dono do token, ou None se a chave não existe ou foi revogada.
+    """
+    if not token or not token.startswith(PREFIXO):
+        return None
+
+    key_hash = hash_chave(token)
+    cache = _cache()
+    item = cache.get(key_hash)
+    if item is not None:
+        return item[0]
+
+    chave = session.scalar(
+        sa.select(ArduinoKey)
+        .where(ArduinoKey.key_hash == key_hash, ArduinoKey.revoked_at.is_(None))
+    )
+    if chave is None:
+        return None
+    cache.put(key_hash, chave.arduino_id, chave.id)
+    return chave.arduino_id
+
+
+def verificar_assinatura(token, timestamp, corpo, assinatura, max_skew):
+    """
+    Confere a assinatura HMAC-SHA256(token, "<timestamp>.<corpo>") do envio.
+    """
+    try:
+        enviado_em = int(timestamp)
+    except (TypeError, ValueError):
+        return False
+    if abs(time.time() - enviado_em) > max_skew:
+        return False
+
+    esperado = hmac.new(
+        token.encode('utf-8'),
+        timestamp.encode('utf-8') + b'.' + corpo,
+        hashlib.sha256,
+    ).hexdigest()
+    return hmac.compare_digest(esperado, assinatura or '')
+
+
+def dispositivo_required(f):
+    """
+    Exige uma chave de API válida e guarda o arduino em g.arduino_id.
+    """
+    @wraps(f)
+    def decorated_view(*args, **kwargs):
+        cabecalho = request.headers.get('Authorization', '')
+        token = cabecalho[7:].strip() if cabecalho.startswith('Bearer ') else None
+
+        arduino_id = verificar(db.session, token)
+        if arduino_id is None:
+            return jsonify({'erro': 'Chave de API inválida'}), 401
+
+        assinatura = request.headers.get('X-Signature')
+        if assinatura or current_app.config['DEVICE_REQUIRE_SIGNATURE']:
+            if not verificar_assinatura(
+                token,
+                request.headers.get('X-Timestamp'),
+                request.get_data(),
+                assinatura,
+                current_app.config['DEVICE_SIGNATURE_MAX_SKEW'],
+            ):
+                return jsonify({'erro': 'Assinatura inválida'}), 401
+
+        g.arduino_id = arduino_id
+        return f(*args, **kwargs)
+    return decorated_view
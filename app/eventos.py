@@ -0,0 +1,248 @@
+# app/eventos.py
+"""
+Avisos e pub/sub em memória entre o caminho de ingestão e as conexões
+que esperam por novidades.
+
+Um Aviso é um contador de versões: quem grava chama `notificar` (de
+qualquer thread) e quem espera aguarda, sem ocupar uma thread, até a
+versão mudar.
+
+Um Canal entrega mensagens prontas (bytes) a todas as assinaturas: a
+mensagem é montada uma vez por envio e só copiada para a fila de cada
+assinante. Uma assinatura que acumula mais de `tamanho_fila` mensagens é
+encerrada, para um cliente lento não segurar memória; o navegador se
+reconecta com Last-Event-ID e recebe o que perdeu do banco.
+
+Cada organização tem o seu canal de registros: um assinante só recebe
+os envios da própria organização. O aviso de novos registros é um só;
+quem acorda por um envio de outra organização refaz a consulta (filtrada)
+e volta a esperar.
+
+Cada aplicação tem os seus (app.extensions['eventos']), e tudo vale só
+dentro do processo: com vários workers, cada um vê apenas os envios que
+ele mesmo gravou.
+"""
+import asyncio
+import json
+import threading
+from collections import Counter, deque
+
+import sqlalchemy as sa
+from flask import current_app
+
+from app import series
+from app.models import Location
+
+
+def _resolver(futuro):
+    if not futuro.done():
+        futuro.set_result(None)
+
+
+class Aviso:
+
+    def __init__(self):
+        self.versao = 0
+        self._esperando = set()
+        self._lock = threading.Lock()
+
+    def notificar(self):
+        with self._lock:
+            self.versao += 1
+            esperando, self._esperando = self._esperando, set()
+        for loop, futuro in esperando:
+            loop.call_soon_threadsafe(_resolver, futuro)
+
+    async def esperar(self, versao, timeout):
+        """
+        Espera a versão ficar diferente de `versao`. Retorna False se o tempo acabou.
+        """
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        item = (loop, futuro)
+        with self._lock:
+            if self.versao != versao:
+                return True
+            self._esperando.add(item)
+        try:
+            await asyncio.wait_for(futuro, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                self._esperando.discard(item)
+
+
+class Assinatura:
+    """
+    Fila de mensagens de um assinante, consumida por uma thread.
+    """
+
+    def __init__(self, canal, tamanho_fila):
+        self.canal = canal
+        self.tamanho_fila = tamanho_fila
+        self.encerrada = False
+        self._fila = deque()
+        self._lock = threading.Lock()
+        self._sinal = threading.Event()
+
+    def entregar(self, mensagem):
+        with self._lock:
+            if len(self._fila) >= self.tamanho_fila:
+                self.encerrada = True
+            else:
+                self._fila.append(mensagem)
+        self._acordar()
+
+    def _acordar(self):
+        self._sinal.set()
+
+    def retirar(self):
+        """
+        Todas as mensagens pendentes, na ordem em que foram publicadas.
+        """
+        with self._lock:
+            mensagens = list(self._fila)
+            self._fila.clear()
+            self._sinal.clear()
+        return mensagens
+
+    def esperar(self, timeout):
+        return self._sinal.wait(timeout)
+
+    def cancelar(self):
+        self.canal.cancelar(self)
+
+
+class AssinaturaAsync(Assinatura):
+    """
+    Fila de mensagens de um assinante, consumida no event loop `loop`
+    (por padrão, o loop em que foi criada).
+    """
+
+    def __init__(self, canal, tamanho_fila, loop=None):
+        super().__init__(canal, tamanho_fila)
+        self._loop = loop or asyncio.get_running_loop()
+        self._sinal = asyncio.Event()
+
+    def _acordar(self):
+        self._loop.call_soon_threadsafe(self._sinal.set)
+
+    async def esperar(self, timeout):
+        try:
+            await asyncio.wait_for(self._sinal.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class Canal:
+
+    def __init__(self, tamanho_fila=100):
+        self.tamanho_fila = tamanho_fila
+        self._assinaturas = set()
+        self._lock = threading.Lock()
+
+    def assinar(self):
+        return self._adicionar(Assinatura(self, self.tamanho_fila))
+
+    def assinar_async(self, loop=None):
+        return self._adicionar(AssinaturaAsync(self, self.tamanho_fila, loop))
+
+    def _adicionar(self, assinatura):
+        with self._lock:
+            self._assinaturas.add(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura):
+        with self._lock:
+            self._assinaturas.discard(assinatura)
+
+    def publicar(self, mensagem):
+        with self._lock:
+            assinaturas = list(self._assinaturas)
+        for assinatura in assinaturas:
+            assinatura.entregar(mensagem)
+            if assinatura.encerrada:
+                self.cancelar(assinatura)
+
+    def __len__(self):
+        return len(self._assinaturas)
+
+
+class Eventos:
+
+    def __init__(self):
+        # Notificado depois de cada envio de registros gravado
+        self.novos_registros = Aviso()
+        # Mensagens SSE com os registros válidos de cada envio, por organização
+        self._canais = {}
+        self._lock = threading.Lock()
+
+    def canal(self, org_id):
+        with self._lock:
+            if org_id not in self._canais:
+                self._canais[org_id] = Canal()
+            return self._canais[org_id]
+
+
+def init_app(app):
+    app.extensions['eventos'] = Eventos()
+
+
+def do_app(app=None):
+    return (app or current_app).extensions['eventos']
+
+
+PING = b': ping\n\n'
+
+
+def mensagem_registros(session, registros):
+    """
+    Evento SSE `registros` com as leituras válidas e o total delas por dia
+    (o delta do gráfico semanal), ou None se nenhuma leitura é válida.
+    """
+    validos = [r for r in registros if not r.flag]
+    if not validos:
+        return None
+
+    locais = {
+        local.id: local
+        for local in session.scalars(
+            sa.select(Location).where(Location.id.in_({r.location_id for r in validos}))
+        )
+    }
+    dados = {
+        'registros': [
+            {
+                'id'           : r.id,
+                'arduino_id'   : r.arduino_id,
+                'register_date': r.register_date.isoformat(),
+                'city'         : locais[r.location_id].city,
+                'state'        : locais[r.location_id].state,
+                'frequency'    : r.frequency,
+            }
+            for r in validos
+        ],
+        # Dias no fuso dos painéis, os mesmos do gráfico semanal (app.series)
+        'por_dia': Counter(series.dia(r.register_date) for r in validos),
+    }
+    ultimo = max(r.id for r in validos)
+    return f'id: {ultimo}\nevent: registros\ndata: {json.dumps(dados)}\n\n'.encode('utf-8')
+
+
+def publicar_registros(session, registros):
+    """
+    Avisa quem espera por novos registros. Chamar depois do commit.
+    """
+    eventos = do_app()
+    eventos.novos_registros.notificar()
+    if not registros:
+        return
+    # Um envio é sempre de um arduino, logo de uma organização só
+    canal = eventos.canal(registros[0].org_id)
+    if len(canal):
+        mensagem = mensagem_registros(session, registros)
+        if mensagem is not None:
+            canal.publicar(mensagem)
@@ -0,0 +1,128 @@
+# app/exclusao.py
+"""
+Exclusão de arduinos com os registros apagados em segundo plano.
+
+Um arduino muito usado tem milhões de registros, e um único DELETE deles
+trava o SQLite para todas as outras escritas. Por isso a exclusão tem duas
+partes: `marcar`, na requisição, só preenche Arduino.deleted_at (o arduino
+some das páginas) e revoga as chaves de API, e `agendar` enfileira a tarefa
+'excluir-arduino' (app.tarefas) na mesma transação; o worker apaga os
+registros em lotes de DELETE_BATCH_SIZE, com um commit por lote, e por fim
+apaga o arduino. O resto (componentes, chaves, rollups, saúde, blocos
+arquivados) sai pelo ON DELETE CASCADE.
+
+O progresso fica no Job, como o das outras tarefas, e uma exclusão
+interrompida é retomada pelo próprio worker. `flask uv excluir-pendentes`
+termina à mão as que esgotaram as tentativas.
+"""
+import time
+from datetime import datetime, timezone
+
+import sqlalchemy as sa
+from flask import current_app
+
+from app import analytics, anomaly, device_auth, jobs
+from app.models import Arduino, ArduinoKey, Job, UVRegister
+
+TAREFA = 'excluir-arduino'
+
+
+def marcar(session, arduino):
+    """
+    Oculta o arduino e revoga as chaves dele. Não faz commit.
+    """
+    arduino.deleted_at = datetime.now(timezone.utc)
+    for chave in session.scalars(
+        sa.select(ArduinoKey)
+        .where(ArduinoKey.arduino_id == arduino.id, ArduinoKey.revoked_at.is_(None))
+    ):
+        device_auth.revogar(session, chave)
+
+
+def agendar(session, arduino, user_id):
+    """
+    Enfileira a exclusão dos registros do arduino. Não faz commit.
+    """
+    # A organização vai nos parâmetros: uma nova tentativa depois de o
+    # arduino já ter sido apagado ainda sabe qual snapshot descartar
+    return jobs.enfileirar(session, TAREFA, {'arduino_id': arduino.id, 'org_id': arduino.org_id},
+                           user_id=user_id, org_id=arduino.org_id)
+
+
+def job(session, arduino_id, user_id):
+    """
+    O job mais recente de exclusão do arduino pedido por `user_id`, ou None.
+    """
+    return session.scalar(
+        sa.select(Job)
+        .where(Job.kind == TAREFA, Job.user_id == user_id,
+               Job.params['arduino_id'].as_integer() == arduino_id)
+        .order_by(Job.id.desc())
+        .limit(1)
+    )
+
+
+def pendentes(session):
+    """
+    Arduinos marcados cuja exclusão não terminou.
+    """
+    return list(session.scalars(
+        sa.select(Arduino.id).where(Arduino.deleted_at.is_not(None)).order_by(Arduino.id)
+    ))
+
+
+def apagar(session, arduino_id, tamanho_lote, pausa=0.0, ao_avancar=None, org_id=None):
+    """
+    Apaga os registros do arduino em lotes e depois o próprio arduino.
+
+    `ao_avancar(apagados, total)` é chamada depois de cada lote. Faz um
+    commit por lote; entre eles espera `pausa` segundos para as outras
+    escritas passarem. Pode ser repetida depois de uma interrupção
+    (com `org_id`, também depois de o arduino ter sido apagado).
+    Retorna quantos registros foram apagados.
+    """
+    if org_id is None:
+        org_id = session.scalar(sa.select(Arduino.org_id).where(Arduino.id == arduino_id))
+    total = session.scalar(
+        sa.select(sa.func.count()).select_from(UVRegister)
+        .where(UVRegister.arduino_id == arduino_id)
+    )
+    apagados = 0
+    if ao_avancar is not None:
+        ao_avancar(apagados, total)
+
+    while True:
+        lote = (
+            sa.select(UVRegister.id)
+            .where(UVRegister.arduino_id == arduino_id)
+            .limit(tamanho_lote)
+            .scalar_subquery()
+        )
+        resultado = session.execute(
+            sa.delete(UVRegister).where(UVRegister.id.in_(lote)),
+            execution_options={'synchronize_session': False},
+        )
+        session.commit()
+        if not resultado.rowcount:
+            break
+        apagados += resultado.rowcount
+        if ao_avancar is not None:
+            ao_avancar(apagados, max(total, apagados))
+        if pausa:
+            time.sleep(pausa)
+
+    session.execute(
+        sa.delete(Arduino).where(Arduino.id == arduino_id),
+        execution_options={'synchronize_session': False},
+    )
+    session.commit()
+
+    # O snapshot colunar só acrescenta linhas novas, então ainda tem as
+    # apagadas. Descartado só depois do commit acima, que leva junto (pelo
+    # CASCADE) os blocos arquivados do arduino: antes dele, uma reconstrução
+    # copiaria os blocos de novo. Se cair aqui, a nova tentativa descarta.
+    if org_id is not None:
+        analytics.invalidar(current_app.config['ANALYTICS_DIR'], org_id)
+    anomaly.esquecer(current_app, arduino_id)
+    return apagados
+
@@ -0,0 +1,76 @@
+# app/feed.py
+"""
+Feed de posts paginado por keyset.
+
+As páginas andam por (timestamp, id) decrescentes a partir de um cursor,
+então cada página é uma varredura de `limite` linhas no índice, não
+importa quão fundo o leitor já foi (OFFSET leria e descartaria todas as
+anteriores). O autor vem no mesmo SELECT, por JOIN.
+"""
+from datetime import datetime
+
+import sqlalchemy as sa
+import sqlalchemy.orm as so
+
+from app.models import Post, User
+
+MAX_LIMITE = 100
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def cursor(post):
+    return f'{post.timestamp.isoformat()}_{post.id}'
+
+
+def _ler_cursor(valor):
+    try:
+        timestamp, _, post_id = valor.rpartition('_')
+        return datetime.fromisoformat(timestamp), int(post_id)
+    except (AttributeError, ValueError):
+        raise CursorInvalido(f'Cursor inválido: {valor!r}')
+
+
+def pagina(session, user_id=None, depois=None, limite=20, org_id=None):
+    """
+    Posts do usuário (ou de todos, sem user_id), do mais novo para o mais antigo.
+    Com `org_id`, só os de autores da organização.
+
+    `depois` é o cursor do último post da página anterior. Retorna
+    (posts, cursor da próxima página ou None).
+    """
+    limite = min(max(limite, 1), MAX_LIMITE)
+    consulta = (
+        sa.select(Post)
+        .join(Post.author)
+        .options(so.contains_eager(Post.author))
+        .order_by(Post.timestamp.desc(), Post.id.desc())
+    )
+    if user_id is not None:
+        consulta = consulta.where(Post.user_id == user_id)
+    if org_id is not None:
+        consulta = consulta.where(User.org_id == org_id)
+    if depois:
+        consulta = consulta.where(
+            sa.tuple_(Post.timestamp, Post.id) < sa.tuple_(*_ler_cursor(depois))
+        )
+
+    # Uma linha a mais só para saber se existe a próxima página
+    posts = session.scalars(consulta.limit(limite + 1)).all()
+    if len(posts) > limite:
+        return posts[:limite], cursor(posts[limite - 1])
+    return posts, None
+
+
+def como_dict(post):
+    return {
+        'id'       : post.id,
+        'body'     : post.body,
+        'timestamp': post.timestamp.isoformat(),
+        'author'   : {
+            'username': post.author.username,
+            'avatar'  : post.author.avatar(36),
+        },
+    }
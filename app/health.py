@@ -0,0 +1,177 @@
+# app/health.py
+"""
+Métricas de saúde por arduino, mantidas de forma incremental.
+
+Cada envio de registros atualiza uma linha de ArduinoStats por arduino:
+última coleta, registros por hora, intervalos sem coleta e taxa de
+outliers (leituras marcadas por app.anomaly). A média e a variância de
+Welford das leituras válidas servem de ponto de partida para o detector
+de anomalias depois de um restart. A visão da frota lê só essa tabela.
+"""
+import heapq
+import itertools
+from collections import namedtuple
+from datetime import timezone
+
+import sqlalchemy as sa
+
+from app import arquivo
+from app.models import ArduinoStats, UVChunk, UVRegister
+
+# Leitura de um bloco arquivado; só as válidas são arquivadas
+_Arquivada = namedtuple('_Arquivada', 'register_date frequency flag')
+
+
+def _utc(data):
+    # O SQLite devolve datas sem fuso; tudo aqui é comparado em UTC sem fuso
+    if data.tzinfo is not None:
+        data = data.astimezone(timezone.utc).replace(tzinfo=None)
+    return data
+
+
+def _hora(data):
+    return data.replace(minute=0, second=0, microsecond=0)
+
+
+def _novo(arduino_id):
+    return ArduinoStats(
+        arduino_id=arduino_id,
+        readings_count=0,
+        hour_count=0,
+        previous_hour_count=0,
+        gap_count=0,
+        max_gap_seconds=0.0,
+        outlier_count=0,
+        mean=0.0,
+        m2=0.0,
+    )
+
+
+def _aplicar(stats, registro, gap_seconds):
+    data = _utc(registro.register_date)
+    frequencia = registro.frequency
+
+    validos = stats.readings_count - stats.outlier_count
+    stats.readings_count += 1
+    if registro.flag:
+        stats.outlier_count += 1
+    else:
+        validos += 1
+        delta = frequencia - stats.mean
+        stats.mean += delta / validos
+        stats.m2 += delta * (frequencia - stats.mean)
+
+    if stats.first_reading is None or data < stats.first_reading:
+        stats.first_reading = data
+
+    if stats.last_reading is None or data > stats.last_reading:
+        if stats.last_reading is not None:
+            intervalo = (data - stats.last_reading).total_seconds()
+            if intervalo > gap_seconds:
+                stats.gap_count += 1
+            stats.max_gap_seconds = max(stats.max_gap_seconds, intervalo)
+        stats.last_reading = data
+
+    hora = _hora(data)
+    if stats.hour_start is None or hora > stats.hour_start:
+        seguida = stats.hour_start is not None and \
+            (hora - stats.hour_start).total_seconds() == 3600
+        stats.previous_hour_count = stats.hour_count if seguida else 0
+        stats.hour_start = hora
+        stats.hour_count = 1
+    elif hora == stats.hour_start:
+        stats.hour_count += 1
+
+
+def registrar(session, registros, gap_seconds):
+    """
+    Atualiza ArduinoStats com os registros recebidos. Não faz commit.
+    """
+    por_arduino = {}
+    for registro in registros:
+        por_arduino.setdefault(registro.arduino_id, []).append(registro)
+    if not por_arduino:
+        return
+
+    existentes = {
+        stats.arduino_id: stats
+        for stats in session.scalars(
+            sa.select(ArduinoStats).where(ArduinoStats.arduino_id.in_(list(por_arduino)))
+        )
+    }
+
+    for arduino_id, itens in por_arduino.items():
+        stats = existentes.get(arduino_id)
+        if stats is None:
+            stats = _novo(arduino_id)
+            session.add(stats)
+        for registro in sorted(itens, key=lambda r: _utc(r.register_date)):
+            _aplicar(stats, registro, gap_seconds)
+
+
+def semente(session, arduino_id):
+    """
+    (n, média, variância) das leituras válidas do arduino, para app.anomaly.
+    """
+    stats = session.get(ArduinoStats, arduino_id)
+    if stats is None:
+        return 0, 0.0, 0.0
+    validos = stats.readings_count - stats.outlier_count
+    variancia = stats.m2 / (validos - 1) if validos > 1 else 0.0
+    return validos, stats.mean, variancia
+
+
+def _registros(session, arduino_id, tamanho_lote):
+    # Em ordem de (data, id), em lotes pelo índice (arduino_id, register_date, id), sem ordenar
+    ultimo = None
+    while True:
+        consulta = (
+            sa.select(UVRegister.id, UVRegister.register_date, UVRegister.frequency, UVRegister.flag)
+            .where(UVRegister.arduino_id == arduino_id)
+            .order_by(UVRegister.register_date, UVRegister.id)
+            .limit(tamanho_lote)
+        )
+        if ultimo is not None:
+            consulta = consulta.where(
+                sa.tuple_(UVRegister.register_date, UVRegister.id) > sa.tuple_(*ultimo)
+            )
+        registros = session.execute(consulta).all()
+        if not registros:
+            return
+        yield from registros
+        ultimo = (registros[-1].register_date, registros[-1].id)
+
+
+def _arquivadas(session, arduino_id):
+    # Os blocos vêm por dia e, no dia, por localização: junta as do dia pela data
+    por_dia = itertools.groupby(
+        arquivo.blocos(session, UVChunk.arduino_id == arduino_id),
+        key=lambda item: item[0].day,
+    )
+    for _, itens in por_dia:
+        yield from heapq.merge(*(
+            [_Arquivada(data, frequencia, 0) for data, frequencia in zip(datas, frequencias)]
+            for _, datas, frequencias in itens
+        ))
+
+
+def reconstruir(session, gap_seconds, tamanho_lote=10_000):
+    """
+    Recalcula ArduinoStats de todos os arduinos a partir de UVRegister e
+    dos blocos arquivados (app.arquivo).
+    """
+    session.execute(sa.delete(ArduinoStats))
+    arduinos = session.scalars(
+        sa.union(sa.select(UVRegister.arduino_id), sa.select(UVChunk.arduino_id))
+        .order_by('arduino_id')
+    ).all()
+    for arduino_id in arduinos:
+        stats = _novo(arduino_id)
+        session.add(stats)
+        # Em ordem de data para os intervalos saírem certos
+        for registro in heapq.merge(_arquivadas(session, arduino_id),
+                                    _registros(session, arduino_id, tamanho_lote),
+                                    key=lambda r: _utc(r.register_date)):
+            _aplicar(stats, registro, gap_seconds)
+    session.commit()
+    return len(arduinos)
@@ -0,0 +1,119 @@
+# app/identity.py
+"""
+Identidade do usuário logado sem consultar o banco a cada requisição.
+
+O user_loader devolve um UsuarioSessao: uma cópia imutável e leve dos
+campos do usuário, guardada no cache com TTL (USER_CACHE_TTL) da aplicação.
+Quem altera o perfil chama `invalidar` para o processo atual; os outros
+processos veem a mudança quando o TTL vence.
+
+last_seen é gravado com um UPDATE direto no máximo a cada
+LAST_SEEN_INTERVAL segundos, sem carregar o usuário.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+
+import sqlalchemy as sa
+from flask import current_app
+from flask_login import UserMixin
+
+from app import db, login
+from app.models import User
+
+MAX_USUARIOS = 10_000
+
+
+class Estado:
+    """
+    Cache de identidades e últimas gravações de last_seen de uma aplicação.
+    """
+
+    def __init__(self):
+        self.cache = {}
+        self.ultimo_acesso = {}
+        self.lock = threading.Lock()
+
+
+def init_app(app):
+    app.extensions['identity'] = Estado()
+
+
+def _estado():
+    return current_app.extensions['identity']
+
+
+@dataclass(frozen=True)
+class UsuarioSessao(UserMixin):
+    """
+    Cópia imutável de User usada como current_user.
+    Para alterar o usuário, carregue o User com db.session.get.
+    """
+    id      : int
+    username: str
+    email   : str
+    about_me: Optional[str]
+    org_id  : int
+
+    avatar = User.avatar
+
+    @classmethod
+    def de(cls, user):
+        return cls(id=user.id, username=user.username, email=user.email, about_me=user.about_me,
+                   org_id=user.org_id)
+
+
+def carregar(user_id):
+    estado = _estado()
+    agora = time.monotonic()
+    with estado.lock:
+        item = estado.cache.get(user_id)
+        if item is not None and item[1] > agora:
+            return item[0]
+
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+    usuario = UsuarioSessao.de(user)
+
+    with estado.lock:
+        if len(estado.cache) >= MAX_USUARIOS:
+            # Descarta as entradas vencidas; se não bastar, começa do zero
+            for chave in [k for k, v in estado.cache.items() if v[1] <= agora]:
+                del estado.cache[chave]
+            if len(estado.cache) >= MAX_USUARIOS:
+                estado.cache.clear()
+        estado.cache[user_id] = (usuario, agora + current_app.config['USER_CACHE_TTL'])
+    return usuario
+
+
+def invalidar(user_id):
+    estado = _estado()
+    with estado.lock:
+        estado.cache.pop(user_id, None)
+
+
+def registrar_acesso(user_id):
+    """
+    Atualiza User.last_seen se a última gravação deste processo já passou do intervalo.
+    """
+    estado = _estado()
+    agora = time.monotonic()
+    with estado.lock:
+        if agora - estado.ultimo_acesso.get(user_id, float('-inf')) < current_app.config['LAST_SEEN_INTERVAL']:
+            return
+        estado.ultimo_acesso[user_id] = agora
+
+    db.session.execute(
+        sa.update(User)
+        .where(User.id == user_id)
+        .values(last_seen=datetime.now(timezone.utc))
+    )
+    db.session.commit()
+
+
+@login.user_loader
+def load_user(id):
+    return carregar(int(id))
@@ -0,0 +1,116 @@
+# app/ingest.py
+"""
+Caminho de entrada dos registros UV enviados pelos arduinos.
+
+`ler_leituras` valida o payload recebido e `registrar_leituras` passa as
+leituras pela detecção de anomalias e grava os registros em um único
+INSERT em lote, atualizando na mesma transação os rollups e as métricas
+de saúde do arduino.
+"""
+import math
+from datetime import datetime, timezone
+
+import sqlalchemy as sa
+from flask import current_app
+
+from app import anomaly, health, rollups
+from app.models import Arduino, Location, UVRegister
+
+MAX_LEITURAS = 5000
+
+
+class LeituraInvalida(ValueError):
+    pass
+
+
+def _data(valor):
+    if isinstance(valor, (int, float)):
+        try:
+            return datetime.fromtimestamp(valor, timezone.utc)
+        except (OverflowError, OSError, ValueError):
+            raise LeituraInvalida(f'register_date inválida: {valor!r}')
+    try:
+        data = datetime.fromisoformat(valor)
+    except (TypeError, ValueError):
+        raise LeituraInvalida(f'register_date inválida: {valor!r}')
+    # Em UTC: o SQLite guarda a data sem o fuso, e app.series conta os dias a partir de UTC
+    if data.tzinfo is None:
+        return data.replace(tzinfo=timezone.utc)
+    return data.astimezone(timezone.utc)
+
+
+def ler_leituras(payload):
+    """
+    Converte o JSON recebido em uma lista de leituras.
+
+    Aceita uma lista de leituras ou {"registros": [...]}. Cada leitura tem
+    register_date (ISO 8601 ou segundos desde a época), location_id e frequency.
+    """
+    if isinstance(payload, dict):
+        payload = payload.get('registros')
+    if not isinstance(payload, list) or not payload:
+        raise LeituraInvalida('Envie uma lista de registros')
+    if len(payload) > MAX_LEITURAS:
+        raise LeituraInvalida(f'No máximo {MAX_LEITURAS} registros por envio')
+
+    leituras = []
+    for item in payload:
+        if not isinstance(item, dict):
+            raise LeituraInvalida('Cada registro deve ser um objeto')
+        try:
+            leitura = {
+                'register_date': _data(item.get('register_date')),
+                'location_id'  : int(item['location_id']),
+                'frequency'    : float(item['frequency']),
+            }
+        except LeituraInvalida:
+            raise
+        except (KeyError, TypeError, ValueError, OverflowError):
+            raise LeituraInvalida(f'Registro inválido: {item!r}')
+        # O JSON do Python aceita NaN e Infinity
+        if not math.isfinite(leitura['frequency']):
+            raise LeituraInvalida(f'frequency inválida: {item["frequency"]!r}')
+        leituras.append(leitura)
+    return leituras
+
+
+def registrar_leituras(session, arduino_id, leituras):
+    """
+    Marca as leituras suspeitas, grava as leituras de um arduino e
+    atualiza rollups e métricas de saúde.
+
+    Não faz commit: quem chama decide a transação.
+    """
+    locais = {leitura['location_id'] for leitura in leituras}
+    existentes = set(session.scalars(sa.select(Location.id).where(Location.id.in_(locais))))
+    if locais - existentes:
+        raise LeituraInvalida(f'Localização inexistente: {sorted(locais - existentes)}')
+
+    # Os registros levam a organização do arduino, que lidera os índices dos painéis
+    org_id = session.scalar(sa.select(Arduino.org_id).where(Arduino.id == arduino_id))
+
+    detector = anomaly.get_detector(current_app)
+    estado = detector.avaliar(
+        arduino_id,
+        leituras,
+        semente=lambda: health.semente(session, arduino_id),
+    )
+    # O estado do detector só avança se o envio for gravado
+    anomaly.aplicar_no_commit(session, detector, arduino_id, estado)
+
+    registros = session.execute(
+        sa.insert(UVRegister).returning(
+            UVRegister.id,
+            UVRegister.arduino_id,
+            UVRegister.org_id,
+            UVRegister.location_id,
+            UVRegister.register_date,
+            UVRegister.frequency,
+            UVRegister.flag,
+        ),
+        [dict(leitura, arduino_id=arduino_id, org_id=org_id) for leitura in leituras],
+    ).all()
+
+    rollups.registrar(session, registros)
+    health.registrar(session, registros, current_app.config['DEVICE_GAP_SECONDS'])
+    return registros
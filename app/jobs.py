@@ -0,0 +1,363 @@
+# app/jobs.py
+"""
+Tarefas em segundo plano, com a fila guardada no próprio banco.
+
+Quem precisa de um trabalho pesado (backup, reconstrução de rollups,
+exportação) chama `enfileirar`, que só grava uma linha em `job`; o
+worker (`flask uv worker`), um processo à parte dos que atendem as
+requisições, reserva as tarefas prontas e as executa em um pool de
+threads ou de processos. Não há broker: a reserva é um UPDATE
+condicional (estado pendente -> executando), então vários workers podem
+dividir a mesma fila.
+
+Uma tarefa que falha volta para a fila com espera exponencial
+(JOBS_BACKOFF_SECONDS, dobrando a cada tentativa, até
+JOBS_BACKOFF_MAX_SECONDS) até esgotar as tentativas. Enquanto executa, uma
+thread grava o progresso e um sinal de vida a cada JOBS_HEARTBEAT_SECONDS;
+tarefas sem sinal há JOBS_TIMEOUT_SECONDS (o worker caiu) são retomadas.
+As tarefas de JOBS_PERIODIC são enfileiradas pelo próprio worker.
+
+As tarefas são funções registradas com @tarefa (ver app.tarefas) e
+recebem um Contexto e os parâmetros gravados no job.
+"""
+import os
+import random
+import socket
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+
+import sqlalchemy as sa
+
+from app import db
+from app.models import Job
+
+PENDENTE = 'pendente'
+EXECUTANDO = 'executando'
+CONCLUIDO = 'concluido'
+FALHOU = 'falhou'
+
+# nome -> (função, tentativas)
+_tarefas = {}
+
+# Aplicação usada por _executar: a do worker (threads) ou uma por processo
+_app = None
+
+
+class JobInvalido(ValueError):
+    pass
+
+
+def tarefa(nome, tentativas=3):
+    """
+    Registra a função como a tarefa `nome`. Ela é chamada como
+    funcao(contexto, **params) e o retorno (JSON) vira o resultado do job.
+    """
+    def registrar(funcao):
+        _tarefas[nome] = (funcao, tentativas)
+        return funcao
+    return registrar
+
+
+def tipos():
+    return sorted(_tarefas)
+
+
+def _agora():
+    return datetime.now(timezone.utc)
+
+
+def enfileirar(session, tipo, params=None, user_id=None, org_id=None):
+    """
+    Põe uma tarefa na fila. Não faz commit: quem chama decide a transação.
+    """
+    if tipo not in _tarefas:
+        raise JobInvalido(f'Tarefa desconhecida: {tipo}')
+    job = Job(
+        kind=tipo,
+        params=params or {},
+        max_attempts=_tarefas[tipo][1],
+        run_at=_agora(),
+        user_id=user_id,
+        org_id=org_id,
+    )
+    session.add(job)
+    return job
+
+
+def enfileirar_periodica(session, tipo):
+    """
+    Enfileira `tipo` se não houver um job dele pendente ou executando (vários
+    workers não acumulam cópias). Faz commit. Retorna o job ou None.
+    """
+    existente = session.scalar(
+        sa.select(Job.id).where(Job.kind == tipo, Job.state.in_([PENDENTE, EXECUTANDO])).limit(1)
+    )
+    if existente is not None:
+        session.rollback()
+        return None
+    job = enfileirar(session, tipo)
+    session.commit()
+    return job
+
+
+def espera(tentativas, base, maximo):
+    """
+    Segundos até a próxima tentativa, depois de `tentativas` falhas.
+    """
+    atraso = min(base * 2 ** (tentativas - 1), maximo)
+    # Um pouco de ruído para tarefas que falharam juntas não voltarem juntas
+    return atraso + random.uniform(0, atraso / 10)
+
+
+def reservar(session, worker):
+    """
+    Marca a próxima tarefa pronta como executando por `worker`. Retorna o id ou None.
+    """
+    while True:
+        agora = _agora()
+        consulta = (
+            sa.select(Job.id)
+            .where(Job.state == PENDENTE, Job.run_at <= agora)
+            .order_by(Job.run_at, Job.id)
+            .limit(1)
+        )
+        if session.get_bind().dialect.name == 'postgresql':
+            consulta = consulta.with_for_update(skip_locked=True)
+        job_id = session.scalar(consulta)
+        if job_id is None:
+            session.rollback()
+            return None
+
+        # Condicional: se outro worker reservou antes, tenta a próxima
+        resultado = session.execute(
+            sa.update(Job)
+            .where(Job.id == job_id, Job.state == PENDENTE)
+            .values(state=EXECUTANDO, worker=worker, attempts=Job.attempts + 1,
+                    started_at=agora, heartbeat_at=agora, done=0, total=None, message=None),
+            execution_options={'synchronize_session': False},
+        )
+        session.commit()
+        if resultado.rowcount:
+            return job_id
+
+
+def recuperar(session, timeout):
+    """
+    Devolve à fila as tarefas sem sinal de vida há `timeout` segundos, ou as
+    encerra se já esgotaram as tentativas. Retorna quantas foram afetadas.
+    """
+    agora = _agora()
+    parada = sa.and_(Job.state == EXECUTANDO, Job.heartbeat_at < agora - timedelta(seconds=timeout))
+    desistidas = session.execute(
+        sa.update(Job)
+        .where(parada, Job.attempts >= Job.max_attempts)
+        .values(state=FALHOU, error='Worker interrompido', finished_at=agora),
+        execution_options={'synchronize_session': False},
+    ).rowcount
+    retomadas = session.execute(
+        sa.update(Job)
+        .where(parada)
+        .values(state=PENDENTE, run_at=agora),
+        execution_options={'synchronize_session': False},
+    ).rowcount
+    session.commit()
+    return desistidas + retomadas
+
+
+class Contexto:
+    """
+    Passado à tarefa em execução, para ela relatar o progresso.
+
+    `progresso` só guarda os valores; quem grava no banco é o Batimento,
+    em outra conexão, então relatar não custa nada à tarefa nem entra na
+    transação dela.
+    """
+
+    def __init__(self, job_id, app):
+        self.job_id = job_id
+        self.app = app
+        self.feitos = 0
+        self.total = None
+        self.mensagem = None
+
+    def progresso(self, feitos, total=None, mensagem=None):
+        self.feitos = feitos
+        if total is not None:
+            self.total = total
+        if mensagem is not None:
+            self.mensagem = mensagem[:200]
+
+
+class Batimento(threading.Thread):
+    """
+    Grava o progresso e o sinal de vida de uma tarefa a cada `intervalo` segundos.
+    """
+
+    def __init__(self, contexto, intervalo):
+        super().__init__(name=f'job-{contexto.job_id}', daemon=True)
+        self.contexto = contexto
+        self.intervalo = intervalo
+        self._parar = threading.Event()
+
+    def run(self):
+        while not self._parar.wait(self.intervalo):
+            self.gravar()
+
+    def gravar(self):
+        contexto = self.contexto
+        try:
+            with contexto.app.app_context(), db.engine.begin() as conexao:
+                conexao.execute(
+                    sa.update(Job)
+                    .where(Job.id == contexto.job_id, Job.state == EXECUTANDO)
+                    .values(heartbeat_at=_agora(), done=contexto.feitos,
+                            total=contexto.total, message=contexto.mensagem)
+                )
+        except sa.exc.OperationalError:
+            # Banco ocupado (SQLite com a tarefa escrevendo): fica para o próximo
+            contexto.app.logger.debug('Progresso do job %s não gravado', contexto.job_id)
+
+    def parar(self):
+        self._parar.set()
+        self.join()
+
+
+def _executar(job_id):
+    """
+    Executa a tarefa reservada `job_id` e grava o resultado ou a falha.
+    """
+    app = _app
+    with app.app_context():
+        job = db.session.get(Job, job_id)
+        funcao, _ = _tarefas.get(job.kind, (None, 0))
+        contexto = Contexto(job_id, app)
+        batimento = Batimento(contexto, app.config['JOBS_HEARTBEAT_SECONDS'])
+        batimento.start()
+        try:
+            if funcao is None:
+                raise JobInvalido(f'Tarefa desconhecida: {job.kind}')
+            resultado = funcao(contexto, **job.params)
+        except Exception as e:
+            db.session.rollback()
+            batimento.parar()
+            job = db.session.get(Job, job_id)
+            job.error = f'{type(e).__name__}: {e}'
+            if job.attempts < job.max_attempts and not isinstance(e, JobInvalido):
+                job.state = PENDENTE
+                job.run_at = _agora() + timedelta(seconds=espera(
+                    job.attempts,
+                    app.config['JOBS_BACKOFF_SECONDS'],
+                    app.config['JOBS_BACKOFF_MAX_SECONDS'],
+                ))
+                app.logger.warning('Job %s (%s) falhou; nova tentativa às %s',
+                                   job_id, job.kind, job.run_at)
+            else:
+                job.state = FALHOU
+                job.finished_at = _agora()
+                app.logger.exception('Job %s (%s) falhou', job_id, job.kind)
+            db.session.commit()
+            return False
+        else:
+            batimento.parar()
+            job = db.session.get(Job, job_id)
+            job.state = CONCLUIDO
+            job.result = resultado
+            job.done = contexto.feitos
+            job.total = contexto.total
+            job.message = contexto.mensagem
+            job.error = None
+            job.finished_at = _agora()
+            db.session.commit()
+            app.logger.info('Job %s (%s) concluído', job_id, job.kind)
+            return True
+        finally:
+            db.session.remove()
+
+
+def _iniciar_processo():
+    # Cada processo do pool tem a sua aplicação e as suas conexões
+    global _app
+    from app import create_app
+    _app = create_app()
+
+
+class Worker:
+    """
+    Reserva e executa tarefas com até `paralelo` delas ao mesmo tempo, em
+    threads ou (com `processos`) em processos, para tarefas que usam a CPU.
+    """
+
+    def __init__(self, app, paralelo=2, processos=False):
+        self.app = app
+        self.paralelo = paralelo
+        self.processos = processos
+        self.nome = f'{socket.gethostname()}:{os.getpid()}'
+        self.parar = threading.Event()
+
+    def _pool(self):
+        if self.processos:
+            return ProcessPoolExecutor(max_workers=self.paralelo, initializer=_iniciar_processo)
+        global _app
+        _app = self.app
+        return ThreadPoolExecutor(max_workers=self.paralelo, thread_name_prefix='job')
+
+    def rodar(self, ate_esvaziar=False):
+        """
+        Executa tarefas até `parar` ser sinalizado (ou, com `ate_esvaziar`,
+        até não haver mais tarefas prontas).
+        """
+        config = self.app.config
+        intervalo = config['JOBS_POLL_SECONDS']
+        proxima_recuperacao = 0
+        proximas_periodicas = dict.fromkeys(config['JOBS_PERIODIC'], 0)
+        em_execucao = set()
+        with self._pool() as pool, self.app.app_context():
+            try:
+                while not self.parar.is_set():
+                    if time.monotonic() >= proxima_recuperacao:
+                        if recuperar(db.session, config['JOBS_TIMEOUT_SECONDS']):
+                            self.app.logger.warning('Jobs parados devolvidos à fila')
+                        proxima_recuperacao = time.monotonic() + config['JOBS_TIMEOUT_SECONDS'] / 2
+
+                    for tipo, proxima in proximas_periodicas.items():
+                        if time.monotonic() >= proxima:
+                            enfileirar_periodica(db.session, tipo)
+                            proximas_periodicas[tipo] = time.monotonic() + config['JOBS_PERIODIC'][tipo]
+
+                    while len(em_execucao) < self.paralelo:
+                        job_id = reservar(db.session, self.nome)
+                        if job_id is None:
+                            break
+                        em_execucao.add(pool.submit(_executar, job_id))
+
+                    if not em_execucao:
+                        if ate_esvaziar:
+                            return
+                        self.parar.wait(intervalo)
+                        continue
+
+                    prontos, em_execucao = wait(em_execucao, timeout=intervalo,
+                                                return_when=FIRST_COMPLETED)
+                    for futuro in prontos:
+                        if futuro.exception() is not None:
+                            self.app.logger.error('Falha no worker: %r', futuro.exception())
+            finally:
+                db.session.remove()
+
+
+def como_dict(job):
+    return {
+        'id'         : job.id,
+        'kind'       : job.kind,
+        'state'      : job.state,
+        'attempts'   : job.attempts,
+        'done'       : job.done,
+        'total'      : job.total,
+        'message'    : job.message,
+        'error'      : job.error,
+        'result'     : job.result,
+        'created_at' : job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
@@ -0,0 +1,631 @@
+# app/main/routes.py
+from app          import db, analytics, anomaly, rollups, identity, avatars, exclusao, feed, series, jobs, tarefas
+from app.main     import bp
+from app.device_auth import gerar_chave, revogar
+from flask        import render_template, flash, redirect, url_for, request, jsonify, current_app, abort, Response, send_file
+from app.forms    import EditProfileForm
+from app.models   import User, UVRegister, Arduino, Location, Arduino_Components, Components, Category, Post, UVRollup, ArduinoStats, ArduinoKey, Job, UVChunk
+from datetime     import datetime, timezone, timedelta, date, time
+from flask_login import current_user, login_required
+import sqlalchemy as sa
+import sqlalchemy.orm as so
+from sqlalchemy import func
+from flask_wtf.csrf import validate_csrf
+from wtforms import ValidationError
+
+
+@bp.route('/')
+@bp.route('/index')
+@login_required
+def index():
+    # Leituras marcadas como suspeitas (flag != 0) ficam fora dos painéis,
+    # e cada usuário só vê as da sua organização
+    da_org = UVRegister.org_id == current_user.org_id
+    registers = db.session.query(UVRegister, Location)\
+                .join(Location, UVRegister.location_id == Location.id)\
+                .filter(da_org, UVRegister.flag == 0).all()
+
+    # Registros por dia da semana atual, de segunda a domingo
+    inicio = series.semana()
+    semana = series.serie(db.session, UVRegister.register_date, inicio, 7,
+                          filtros=(da_org, UVRegister.flag == 0))
+
+    labels = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo']
+    values = [intervalo.count for intervalo in semana]
+    inicio_semana = inicio.date().isoformat()
+
+    # O painel continua a partir daqui com /api/registros/stream
+    ultimo_id = max((uv_register.id for uv_register, _ in registers), default=0)
+
+    return render_template('index.html', registers=registers, labels=labels, values=values,
+                           ultimo_id=ultimo_id, inicio_semana=inicio_semana)
+
+@bp.route('/user/<username>')
+@login_required
+def user(username):
+    user = db.first_or_404(sa.select(User).where(User.username == username,
+                                               User.org_id == current_user.org_id))
+    
+    # Posts do usuário, uma página por vez (keyset, com o autor no mesmo SELECT)
+    try:
+        posts, proximo = feed.pagina(db.session, user.id, request.args.get('depois'))
+    except feed.CursorInvalido:
+        abort(400)
+    posts_count = db.session.scalar(
+        sa.select(func.count(Post.id)).where(Post.user_id == user.id))
+    
+    arduinos_count = db.session.scalar(
+        sa.select(func.count(Arduino.id))
+        .where(Arduino.user_id == user.id, Arduino.deleted_at.is_(None)))
+
+    # Os cards dos arduinos ficam em cache de fragmento; só são
+    # consultados quando o template renderiza o bloco
+    def arduinos_componentes():
+        arduinos = db.session.scalars(
+            sa.select(Arduino)
+            .where(Arduino.user_id == user.id, Arduino.deleted_at.is_(None))
+            .order_by(Arduino.register_day.desc())
+        ).all()
+
+        componentes = {arduino.id: [] for arduino in arduinos}
+        for ac, component, category in db.session.execute(
+            sa.select(
+                Arduino_Components,
+                Components,
+                Category
+            )
+            .join(Components, Arduino_Components.component_id == Components.id)
+            .join(Category, Components.category_id == Category.id)
+            .where(Arduino_Components.arduino_id.in_(list(componentes)))
+        ):
+            componentes[ac.arduino_id].append((ac, component, category))
+        return [(arduino, componentes[arduino.id]) for arduino in arduinos]
+
+    return render_template('user.html',
+                         user=user,
+                         posts=posts,
+                         posts_count=posts_count,
+                         proximo=proximo,
+                         arduinos_count=arduinos_count,
+                         arduinos_componentes=arduinos_componentes)
+
+@bp.route('/edit_profile', methods=['GET', 'POST'])
+@login_required
+def edit_profile():
+    form = EditProfileForm()
+    if form.validate_on_submit():
+        # current_user é uma cópia imutável; a alteração vai no User do banco
+        user = db.session.get(User, current_user.id)
+        user.username = form.username.data
+        user.about_me = form.about_me.data
+        db.session.commit()
+        identity.invalidar(user.id)
+        flash('Your changes have been saved.')
+        return redirect(url_for('main.edit_profile'))
+    elif request.method == 'GET':
+        form.username.data = current_user.username
+        form.about_me.data = current_user.about_me
+    return render_template('edit_profile.html', title='Edit Profile', form=form)
+
+@bp.route('/assembly_arduinos', methods=['GET', 'POST'])
+@login_required
+def assembly_arduinos():
+    if request.method == 'POST':
+        categories_with_components = _catalogo()
+        try:
+            # Valida o token CSRF
+            validate_csrf(request.form.get('csrf_token'))
+            
+            # Criar novo Arduino
+            new_arduino = Arduino(
+                user_id=current_user.id,
+                org_id=current_user.org_id,
+                register_day=datetime.now(timezone.utc)
+            )
+            db.session.add(new_arduino)
+            db.session.flush()
+            
+            for category_data in categories_with_components:
+                for component in category_data['components']:
+                    quantity = request.form.get(f'component_{component.id}', 0, type=int)
+                    if quantity > 0:
+                        arduino_component = Arduino_Components(
+                            arduino_id=new_arduino.id,
+                            component_id=component.id,
+                            quantity=quantity
+                        )
+                        db.session.add(arduino_component)
+            
+            db.session.commit()
+            flash('Arduino cadastrado com sucesso!', 'success')
+            return redirect(url_for('main.assembly_arduinos'))
+        
+        except ValidationError:
+            db.session.rollback()
+            flash('Token CSRF inválido. Por favor, tente novamente.', 'danger')
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Erro ao montar Arduino: {str(e)}', 'danger')
+    
+    user_arduinos = Arduino.query.filter_by(user_id=current_user.id, deleted_at=None).all()
+    
+    # O catálogo fica em cache de fragmento; só é consultado quando o
+    # template renderiza o bloco
+    return render_template('assembly_arduinos.html', 
+                         categories_with_components=_catalogo,
+                         user_arduinos=user_arduinos)
+
+def _catalogo():
+    categories = db.session.query(Category)\
+             .join(Components, Category.id == Components.category_id)\
+             .order_by(Category.name)\
+             .all()
+
+    components = {category.id: [] for category in categories}
+    for component in db.session.scalars(
+        sa.select(Components).where(Components.category_id.in_(list(components)))
+    ):
+        components[component.category_id].append(component)
+
+    return [
+        {'category': category, 'components': components[category.id]}
+        for category in categories
+    ]
+
+@bp.route('/editar_registro')
+def editar_registro():
+    return render_template('editar_registro.html', exibir_botao_voltar=True)
+
+@bp.route('/estatistica')
+@login_required
+def estatistica():
+    org_id = current_user.org_id
+    active_arduinos_count = Arduino.query.filter_by(org_id=org_id, deleted_at=None).count()
+
+    recent_registers = db.session.query(
+        UVRegister,
+        Location
+    ).join(Location, UVRegister.location_id == Location.id)\
+     .filter(UVRegister.org_id == org_id, UVRegister.flag == 0)\
+     .order_by(UVRegister.register_date.desc())\
+     .limit(10).all()
+
+    colunas = _colunas_snapshot(org_id)
+    if colunas is not None:
+        estatisticas = _estatistica_colunar(colunas)
+    else:
+        estatisticas = _estatistica_sql(org_id)
+
+    # Quantis, mínimo/máximo e histogramas a partir dos rollups dos últimos
+    # STATS_ROLLUP_DAYS dias. Só leitura: o ingest os mantém, e a tarefa
+    # periódica atualizar-rollups inclui o que entrou por fora dele
+    rollup_days = current_app.config['STATS_ROLLUP_DAYS']
+    da_org = (UVRollup.org_id == org_id, rollups.desde(rollup_days))
+    location_stats = rollups.resumo_por(db.session, UVRollup.location_id, *da_org)
+    locations = {
+        location.id: location
+        for location in db.session.scalars(
+            sa.select(Location).where(Location.id.in_(list(location_stats)))
+        )
+    }
+
+    return render_template('estatistica.html',
+                         active_arduinos_count=active_arduinos_count,
+                         recent_registers=recent_registers,
+                         rollup_days=rollup_days,
+                         distribution=rollups.resumo_geral(db.session, *da_org),
+                         distribution_labels=rollups.faixas_labels(),
+                         location_stats=[(locations[id], stats) for id, stats in location_stats.items()
+                                         if id in locations],
+                         arduino_stats=rollups.resumo_por(db.session, UVRollup.arduino_id, *da_org),
+                         **estatisticas)
+
+def _estatistica_sql(org_id):
+    # Os dias arquivados (app.arquivo) vêm dos rollups, que têm contagem e
+    # soma por arduino, local e dia: a página não descomprime os blocos.
+    # Todo dia até o último arquivado foi arquivado inteiro; os registros
+    # que chegaram atrasados para ele também já estão nos rollups
+    arquivado_ate = db.session.scalar(
+        sa.select(func.max(UVChunk.day)).where(UVChunk.org_id == org_id)
+    )
+    filtros = [UVRegister.org_id == org_id, UVRegister.flag == 0]
+    if arquivado_ate is not None:
+        filtros.append(UVRegister.register_date >= datetime.combine(arquivado_ate + timedelta(days=1), time()))
+        dias_arquivados = (UVRollup.org_id == org_id, UVRollup.day <= arquivado_ate)
+
+    # Registros e soma das frequências por localização
+    por_local = {
+        location_id: [count, total]
+        for location_id, count, total in db.session.execute(
+            sa.select(UVRegister.location_id, func.count(), func.sum(UVRegister.frequency))
+            .where(*filtros)
+            .group_by(UVRegister.location_id)
+        )
+    }
+    if arquivado_ate is not None:
+        for location_id, count, total in db.session.execute(
+            sa.select(UVRollup.location_id, func.sum(UVRollup.count), func.sum(UVRollup.total))
+            .where(*dias_arquivados)
+            .group_by(UVRollup.location_id)
+        ):
+            local = por_local.setdefault(location_id, [0, 0.0])
+            local[0] += count
+            local[1] += total
+
+    # Estatísticas básicas
+    uv_registers_count = sum(count for count, _ in por_local.values())
+    soma = sum(total for _, total in por_local.values())
+
+    # Média por dia nos últimos 30 dias
+    inicio = series.ultimos_dias(30)
+    chart_data = series.serie(db.session, UVRegister.register_date, inicio, 30,
+                              valor=UVRegister.frequency, filtros=filtros)
+    por_dia = [[intervalo.count, (intervalo.media or 0.0) * intervalo.count] for intervalo in chart_data]
+    if arquivado_ate is not None:
+        # Os rollups são por dia UTC; cada um entra no dia de mesma data do gráfico
+        for dia, count, total in db.session.execute(
+            sa.select(UVRollup.day, func.sum(UVRollup.count), func.sum(UVRollup.total))
+            .where(*dias_arquivados, UVRollup.day >= inicio.date())
+            .group_by(UVRollup.day)
+        ):
+            numero = (dia - inicio.date()).days
+            if 0 <= numero < len(por_dia):
+                por_dia[numero][0] += count
+                por_dia[numero][1] += total
+
+    top = sorted(por_local.items(), key=lambda item: item[1][0], reverse=True)[:5]
+    locations = {
+        location.id: location
+        for location in db.session.scalars(
+            sa.select(Location).where(Location.id.in_([id for id, _ in top]))
+        )
+    }
+
+    return {
+        'uv_registers_count': uv_registers_count,
+        'average_frequency': soma / uv_registers_count if uv_registers_count else 0,
+        'top_locations': [(locations[id], count, total / count) for id, (count, total) in top
+                          if id in locations],
+        'chart_labels': [intervalo.inicio.date().isoformat() for intervalo in chart_data],
+        'chart_values': [total / count if count else None for count, total in por_dia],
+    }
+
+def _colunas_snapshot(org_id):
+    # Só lê: a tarefa atualizar-snapshots é quem grava. Sem snapshot pronto
+    # (antes da primeira execução, ou durante uma reconstrução), usa o SQL
+    if not (current_app.config['ANALYTICS_COLUMNAR'] and analytics.disponivel()):
+        return None
+    snapshot = analytics.get_snapshot(current_app.config['ANALYTICS_DIR'], org_id)
+    if not snapshot.pronto():
+        return None
+    return snapshot.colunas()
+
+def _estatistica_colunar(colunas):
+    # Mesmos números do caminho SQL, calculados sobre o snapshot colunar
+    resumo = analytics.resumo(colunas)
+    top = analytics.top_locations(colunas)
+    locations = {
+        location.id: location
+        for location in db.session.scalars(
+            sa.select(Location).where(Location.id.in_([id for id, _, _ in top]))
+        )
+    }
+    chart_labels, chart_values = analytics.media_por_dia(colunas, series.ultimos_dias(30), 30)
+    hourly_counts, hourly_values = analytics.histograma_horario(colunas)
+
+    return {
+        'uv_registers_count': resumo['count'],
+        'average_frequency': resumo['average'],
+        'percentiles': resumo,
+        'top_locations': [(locations[id], count, avg) for id, count, avg in top if id in locations],
+        'chart_labels': chart_labels,
+        'chart_values': chart_values,
+        'hourly_counts': hourly_counts,
+        'hourly_values': hourly_values,
+    }
+
+@bp.route('/manual')
+@login_required
+def manual():
+    return render_template('manual.html', title='Manual', exibir_botao_voltar=True)
+
+@bp.before_app_request
+def before_request():
+    if current_user.is_authenticated:
+        identity.registrar_acesso(current_user.id)
+
+@bp.route('/excluir_arduino/<int:arduino_id>', methods=['POST'])
+@login_required
+def excluir_arduino(arduino_id):
+    try:
+        # Verifica o token CSRF
+        validate_csrf(request.form.get('csrf_token'))
+    except ValidationError:
+        flash('Token CSRF inválido ou expirado', 'danger')
+        return redirect(url_for('main.user', username=current_user.username))
+    
+    # Restante da lógica de exclusão...
+    arduino = db.session.scalar(
+        sa.select(Arduino)
+        .where(Arduino.id == arduino_id, Arduino.user_id == current_user.id,
+               Arduino.deleted_at.is_(None))
+    )
+    
+    if not arduino:
+        flash('Arduino não encontrado ou você não tem permissão para excluí-lo', 'danger')
+        return redirect(url_for('main.user', username=current_user.username))
+    
+    try:
+        # Só oculta o arduino e revoga as chaves; os registros são apagados
+        # em lotes em segundo plano e o resto sai pelo ON DELETE CASCADE
+        exclusao.marcar(db.session, arduino)
+        exclusao.agendar(db.session, arduino, current_user.id)
+        db.session.commit()
+        # O arduino não envia mais (chaves revogadas): o estado do detector
+        # deste processo não serve para nada
+        anomaly.esquecer(current_app, arduino.id)
+        flash('Arduino excluído com sucesso! Os registros dele estão sendo apagados.', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Erro ao excluir Arduino: {str(e)}', 'danger')
+    
+    return redirect(url_for('main.user', username=current_user.username))
+
+@bp.route('/arduino/<int:arduino_id>')
+@login_required
+def arduino_detalhes(arduino_id):
+    # Corrigindo para usar first() ou one() em vez de filter()
+    arduino = db.session.query(Arduino)\
+             .filter(Arduino.id == arduino_id, Arduino.user_id == current_user.id,
+                     Arduino.deleted_at.is_(None))\
+             .first()
+    
+    if not arduino:
+        flash('Arduino não encontrado ou você não tem permissão para acessá-lo', 'danger')
+        return redirect(url_for('main.user', username=current_user.username))
+    
+    components = db.session.query(
+        Arduino_Components,
+        Components,
+        Category
+    ).join(
+        Components, Arduino_Components.component_id == Components.id
+    ).join(
+        Category, Components.category_id == Category.id
+    ).filter(
+        Arduino_Components.arduino_id == arduino_id
+    ).all()
+    
+    stats = db.session.get(ArduinoStats, arduino_id)
+    keys = db.session.scalars(
+        sa.select(ArduinoKey)
+        .where(ArduinoKey.arduino_id == arduino_id)
+        .order_by(ArduinoKey.created_at.desc())
+    ).all()
+    
+    return render_template('arduino_detalhes.html',
+                         arduino=arduino,
+                         components=components,
+                         total=arduino.total_cost,
+                         stats=stats,
+                         keys=keys,
+                         gap_seconds=current_app.config['DEVICE_GAP_SECONDS'])
+
+@bp.route('/arduino/<int:arduino_id>/chaves', methods=['POST'])
+@login_required
+def gerar_chave_arduino(arduino_id):
+    arduino = db.session.scalar(
+        sa.select(Arduino)
+        .where(Arduino.id == arduino_id, Arduino.user_id == current_user.id,
+               Arduino.deleted_at.is_(None))
+    )
+    if not arduino:
+        flash('Arduino não encontrado ou você não tem permissão para acessá-lo', 'danger')
+        return redirect(url_for('main.user', username=current_user.username))
+
+    _, token = gerar_chave(db.session, arduino.id)
+    db.session.commit()
+    flash(f'Nova chave de API: {token} — copie agora, ela não será exibida novamente.', 'success')
+    return redirect(url_for('main.arduino_detalhes', arduino_id=arduino.id))
+
+@bp.route('/arduino/<int:arduino_id>/chaves/<int:key_id>/revogar', methods=['POST'])
+@login_required
+def revogar_chave_arduino(arduino_id, key_id):
+    chave = db.session.scalar(
+        sa.select(ArduinoKey)
+        .join(Arduino, ArduinoKey.arduino_id == Arduino.id)
+        .where(ArduinoKey.id == key_id,
+               Arduino.id == arduino_id,
+               Arduino.user_id == current_user.id,
+               Arduino.deleted_at.is_(None))
+    )
+    if not chave:
+        flash('Chave não encontrada', 'danger')
+    elif chave.revoked_at is None:
+        revogar(db.session, chave)
+        db.session.commit()
+        flash('Chave revogada', 'success')
+    return redirect(url_for('main.arduino_detalhes', arduino_id=arduino_id))
+
+@bp.route('/frota')
+@login_required
+def frota():
+    page = request.args.get('page', 1, type=int)
+    ordem = request.args.get('ordem', 'id')
+    # Custo já materializado em Arduino: ordenar é usar o índice (user_id, total_cost)
+    ordenacao = (Arduino.total_cost.desc(), Arduino.id) if ordem == 'custo' else (Arduino.id,)
+
+    # Uma consulta só: arduinos do usuário com as métricas já calculadas
+    arduinos = db.paginate(
+        sa.select(Arduino)
+        .options(so.joinedload(Arduino.stats))
+        .where(Arduino.user_id == current_user.id, Arduino.deleted_at.is_(None))
+        .order_by(*ordenacao),
+        page=page,
+        per_page=50,
+        error_out=False,
+    )
+    custo_total = db.session.scalar(
+        sa.select(func.coalesce(func.sum(Arduino.total_cost), 0.0))
+        .where(Arduino.user_id == current_user.id, Arduino.deleted_at.is_(None))
+    )
+    return render_template('frota.html',
+                         arduinos=arduinos,
+                         ordem=ordem,
+                         custo_total=custo_total,
+                         agora=datetime.now(timezone.utc).replace(tzinfo=None),
+                         gap_seconds=current_app.config['DEVICE_GAP_SECONDS'])
+
+@bp.route('/editar_arduino/<int:arduino_id>', methods=['GET', 'POST'])
+@login_required
+def editar_arduino(arduino_id):
+    # Verifica se o Arduino pertence ao usuário atual
+    arduino = db.session.scalar(
+        sa.select(Arduino)
+        .where(Arduino.id == arduino_id, Arduino.user_id == current_user.id,
+               Arduino.deleted_at.is_(None))
+    )
+    
+    if not arduino:
+        flash('Arduino não encontrado ou você não tem permissão para editá-lo', 'danger')
+        return redirect(url_for('main.user', username=current_user.username))
+
+    # Busca todas as categorias e componentes disponíveis
+    categories = db.session.query(Category)\
+             .join(Components, Category.id == Components.category_id)\
+             .order_by(Category.name)\
+             .all()
+    
+    categories_with_components = []
+    for category in categories:
+        components = Components.query.filter_by(category_id=category.id).all()
+        categories_with_components.append({
+            'category': category,
+            'components': components
+        })
+
+    # Busca os componentes já selecionados para este Arduino
+    selected_components = db.session.query(
+        Arduino_Components.component_id,
+        Arduino_Components.quantity
+    ).filter(
+        Arduino_Components.arduino_id == arduino_id
+    ).all()
+    
+    selected_components_dict = {sc.component_id: sc.quantity for sc in selected_components}
+
+    if request.method == 'POST':
+        try:
+            # Atualiza a data de cadastro se fornecida
+            new_date = request.form.get('register_day')
+            if new_date:
+                arduino.register_day = datetime.strptime(new_date, '%Y-%m-%d')
+
+            # Processa os componentes do formulário
+            for category_data in categories_with_components:
+                for component in category_data['components']:
+                    quantity = request.form.get(f'component_{component.id}', 0, type=int)
+                    
+                    # Se já existe, atualiza a quantidade
+                    if component.id in selected_components_dict:
+                        if quantity > 0:
+                            db.session.execute(
+                                sa.update(Arduino_Components)
+                                .where(Arduino_Components.arduino_id == arduino_id)
+                                .where(Arduino_Components.component_id == component.id)
+                                .values(quantity=quantity)
+                            )
+                        else:
+                            db.session.execute(
+                                sa.delete(Arduino_Components)
+                                .where(Arduino_Components.arduino_id == arduino_id)
+                                .where(Arduino_Components.component_id == component.id)
+                            )
+                    # Se não existe e quantidade > 0, adiciona novo
+                    elif quantity > 0:
+                        new_component = Arduino_Components(
+                            arduino_id=arduino_id,
+                            component_id=component.id,
+                            quantity=quantity
+                        )
+                        db.session.add(new_component)
+
+            db.session.commit()
+            flash('Arduino atualizado com sucesso!', 'success')
+            return redirect(url_for('main.arduino_detalhes', arduino_id=arduino_id))
+        
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Erro ao atualizar Arduino: {str(e)}', 'danger')
+
+    return render_template('editar_arduino.html',
+                         arduino=arduino,
+                         categories_with_components=categories_with_components,
+                         selected_components=selected_components_dict)
+
+@bp.route('/avatar/<digest>')
+def avatar(digest):
+    if not avatars.digest_valido(digest):
+        abort(404)
+    svg = avatars.identicon(digest, request.args.get('s', 80, type=int))
+    resposta = Response(svg, mimetype='image/svg+xml')
+    # A imagem depende só da URL: o navegador não precisa revalidar
+    resposta.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return resposta
+
+@bp.route('/tarefas')
+@login_required
+def tarefas_usuario():
+    # Tarefas em segundo plano pedidas pelo usuário; a página acompanha o
+    # progresso das que ainda não terminaram por /api/jobs/<id>
+    lista = db.session.scalars(
+        sa.select(Job)
+        .where(Job.user_id == current_user.id)
+        .order_by(Job.id.desc())
+        .limit(50)
+    ).all()
+    arduinos = db.session.scalars(
+        sa.select(Arduino)
+        .where(Arduino.user_id == current_user.id, Arduino.deleted_at.is_(None))
+        .order_by(Arduino.id)
+    ).all()
+    return render_template('tarefas.html', title='Tarefas', jobs=lista, arduinos=arduinos)
+
+@bp.route('/tarefas/exportar', methods=['POST'])
+@login_required
+def exportar_registros():
+    try:
+        validate_csrf(request.form.get('csrf_token'))
+    except ValidationError:
+        flash('Token CSRF inválido ou expirado', 'danger')
+        return redirect(url_for('main.tarefas_usuario'))
+
+    arduino_id = request.form.get('arduino_id', type=int)
+    if arduino_id is not None and not db.session.scalar(
+        sa.select(Arduino.id)
+        .where(Arduino.id == arduino_id, Arduino.user_id == current_user.id,
+               Arduino.deleted_at.is_(None))
+    ):
+        flash('Arduino não encontrado', 'danger')
+        return redirect(url_for('main.tarefas_usuario'))
+
+    # A exportação roda no worker (flask uv worker), fora desta requisição
+    jobs.enfileirar(db.session, 'exportar-registros',
+                    {'org_id': current_user.org_id, 'arduino_id': arduino_id},
+                    user_id=current_user.id, org_id=current_user.org_id)
+    db.session.commit()
+    flash('Exportação na fila. O arquivo aparece aqui quando ficar pronto.', 'success')
+    return redirect(url_for('main.tarefas_usuario'))
+
+@bp.route('/tarefas/<int:job_id>/arquivo')
+@login_required
+def arquivo_exportado(job_id):
+    job = db.session.scalar(
+        sa.select(Job)
+        .where(Job.id == job_id, Job.user_id == current_user.id,
+               Job.kind == 'exportar-registros', Job.state == jobs.CONCLUIDO)
+    )
+    if job is None:
+        abort(404)
+    return send_file(tarefas.arquivo_exportacao(job.id), mimetype='text/csv',
+                     as_attachment=True, download_name=f'registros_{job.id}.csv')
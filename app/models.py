@@ -1,15 +1,32 @@
-from datetime import datetime, timezone
+from datetime import datetime, timezone, date
 from typing import Optional
 import sqlalchemy as sa
 import sqlalchemy.orm as so
 from sqlalchemy import DateTime, Integer
-from app import db
+from app import db, passwords
 from hashlib import md5
 from werkzeug.security import (
         generate_password_hash, 
         check_password_hash)
+from flask import current_app, url_for
 from flask_login import UserMixin
-from app import login
+
+class Organization(db.Model):
+    """
+    Classe de modelo de uma organização (escola) que usa a plataforma.
+    Usuários, arduinos e registros pertencem a uma organização, e cada um só vê os dados da sua.
+
+    id  : Identificador único da organização.
+    name: Nome da organização.
+    slug: Código informado no cadastro para entrar na organização.
+    """
+
+    id  : so.Mapped[int] = so.mapped_column(primary_key = True, autoincrement = True)
+    name: so.Mapped[str] = so.mapped_column(sa.String(100))
+    slug: so.Mapped[str] = so.mapped_column(sa.String(40), unique = True)
+
+    def __repr__(self):
+        return f"<Organization {self.slug}>"
 
 class User(UserMixin, db.Model):
     """
@@ -20,12 +37,14 @@ class User(UserMixin, db.Model):
     username       : Nome público do usuário (apelido/alias).
     password_hash: Senha criptografada do usuário.
     email          : Email do usuário. Pode ser usado para cadastro.
+    org_id         : Identificador único da organização do usuário.
     """
 
     id             : so.Mapped[int] = so.mapped_column(primary_key = True, autoincrement = True)
     username       : so.Mapped[str] = so.mapped_column(sa.String(100)) # Não presente na modelagem.
     password_hash: so.Mapped[str] = so.mapped_column(sa.String(256))
     email          : so.Mapped[str] = so.mapped_column(sa.String(120))
+    org_id         : so.Mapped[int] = so.mapped_column(sa.ForeignKey(Organization.id), index = True)
 
     posts          : so.WriteOnlyMapped['Post'] = so.relationship(
         back_populates='author'
@@ -40,20 +59,28 @@ class User(UserMixin, db.Model):
         return '<User: {}>'.format(self.username)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generate_password_hash(
+            password, method=current_app.config['PASSWORD_HASH_METHOD'])
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+    def needs_rehash(self):
+        # O método configurado pode omitir parâmetros; compara com o prefixo completo
+        metodo = self.password_hash.split('$', 1)[0]
+        return metodo != passwords.prefixo(current_app.config['PASSWORD_HASH_METHOD'])
+
     def avatar(self, size):
+        # Identicon gerado pela própria aplicação (ver app.avatars)
         digest = md5(self.email.lower().encode('utf-8')).hexdigest()
-        return f'https://www.gravatar.com/avatar/{digest}?d=identicon&s={size}'
-
-@login.user_loader
-def load_user(id):
-    return db.session.get(User, int(id))
+        return url_for('main.avatar', digest=digest, s=size)
 
 class Post(db.Model):
+    __table_args__ = (
+        # Feed de um usuário: WHERE user_id ORDER BY timestamp DESC, id DESC (ver app.feed)
+        sa.Index('ix_post_user_id_timestamp', 'user_id', 'timestamp'),
+    )
+
     id       : so.Mapped[int]      = so.mapped_column(primary_key = True, autoincrement = True)
     body     : so.Mapped[str]      = so.mapped_column(sa.String(140))
     timestamp: so.Mapped[datetime] = so.mapped_column(
@@ -71,19 +98,114 @@ class Arduino(db.Model):
     Classe de modelo de um arduino pertencente a um usuário.
     Usuários cadastram arduinos que realizaram coletas de frequência.
 
-    id          : Identificador único do arduino.
-    user_id     : Identificador único do usuário que cadastrou o arduino.
-    register_day: Dia de cadastro do arduino na plataforma.
+    id             : Identificador único do arduino.
+    user_id        : Identificador único do usuário que cadastrou o arduino.
+    org_id         : Identificador único da organização do arduino (a do usuário).
+    register_day   : Dia de cadastro do arduino na plataforma.
+    total_cost     : Custo dos componentes (soma de quantidade x preço), mantido por app.custos.
+    component_count: Quantidade de componentes (soma das quantidades), mantida por app.custos.
+    deleted_at     : Data do pedido de exclusão. O arduino fica oculto enquanto
+                     app.exclusao apaga os registros dele em lotes.
     """
+    __table_args__ = (
+        sa.Index('ix_arduino_user_id_total_cost', 'user_id', 'total_cost'),
+        sa.Index('ix_arduino_org_id_deleted_at', 'org_id', 'deleted_at'),
+    )
 
-    id          : so.Mapped[int]      = so.mapped_column(primary_key = True, autoincrement = True)
-    user_id     : so.Mapped[int]      = so.mapped_column(sa.ForeignKey(User.id),
-                                               index = True)
-    register_day: so.Mapped[datetime] = so.mapped_column(sa.DateTime)
+    id             : so.Mapped[int]                = so.mapped_column(primary_key = True, autoincrement = True)
+    user_id        : so.Mapped[int]                = so.mapped_column(sa.ForeignKey(User.id),
+                                                            index = True)
+    org_id         : so.Mapped[int]                = so.mapped_column(sa.ForeignKey(Organization.id))
+    register_day   : so.Mapped[datetime]           = so.mapped_column(sa.DateTime)
+    total_cost     : so.Mapped[float]              = so.mapped_column(default = 0.0, server_default = '0')
+    component_count: so.Mapped[int]                = so.mapped_column(default = 0, server_default = '0')
+    deleted_at     : so.Mapped[Optional[datetime]] = so.mapped_column(sa.DateTime)
+
+    stats       : so.Mapped[Optional['ArduinoStats']] = so.relationship(
+        back_populates='arduino', passive_deletes=True
+    )
 
     def __repr__(self):
         return f"<Arduino {self.id} -> User {self.user_id}>"
 
+class ArduinoKey(db.Model):
+    """
+    Classe de modelo das chaves de API usadas pelos arduinos para enviar registros.
+    A chave em si nunca é guardada, só o HMAC-SHA256 dela (ver app.device_auth).
+
+    id        : Identificador único da chave.
+    arduino_id: Identificador único do arduino dono da chave.
+    key_hash  : HMAC-SHA256 da chave, em hexadecimal.
+    prefix    : Início da chave, para o usuário reconhecê-la.
+    created_at: Data de criação da chave.
+    revoked_at: Data de revogação. Chaves revogadas não autenticam.
+    """
+    __tablename__ = "arduino_key"
+
+    id        : so.Mapped[int]                = so.mapped_column(primary_key = True, autoincrement = True)
+    arduino_id: so.Mapped[int]                = so.mapped_column(sa.ForeignKey(Arduino.id, ondelete = 'CASCADE'),
+                                                                   index = True)
+    key_hash  : so.Mapped[str]                = so.mapped_column(sa.String(64), unique = True)
+    prefix    : so.Mapped[str]                = so.mapped_column(sa.String(12))
+    created_at: so.Mapped[datetime]           = so.mapped_column(
+        default=lambda: datetime.now(timezone.utc)
+    )
+    revoked_at: so.Mapped[Optional[datetime]] = so.mapped_column()
+
+    def __repr__(self) -> str:
+        return f"<Chave {self.prefix}… -> Arduino {self.arduino_id}>"
+
+class ArduinoStats(db.Model):
+    """
+    Classe de modelo das métricas de saúde de um arduino.
+    Atualizada a cada envio de registros (ver app.health), nunca calculada a partir de UVRegister.
+
+    arduino_id         : Identificador único do arduino.
+    readings_count     : Quantidade de registros recebidos.
+    first_reading      : Data de coleta do registro mais antigo.
+    last_reading       : Data de coleta do registro mais recente.
+    hour_start         : Início da hora (UTC) da última coleta.
+    hour_count         : Registros coletados na hora `hour_start`.
+    previous_hour_count: Registros coletados na hora anterior a `hour_start`.
+    gap_count          : Quantas vezes o intervalo entre coletas passou de DEVICE_GAP_SECONDS.
+    max_gap_seconds    : Maior intervalo entre duas coletas seguidas, em segundos.
+    outlier_count      : Registros marcados como suspeitos pela detecção de anomalias.
+    mean               : Média das frequências (algoritmo de Welford).
+    m2                 : Soma dos quadrados dos desvios (algoritmo de Welford).
+    """
+    __tablename__ = "arduino_stats"
+
+    arduino_id         : so.Mapped[int]                = so.mapped_column(sa.ForeignKey(Arduino.id,
+                                                                                         ondelete = 'CASCADE'),
+                                                                          primary_key = True)
+    readings_count     : so.Mapped[int]                = so.mapped_column(default = 0)
+    first_reading      : so.Mapped[Optional[datetime]] = so.mapped_column(sa.DateTime)
+    last_reading       : so.Mapped[Optional[datetime]] = so.mapped_column(sa.DateTime, index = True)
+    hour_start         : so.Mapped[Optional[datetime]] = so.mapped_column(sa.DateTime)
+    hour_count         : so.Mapped[int]                = so.mapped_column(default = 0)
+    previous_hour_count: so.Mapped[int]                = so.mapped_column(default = 0)
+    gap_count          : so.Mapped[int]                = so.mapped_column(default = 0)
+    max_gap_seconds    : so.Mapped[float]              = so.mapped_column(default = 0.0)
+    outlier_count      : so.Mapped[int]                = so.mapped_column(default = 0)
+    mean               : so.Mapped[float]              = so.mapped_column(default = 0.0)
+    m2                 : so.Mapped[float]              = so.mapped_column(default = 0.0)
+
+    arduino            : so.Mapped[Arduino]            = so.relationship(back_populates='stats')
+
+    @property
+    def readings_per_hour(self):
+        if not self.readings_count or self.first_reading == self.last_reading:
+            return float(self.readings_count or 0)
+        horas = (self.last_reading - self.first_reading).total_seconds() / 3600
+        return self.readings_count / max(horas, 1)
+
+    @property
+    def outlier_rate(self):
+        return self.outlier_count / self.readings_count if self.readings_count else 0.0
+
+    def __repr__(self) -> str:
+        return f"<Saúde Arduino {self.arduino_id} -> {self.readings_count} registros>"
+
 class Location(db.Model):
     """
     Classe de modelo de uma localização da qual o arduino coletou uma frequência UV.
@@ -114,20 +236,122 @@ class UVRegister(db.Model):
 
     id           : Identificador único de um registro
     arduino_id   : Identificador único do arduino que realizou a coleta.
+    org_id       : Identificador único da organização do arduino. Lidera os índices das consultas dos painéis.
     register_date: Data de COLETA da frequência pelo arduino.
     location_id  : Identificador único da localização de onde o arduino realizou a COLETA da frequência.
     frequency    : Frequência do raio UV coletada.
+    flag         : Bits de leitura suspeita (ver app.anomaly). 0 = leitura válida.
     """
+    __table_args__ = (
+        sa.Index('ix_uv_register_org_id_register_date', 'org_id', 'register_date'),
+        sa.Index('ix_uv_register_org_id_id', 'org_id', 'id'),
+        # Leituras de um arduino em ordem de coleta (app.health, app.arquivo, app.exclusao)
+        sa.Index('ix_uv_register_arduino_id_register_date_id', 'arduino_id', 'register_date', 'id'),
+    )
 
     id           : so.Mapped[int]          = so.mapped_column(primary_key = True, autoincrement = True)
-    arduino_id   : so.Mapped[int]          = so.mapped_column(sa.ForeignKey(Arduino.id))
+    arduino_id   : so.Mapped[int]          = so.mapped_column(sa.ForeignKey(Arduino.id, ondelete = 'CASCADE'))
+    org_id       : so.Mapped[int]          = so.mapped_column(sa.ForeignKey(Organization.id))
     register_date: so.Mapped[sa.DateTime]  = so.mapped_column(sa.DateTime(timezone = True))
     location_id  : so.Mapped[int]          = so.mapped_column(sa.ForeignKey(Location.id))
     frequency    : so.Mapped[float]        = so.mapped_column()
+    flag         : so.Mapped[int]          = so.mapped_column(default = 0, server_default = '0',
+                                                              index = True)
 
     def __repr__(self) -> str:
         return f"<Registro UV {self.id} -> Frequência {self.frequency}"
 
+class UVRollup(db.Model):
+    """
+    Classe de modelo dos rollups diários dos registros UV.
+    Cada linha resume os registros de um arduino em uma localização em um dia (UTC).
+
+    arduino_id : Identificador único do arduino que realizou as coletas.
+    location_id: Identificador único da localização das coletas.
+    org_id     : Identificador único da organização do arduino.
+    day        : Dia (UTC) das coletas.
+    count      : Quantidade de registros.
+    total      : Soma das frequências.
+    minimum    : Menor frequência do dia.
+    maximum    : Maior frequência do dia.
+    histogram  : Contagem de registros por faixa de frequência (ver app.rollups.FAIXAS).
+    sketch     : DDSketch serializado, usado para calcular quantis.
+    last_id    : Maior id de UVRegister já incluído no rollup.
+    """
+    __tablename__ = "uv_rollup"
+    __table_args__ = (
+        sa.Index('ix_uv_rollup_org_id_day', 'org_id', 'day'),
+    )
+
+    arduino_id : so.Mapped[int]   = so.mapped_column(sa.ForeignKey(Arduino.id, ondelete = 'CASCADE'),
+                                                     primary_key = True)
+    location_id: so.Mapped[int]   = so.mapped_column(sa.ForeignKey(Location.id), primary_key = True,
+                                                     index = True)
+    org_id     : so.Mapped[int]   = so.mapped_column(sa.ForeignKey(Organization.id))
+    day        : so.Mapped[date]  = so.mapped_column(sa.Date, primary_key = True, index = True)
+    count      : so.Mapped[int]   = so.mapped_column(default = 0)
+    total      : so.Mapped[float] = so.mapped_column(default = 0.0)
+    minimum    : so.Mapped[float] = so.mapped_column()
+    maximum    : so.Mapped[float] = so.mapped_column()
+    histogram  : so.Mapped[list]  = so.mapped_column(sa.JSON)
+    sketch     : so.Mapped[bytes] = so.mapped_column(sa.LargeBinary)
+    last_id    : so.Mapped[int]   = so.mapped_column(index = True)
+
+    def __repr__(self) -> str:
+        return f"<Rollup UV {self.day} -> Arduino {self.arduino_id} | Local {self.location_id}>"
+
+class RollupBackfill(db.Model):
+    """
+    Classe de modelo das partições da reconstrução paralela dos rollups (ver app.backfill).
+    Uma reconstrução interrompida continua das partições sem finished_at.
+
+    start      : Primeiro dia (UTC) da partição.
+    end        : Dia seguinte ao último dia da partição.
+    limit_id   : Maior id de UVRegister considerado pela reconstrução.
+    readings   : Registros resumidos na partição.
+    finished_at: Data em que os rollups da partição foram gravados.
+    """
+    __tablename__ = "rollup_backfill"
+
+    start      : so.Mapped[date]               = so.mapped_column(sa.Date, primary_key = True)
+    end        : so.Mapped[date]               = so.mapped_column(sa.Date)
+    limit_id   : so.Mapped[int]                = so.mapped_column()
+    readings   : so.Mapped[Optional[int]]      = so.mapped_column()
+    finished_at: so.Mapped[Optional[datetime]] = so.mapped_column()
+
+class UVChunk(db.Model):
+    """
+    Classe de modelo dos blocos comprimidos de registros UV arquivados (ver app.arquivo).
+    Cada linha guarda os registros válidos de um arduino em uma localização em um dia (UTC),
+    que saem de UVRegister ao serem arquivados.
+
+    arduino_id : Identificador único do arduino que realizou as coletas.
+    day        : Dia (UTC) das coletas.
+    location_id: Identificador único da localização das coletas.
+    org_id     : Identificador único da organização do arduino.
+    start      : Data da primeira coleta do bloco.
+    end        : Data da última coleta do bloco.
+    count      : Quantidade de registros.
+    data       : Datas e frequências comprimidas (delta-of-delta e XOR, como no Gorilla).
+    """
+    __tablename__ = "uv_chunk"
+    __table_args__ = (
+        sa.Index('ix_uv_chunk_org_id_day', 'org_id', 'day'),
+    )
+
+    arduino_id : so.Mapped[int]          = so.mapped_column(sa.ForeignKey(Arduino.id, ondelete = 'CASCADE'),
+                                                            primary_key = True)
+    day        : so.Mapped[date]         = so.mapped_column(sa.Date, primary_key = True)
+    location_id: so.Mapped[int]          = so.mapped_column(sa.ForeignKey(Location.id), primary_key = True)
+    org_id     : so.Mapped[int]          = so.mapped_column(sa.ForeignKey(Organization.id))
+    start      : so.Mapped[sa.DateTime]  = so.mapped_column(sa.DateTime(timezone = True))
+    end        : so.Mapped[sa.DateTime]  = so.mapped_column(sa.DateTime(timezone = True))
+    count      : so.Mapped[int]          = so.mapped_column()
+    data       : so.Mapped[bytes]        = so.mapped_column(sa.LargeBinary)
+
+    def __repr__(self) -> str:
+        return f"<Bloco UV {self.day} -> Arduino {self.arduino_id} | Local {self.location_id}>"
+
 class Category(db.Model):
     """
     Classe de modelo das categorias possíveis para um componente.
@@ -167,7 +391,78 @@ class Arduino_Components(db.Model):
     """
     __tablename__ = "arduino_components"
 
-    arduino_id  : so.Mapped[int] = so.mapped_column(sa.ForeignKey(Arduino.id), primary_key = True)
+    arduino_id  : so.Mapped[int] = so.mapped_column(sa.ForeignKey(Arduino.id, ondelete = 'CASCADE'),
+                                                    primary_key = True)
     component_id: so.Mapped[int] = so.mapped_column(sa.ForeignKey(Components.id), primary_key = True)
     quantity    : so.Mapped[int] = so.mapped_column()
 
+
+class DataVersion(db.Model):
+    """
+    Classe de modelo das versões dos dados de cada tabela.
+    Serve para chavear o cache de fragmentos de template (ver app.templating).
+
+    name   : Nome da tabela acompanhada.
+    version: Incrementada a cada alteração na tabela.
+    """
+    __tablename__ = "data_version"
+
+    name   : so.Mapped[str] = so.mapped_column(sa.String(64), primary_key = True)
+    version: so.Mapped[int] = so.mapped_column(default = 0)
+
+
+class Job(db.Model):
+    """
+    Classe de modelo das tarefas em segundo plano executadas pelo worker (ver app.jobs).
+
+    id          : Identificador único da tarefa.
+    kind        : Nome da tarefa registrada. Exemplos: backup; exportar-registros.
+    params      : Parâmetros da tarefa, em JSON.
+    state       : pendente, executando, concluido ou falhou.
+    attempts    : Quantas vezes a tarefa já foi iniciada.
+    max_attempts: Quantas tentativas antes de desistir.
+    run_at      : Quando a tarefa pode ser executada (adiada a cada nova tentativa).
+    user_id     : Identificador único do usuário que pediu a tarefa, se houver.
+    org_id      : Identificador único da organização do usuário, se houver.
+    worker      : Worker que está executando (ou executou por último) a tarefa.
+    done        : Progresso: quantos itens já foram processados.
+    total       : Progresso: total de itens, quando conhecido.
+    message     : Última mensagem de progresso.
+    error       : Erro da última tentativa que falhou.
+    result      : Resultado da tarefa, em JSON.
+    created_at  : Data em que a tarefa foi pedida.
+    started_at  : Início da última tentativa.
+    heartbeat_at: Último sinal de vida do worker; tarefas paradas há muito tempo são retomadas.
+    finished_at : Data de conclusão (ou da desistência).
+    """
+    __table_args__ = (
+        sa.Index('ix_job_state_run_at', 'state', 'run_at'),
+    )
+
+    id          : so.Mapped[int]                = so.mapped_column(primary_key = True, autoincrement = True)
+    kind        : so.Mapped[str]                = so.mapped_column(sa.String(50))
+    params      : so.Mapped[dict]               = so.mapped_column(sa.JSON, default = dict)
+    state       : so.Mapped[str]                = so.mapped_column(sa.String(12), default = 'pendente')
+    attempts    : so.Mapped[int]                = so.mapped_column(default = 0)
+    max_attempts: so.Mapped[int]                = so.mapped_column(default = 3)
+    run_at      : so.Mapped[datetime]           = so.mapped_column(
+        default=lambda: datetime.now(timezone.utc)
+    )
+    user_id     : so.Mapped[Optional[int]]      = so.mapped_column(sa.ForeignKey(User.id, ondelete = 'SET NULL'),
+                                                                   index = True)
+    org_id      : so.Mapped[Optional[int]]      = so.mapped_column(sa.ForeignKey(Organization.id))
+    worker      : so.Mapped[Optional[str]]      = so.mapped_column(sa.String(100))
+    done        : so.Mapped[int]                = so.mapped_column(default = 0)
+    total       : so.Mapped[Optional[int]]      = so.mapped_column()
+    message     : so.Mapped[Optional[str]]      = so.mapped_column(sa.String(200))
+    error       : so.Mapped[Optional[str]]      = so.mapped_column(sa.Text)
+    result      : so.Mapped[Optional[dict]]     = so.mapped_column(sa.JSON)
+    created_at  : so.Mapped[datetime]           = so.mapped_column(
+        default=lambda: datetime.now(timezone.utc)
+    )
+    started_at  : so.Mapped[Optional[datetime]] = so.mapped_column()
+    heartbeat_at: so.Mapped[Optional[datetime]] = so.mapped_column()
+    finished_at : so.Mapped[Optional[datetime]] = so.mapped_column()
+
+    def __repr__(self) -> str:
+        return f"<Job {self.id} {self.kind} ({self.state})>"
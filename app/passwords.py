@@ -0,0 +1,67 @@
+# app/passwords.py
+"""
+Verificação de senha em um pool de threads limitado.
+
+scrypt e pbkdf2 liberam o GIL, mas cada hash ocupa um núcleo inteiro.
+Limitando quantos rodam ao mesmo tempo (PASSWORD_HASH_WORKERS), um pico de
+logins não deixa as outras requisições sem CPU: os logins excedentes
+esperam na fila até PASSWORD_HASH_TIMEOUT e então recebem LoginSobrecarregado.
+O pool é de cada aplicação (app.extensions).
+"""
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from functools import lru_cache
+import threading
+
+from flask import current_app
+from werkzeug.security import generate_password_hash
+
+_pool_lock = threading.Lock()
+
+
+class LoginSobrecarregado(Exception):
+    pass
+
+
+def _executor():
+    app = current_app._get_current_object()
+    with _pool_lock:
+        if 'passwords' not in app.extensions:
+            app.extensions['passwords'] = ThreadPoolExecutor(
+                max_workers=app.config['PASSWORD_HASH_WORKERS'],
+                thread_name_prefix='senha',
+            )
+        return app.extensions['passwords']
+
+
+@lru_cache(maxsize=8)
+def prefixo(metodo):
+    """
+    Prefixo que o werkzeug grava para `metodo`, com todos os parâmetros
+    ("scrypt" vira "scrypt:32768:8:1"). Calcula um hash uma vez por método.
+    """
+    return generate_password_hash('', metodo).split('$', 1)[0]
+
+
+def _executar(funcao, *args):
+    futuro = _executor().submit(funcao, *args)
+    try:
+        return futuro.result(timeout=current_app.config['PASSWORD_HASH_TIMEOUT'])
+    except TimeoutError:
+        futuro.cancel()
+        raise LoginSobrecarregado()
+
+
+def verificar(user, senha):
+    """
+    Confere a senha do usuário fora da thread da requisição.
+
+    Se a senha está certa mas foi gerada com outros parâmetros de hash,
+    ela é refeita com PASSWORD_HASH_METHOD (o chamador faz o commit).
+    """
+    if not _executar(user.check_password, senha):
+        return False
+
+    if user.needs_rehash():
+        metodo = current_app.config['PASSWORD_HASH_METHOD']
+        user.password_hash = _executar(generate_password_hash, senha, metodo)
+    return True
@@ -0,0 +1,102 @@
+# app/provisioning.py
+"""
+Provisionamento de arduinos em lote.
+
+Copia uma lista de componentes (a de um arduino modelo ou uma lista
+informada) para N arduinos novos do usuário e cria uma chave de API para
+cada um. Tudo são três INSERTs em lote na mesma transação: os arduinos, os
+componentes e as chaves. Custos e versões do cache de fragmentos são
+atualizados pelos listeners de app.custos e app.templating.
+"""
+from datetime import datetime, timezone
+
+import sqlalchemy as sa
+
+from app import device_auth
+from app.models import Arduino, Arduino_Components, Components, User
+
+MAX_ARDUINOS = 1000
+
+
+class ProvisionamentoInvalido(ValueError):
+    pass
+
+
+def ler_componentes(itens):
+    """
+    Converte [{"component_id": ..., "quantity": ...}, ...] em {component_id: quantidade}.
+    """
+    if not isinstance(itens, list) or not itens:
+        raise ProvisionamentoInvalido('Informe a lista de componentes')
+
+    componentes = {}
+    for item in itens:
+        try:
+            component_id = int(item['component_id'])
+            quantidade = int(item['quantity'])
+        except (KeyError, TypeError, ValueError):
+            raise ProvisionamentoInvalido(f'Componente inválido: {item!r}')
+        if quantidade <= 0:
+            raise ProvisionamentoInvalido(f'Quantidade inválida: {item!r}')
+        componentes[component_id] = componentes.get(component_id, 0) + quantidade
+    return componentes
+
+
+def componentes_do_modelo(session, user_id, arduino_id):
+    """
+    {component_id: quantidade} de um arduino do usuário, usado como modelo.
+    """
+    dono = session.scalar(
+        sa.select(Arduino.user_id)
+        .where(Arduino.id == arduino_id, Arduino.deleted_at.is_(None))
+    )
+    if dono is None or dono != user_id:
+        raise ProvisionamentoInvalido(f'Arduino modelo inexistente: {arduino_id}')
+
+    componentes = dict(session.execute(
+        sa.select(Arduino_Components.component_id, Arduino_Components.quantity)
+        .where(Arduino_Components.arduino_id == arduino_id)
+    ).all())
+    if not componentes:
+        raise ProvisionamentoInvalido(f'O arduino modelo {arduino_id} não tem componentes')
+    return componentes
+
+
+def provisionar(session, user_id, quantidade, componentes):
+    """
+    Cria `quantidade` arduinos com os `componentes` ({component_id: quantidade}),
+    na organização do usuário.
+
+    Retorna [(arduino_id, token), ...] na ordem de criação. Os tokens só
+    existem neste retorno. Não faz commit: quem chama decide a transação.
+    """
+    if not isinstance(quantidade, int) or isinstance(quantidade, bool) \
+            or not 1 <= quantidade <= MAX_ARDUINOS:
+        raise ProvisionamentoInvalido(f'A quantidade deve ser de 1 a {MAX_ARDUINOS}')
+    if not componentes:
+        raise ProvisionamentoInvalido('Informe os componentes')
+
+    existentes = set(session.scalars(
+        sa.select(Components.id).where(Components.id.in_(list(componentes)))
+    ))
+    if set(componentes) - existentes:
+        raise ProvisionamentoInvalido(
+            f'Componente inexistente: {sorted(set(componentes) - existentes)}'
+        )
+
+    org_id = session.scalar(sa.select(User.org_id).where(User.id == user_id))
+    agora = datetime.now(timezone.utc)
+    arduino_ids = list(session.scalars(
+        sa.insert(Arduino).returning(Arduino.id, sort_by_parameter_order=True),
+        [{'user_id': user_id, 'org_id': org_id, 'register_day': agora}
+         for _ in range(quantidade)],
+    ))
+
+    session.execute(sa.insert(Arduino_Components), [
+        {'arduino_id': arduino_id, 'component_id': component_id, 'quantity': qtd}
+        for arduino_id in arduino_ids
+        for component_id, qtd in componentes.items()
+    ])
+
+    tokens = device_auth.gerar_chaves(session, arduino_ids)
+    return [(arduino_id, tokens[arduino_id]) for arduino_id in arduino_ids]
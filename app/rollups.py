@@ -0,0 +1,187 @@
+# app/rollups.py
+"""
+Rollups diários dos registros UV com sketches de quantis.
+
+Cada UVRollup guarda contagem, soma, mínimo, máximo, histograma e um
+DDSketch de um (arduino, localização, dia). Estatísticas por local, por
+arduino ou por período são feitas juntando rollups, sem reler UVRegister.
+Cada rollup leva o org_id do arduino, e os painéis filtram por ele.
+Leituras marcadas como suspeitas (flag != 0) não entram nos rollups.
+"""
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+
+import sqlalchemy as sa
+
+from app.models import UVRegister, UVRollup
+from app.sketches import DDSketch
+
+# Limites inferiores das faixas do histograma (mW/cm²)
+FAIXAS = [0, 0.5, 1, 1.5, 2, 3, 4, 5, 7.5, 10]
+
+QUANTIS = {'p50': 0.5, 'p90': 0.9, 'p99': 0.99}
+
+TAMANHO_LOTE = 10_000
+
+
+def _dia(data):
+    if data.tzinfo is not None:
+        data = data.astimezone(timezone.utc)
+    return data.date()
+
+
+def _faixa(frequencia):
+    return max(bisect_right(FAIXAS, frequencia) - 1, 0)
+
+
+def registrar(session, registros):
+    """
+    Junta registros UV nos rollups correspondentes.
+
+    `registros` é uma sequência de objetos com id, arduino_id, org_id,
+    location_id, register_date, frequency e flag. Não faz commit.
+    """
+    grupos = {}
+    for registro in registros:
+        if registro.flag:
+            continue
+        chave = (registro.arduino_id, registro.location_id, _dia(registro.register_date))
+        grupos.setdefault(chave, []).append(registro)
+    if not grupos:
+        return
+
+    chaves = list(grupos)
+    existentes = {}
+    for i in range(0, len(chaves), 500):
+        existentes.update(
+            ((r.arduino_id, r.location_id, r.day), r)
+            for r in session.scalars(
+                sa.select(UVRollup).where(
+                    sa.tuple_(UVRollup.arduino_id, UVRollup.location_id, UVRollup.day)
+                    .in_(chaves[i:i + 500])
+                )
+            )
+        )
+
+    for chave, itens in grupos.items():
+        rollup = existentes.get(chave)
+        if rollup is None:
+            arduino_id, location_id, dia = chave
+            rollup = UVRollup(
+                arduino_id=arduino_id,
+                org_id=itens[0].org_id,
+                location_id=location_id,
+                day=dia,
+                count=0,
+                total=0.0,
+                histogram=[0] * len(FAIXAS),
+                last_id=0,
+            )
+            session.add(rollup)
+            sketch = DDSketch()
+        else:
+            sketch = DDSketch.from_bytes(rollup.sketch)
+
+        histograma = list(rollup.histogram)
+        for registro in itens:
+            sketch.add(registro.frequency)
+            histograma[_faixa(registro.frequency)] += 1
+
+        rollup.count = sketch.count
+        rollup.total = sketch.total
+        rollup.minimum = sketch.min
+        rollup.maximum = sketch.max
+        rollup.histogram = histograma
+        rollup.sketch = sketch.to_bytes()
+        rollup.last_id = max(rollup.last_id, max(r.id for r in itens))
+
+
+def atualizar(session):
+    """
+    Inclui nos rollups os registros com id maior que o último já resumido.
+    Retorna quantos registros foram incluídos.
+    """
+    ultimo = session.scalar(sa.select(sa.func.max(UVRollup.last_id))) or 0
+    total = 0
+    while True:
+        registros = session.execute(
+            sa.select(
+                UVRegister.id,
+                UVRegister.arduino_id,
+                UVRegister.org_id,
+                UVRegister.location_id,
+                UVRegister.register_date,
+                UVRegister.frequency,
+                UVRegister.flag,
+            )
+            .where(UVRegister.id > ultimo)
+            .order_by(UVRegister.id)
+            .limit(TAMANHO_LOTE)
+        ).all()
+        if not registros:
+            break
+        registrar(session, registros)
+        session.commit()
+        ultimo = registros[-1].id
+        total += len(registros)
+    return total
+
+
+def _resumir(rollups):
+    sketch = DDSketch()
+    histograma = [0] * len(FAIXAS)
+    for rollup in rollups:
+        sketch.merge(DDSketch.from_bytes(rollup.sketch))
+        histograma = [a + b for a, b in zip(histograma, rollup.histogram)]
+
+    resumo = {
+        'count'    : sketch.count,
+        'average'  : sketch.average,
+        'min'      : sketch.min if sketch.count else None,
+        'max'      : sketch.max if sketch.count else None,
+        'histogram': histograma,
+    }
+    for nome, q in QUANTIS.items():
+        resumo[nome] = sketch.quantile(q)
+    return resumo
+
+
+def desde(dias):
+    """
+    Filtro dos rollups dos últimos `dias` dias (UTC), contando hoje. Os
+    resumos juntam os sketches em Python, então o custo cresce com a
+    quantidade de rollups: os painéis limitam o período com ele.
+    """
+    return UVRollup.day >= datetime.now(timezone.utc).date() - timedelta(days=dias - 1)
+
+
+def resumo_geral(session, *filtros):
+    """
+    Junta todos os rollups (opcionalmente filtrados) em um único resumo.
+    """
+    return _resumir(session.execute(
+        sa.select(UVRollup.sketch, UVRollup.histogram).where(*filtros)
+    ))
+
+
+def resumo_por(session, coluna, *filtros):
+    """
+    Junta os rollups agrupando por `coluna` (ex.: UVRollup.location_id).
+    Retorna {valor da coluna: resumo}, ordenado pela quantidade de registros.
+    """
+    grupos = {}
+    for rollup in session.execute(
+        sa.select(coluna, UVRollup.sketch, UVRollup.histogram).where(*filtros)
+    ):
+        grupos.setdefault(rollup[0], []).append(rollup)
+
+    resumos = {chave: _resumir(itens) for chave, itens in grupos.items()}
+    return dict(sorted(resumos.items(), key=lambda item: -item[1]['count']))
+
+
+def faixas_labels():
+    limites = FAIXAS + [None]
+    return [
+        f'{inicio}–{fim}' if fim is not None else f'{inicio}+'
+        for inicio, fim in zip(limites, limites[1:])
+    ]
@@ -0,0 +1,117 @@
+# app/series.py
+"""
+Séries temporais em intervalos inteiros, para os gráficos dos painéis.
+
+`serie` conta (e tira a média de) linhas por intervalo com um único
+SELECT: o filtro é um intervalo [início, fim) direto na coluna de data,
+que o índice atende, e o número do intervalo é calculado só no SELECT,
+como (segundos desde o início) // passo. Nada de func.date() no WHERE nem
+de datas em texto relidas no Python.
+
+Os dias começam à meia-noite de DASHBOARD_TIMEZONE. Os intervalos têm
+tamanho fixo, então em dias de mudança de horário de verão o limite fica
+uma hora deslocado.
+"""
+from collections import namedtuple
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import sqlalchemy as sa
+from flask import current_app
+
+DIA = timedelta(days=1)
+
+Intervalo = namedtuple('Intervalo', 'inicio count media')
+
+
+def fuso():
+    return ZoneInfo(current_app.config['DASHBOARD_TIMEZONE'])
+
+
+def para_utc(data):
+    """
+    Data com fuso em UTC. Datas sem fuso são tratadas como UTC.
+    """
+    if data.tzinfo is None:
+        return data.replace(tzinfo=timezone.utc)
+    return data.astimezone(timezone.utc)
+
+
+def dia(data):
+    """
+    Dia local (DASHBOARD_TIMEZONE) de uma data, em ISO 8601.
+    """
+    return para_utc(data).astimezone(fuso()).date().isoformat()
+
+
+def meia_noite(dia_local):
+    return datetime.combine(dia_local, time(), tzinfo=fuso())
+
+
+def semana():
+    """
+    Início (segunda-feira, meia-noite local) da semana atual.
+    """
+    hoje = datetime.now(fuso()).date()
+    return meia_noite(hoje - timedelta(days=hoje.weekday()))
+
+
+def ultimos_dias(dias):
+    """
+    Início dos últimos `dias` dias, contando hoje.
+    """
+    hoje = datetime.now(fuso()).date()
+    return meia_noite(hoje - timedelta(days=dias - 1))
+
+
+def _segundos(session, coluna, inicio):
+    # Segundos inteiros desde `inicio`; aritmética inteira, sem erro de
+    # arredondamento nos limites dos intervalos
+    if session.get_bind().dialect.name == 'postgresql':
+        epoca = sa.cast(sa.func.floor(sa.extract('epoch', coluna)), sa.BigInteger)
+    else:
+        # O SQLite guarda as datas em UTC sem fuso, como texto. Os
+        # microssegundos saem antes: strftime arredonda para o segundo seguinte
+        epoca = sa.cast(sa.func.strftime('%s', sa.func.substr(coluna, 1, 19)), sa.Integer)
+    return epoca - int(inicio.timestamp())
+
+
+def _parametro(session, data):
+    if session.get_bind().dialect.name == 'postgresql':
+        return data
+    return para_utc(data).replace(tzinfo=None)
+
+
+def serie(session, coluna, inicio, quantidade, passo=DIA, valor=None, filtros=()):
+    """
+    `quantidade` intervalos de `passo` a partir de `inicio` (com fuso).
+
+    Retorna uma lista de Intervalo(inicio, count, media), incluindo os
+    intervalos vazios (count 0, media None). `media` é a média de `valor`,
+    se informado.
+    """
+    segundos = int(passo.total_seconds())
+    fim = inicio + passo * quantidade
+    numero = (_segundos(session, coluna, inicio) // segundos).label('numero')
+
+    colunas = [numero, sa.func.count()]
+    if valor is not None:
+        colunas.append(sa.func.avg(valor))
+    linhas = session.execute(
+        sa.select(*colunas)
+        .where(coluna >= _parametro(session, inicio),
+               coluna < _parametro(session, fim),
+               *filtros)
+        .group_by(numero)
+    ).all()
+
+    por_numero = {linha[0]: linha for linha in linhas}
+    resultado = []
+    for n in range(quantidade):
+        linha = por_numero.get(n)
+        resultado.append(Intervalo(
+            inicio + passo * n,
+            linha[1] if linha else 0,
+            float(linha[2]) if linha and valor is not None else None,
+        ))
+    return resultado
@@ -0,0 +1,123 @@
+# app/sketches.py
+"""
+DDSketch: resumo de distribuição com erro relativo garantido nos quantis.
+
+Os valores são contados em buckets logarítmicos de razão gamma, então dois
+sketches com o mesmo `alpha` se combinam somando os buckets. Isso permite
+juntar rollups de dias, locais ou arduinos sem reler os registros.
+"""
+import math
+import struct
+
+ALPHA_PADRAO = 0.01
+MAX_BUCKETS = 2048
+
+_CABECALHO = struct.Struct('<dQddd I')
+_BUCKET = struct.Struct('<iQ')
+
+
+class DDSketch:
+    """
+    Sketch de quantis com erro relativo `alpha`.
+
+    Valores menores que `MIN_VALOR` (incluindo zero e negativos) caem no
+    contador de zeros; as leituras de frequência UV nunca são negativas.
+    """
+
+    MIN_VALOR = 1e-9
+
+    def __init__(self, alpha=ALPHA_PADRAO):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zeros = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _indice(self, valor):
+        return math.ceil(math.log(valor) / self._log_gamma)
+
+    def _valor(self, indice):
+        return 2 * self.gamma ** indice / (self.gamma + 1)
+
+    def add(self, valor, vezes=1):
+        if valor < self.MIN_VALOR:
+            self.zeros += vezes
+        else:
+            indice = self._indice(valor)
+            self.buckets[indice] = self.buckets.get(indice, 0) + vezes
+            if len(self.buckets) > MAX_BUCKETS:
+                self._colapsar()
+        self.count += vezes
+        self.total += valor * vezes
+        self.min = min(self.min, valor)
+        self.max = max(self.max, valor)
+
+    def _colapsar(self):
+        # Junta os menores buckets: perde precisão só nos quantis mais baixos
+        indices = sorted(self.buckets)
+        excesso = indices[:len(indices) - MAX_BUCKETS + 1]
+        destino = indices[len(excesso)]
+        for indice in excesso:
+            self.buckets[destino] += self.buckets.pop(indice)
+
+    def merge(self, outro):
+        if outro.alpha != self.alpha:
+            raise ValueError('Só é possível juntar sketches com o mesmo alpha')
+        for indice, quantidade in outro.buckets.items():
+            self.buckets[indice] = self.buckets.get(indice, 0) + quantidade
+        if len(self.buckets) > MAX_BUCKETS:
+            self._colapsar()
+        self.zeros += outro.zeros
+        self.count += outro.count
+        self.total += outro.total
+        self.min = min(self.min, outro.min)
+        self.max = max(self.max, outro.max)
+        return self
+
+    def quantile(self, q):
+        """
+        Valor aproximado do quantil `q` (0 a 1), ou None se o sketch está vazio.
+        """
+        if self.count == 0:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+
+        posicao = q * (self.count - 1)
+        acumulado = self.zeros
+        if posicao < acumulado:
+            return max(self.min, 0.0)
+        for indice in sorted(self.buckets):
+            acumulado += self.buckets[indice]
+            if posicao < acumulado:
+                return min(max(self._valor(indice), self.min), self.max)
+        return self.max
+
+    @property
+    def average(self):
+        return self.total / self.count if self.count else None
+
+    def to_bytes(self):
+        partes = [_CABECALHO.pack(self.alpha, self.zeros, self.total,
+                                  self.min, self.max, len(self.buckets))]
+        partes.extend(_BUCKET.pack(i, q) for i, q in sorted(self.buckets.items()))
+        return b''.join(partes)
+
+    @classmethod
+    def from_bytes(cls, dados):
+        alpha, zeros, total, minimo, maximo, n = _CABECALHO.unpack_from(dados)
+        sketch = cls(alpha)
+        sketch.zeros, sketch.total, sketch.min, sketch.max = zeros, total, minimo, maximo
+        deslocamento = _CABECALHO.size
+        for _ in range(n):
+            indice, quantidade = _BUCKET.unpack_from(dados, deslocamento)
+            sketch.buckets[indice] = quantidade
+            deslocamento += _BUCKET.size
+        sketch.count = zeros + sum(sketch.buckets.values())
+        return sketch
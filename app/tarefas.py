@@ -0,0 +1,159 @@
+# app/tarefas.py
+"""
+Tarefas executadas pelo worker (ver app.jobs).
+
+Manutenção (backup, reconstrução de rollups, saúde e busca, custos,
+arquivamento), exportação de registros e exclusão de arduinos, que antes
+rodavam na requisição, à mão ou em threads da própria aplicação.
+"""
+import csv
+import os
+
+import sqlalchemy as sa
+from flask import current_app
+
+from app import analytics, arquivo, backfill, busca, custos, db, exclusao, health, rollups
+from app.jobs import tarefa
+from app.models import Location, UVChunk, UVRegister
+
+LOTE_EXPORTACAO = 5000
+
+
+@tarefa('backup', tentativas=2)
+def backup(contexto, dias_max=7, paralelo=False):
+    # tasks.py fica na raiz do projeto, ao lado do app.db
+    import tasks
+    raiz = os.path.dirname(current_app.root_path)
+    zip_path = tasks.fazer_backup(
+        source=raiz,
+        destination=current_app.config['BACKUP_DIR'],
+        dias_max=dias_max,
+        paralelo=paralelo,
+        ao_avancar=contexto.progresso,
+    )
+    return {'arquivo': os.path.basename(zip_path)}
+
+
+@tarefa('atualizar-rollups')
+def atualizar_rollups(contexto):
+    # Registros gravados fora do ingest (cargas em lote, scripts)
+    return {'registros': rollups.atualizar(db.session)}
+
+
+@tarefa('atualizar-snapshots')
+def atualizar_snapshots(contexto):
+    # A página de estatísticas só lê os snapshots; quem os grava é esta tarefa
+    if not (current_app.config['ANALYTICS_COLUMNAR'] and analytics.disponivel()):
+        return {'registros': 0}
+    return {'registros': analytics.atualizar(db.session, current_app.config['ANALYTICS_DIR'])}
+
+
+@tarefa('reconstruir-rollups')
+def reconstruir_rollups(contexto, processos=None, dias=7):
+    # Uma nova tentativa continua das partições que faltaram
+    total = backfill.reconstruir(db.session, processos, dias, retomar=True,
+                                 ao_avancar=contexto.progresso)
+    return {'registros': total}
+
+
+@tarefa('reconstruir-saude')
+def reconstruir_saude(contexto):
+    return {'arduinos': health.reconstruir(db.session, current_app.config['DEVICE_GAP_SECONDS'])}
+
+
+@tarefa('reconstruir-busca')
+def reconstruir_busca(contexto):
+    return {'indices': busca.reconstruir(db.session)}
+
+
+@tarefa('recalcular-custos')
+def recalcular_custos(contexto):
+    custos.recalcular(db.session.connection())
+    db.session.commit()
+
+
+@tarefa('arquivar-registros')
+def arquivar_registros(contexto, dias=None):
+    # Com uma reconstrução dos rollups pendente, falha e tenta de novo mais tarde
+    total = arquivo.arquivar(db.session, dias or current_app.config['ARCHIVE_AFTER_DAYS'],
+                             ao_avancar=contexto.progresso)
+    return {'registros': total}
+
+
+@tarefa(exclusao.TAREFA)
+def excluir_arduino(contexto, arduino_id, org_id=None):
+    # Cada lote tem o seu commit; uma nova tentativa continua do que restou
+    apagados = exclusao.apagar(
+        db.session,
+        arduino_id,
+        current_app.config['DELETE_BATCH_SIZE'],
+        current_app.config['DELETE_BATCH_PAUSE'],
+        ao_avancar=contexto.progresso,
+        org_id=org_id,
+    )
+    return {'registros': apagados}
+
+
+def arquivo_exportacao(job_id):
+    return os.path.join(current_app.config['EXPORT_DIR'], f'registros_{job_id}.csv')
+
+
+@tarefa('exportar-registros')
+def exportar_registros(contexto, org_id, arduino_id=None):
+    """
+    CSV com os registros válidos da organização (ou de um arduino dela):
+    primeiro os arquivados (app.arquivo), sem id, e depois os de
+    UVRegister, lidos em lotes pelo índice (org_id, id).
+    """
+    filtros = [UVRegister.org_id == org_id, UVRegister.flag == 0]
+    filtros_blocos = [UVChunk.org_id == org_id]
+    if arduino_id is not None:
+        filtros.append(UVRegister.arduino_id == arduino_id)
+        filtros_blocos.append(UVChunk.arduino_id == arduino_id)
+    total = db.session.scalar(sa.select(sa.func.count()).select_from(UVRegister).where(*filtros)) + \
+        (db.session.scalar(sa.select(sa.func.sum(UVChunk.count)).where(*filtros_blocos)) or 0)
+    contexto.progresso(0, total)
+
+    destino = arquivo_exportacao(contexto.job_id)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    exportados = 0
+    ultimo_id = 0
+    # Escreve ao lado e renomeia no fim: o download nunca vê um arquivo pela metade
+    with open(destino + '.tmp', 'w', newline='', encoding='utf-8') as csv_saida:
+        saida = csv.writer(csv_saida)
+        saida.writerow(['id', 'arduino_id', 'register_date', 'city', 'state', 'country', 'frequency'])
+        blocos = arquivo.blocos(db.session, *filtros_blocos, UVChunk.location_id == Location.id,
+                                colunas=(Location.city, Location.state, Location.country))
+        for bloco, datas, frequencias in blocos:
+            for data, frequencia in zip(datas, frequencias):
+                saida.writerow(['', bloco.arduino_id, data.isoformat(),
+                                bloco.city, bloco.state, bloco.country, frequencia])
+            exportados += len(datas)
+            contexto.progresso(exportados, max(total, exportados))
+
+        while True:
+            linhas = db.session.execute(
+                sa.select(
+                    UVRegister.id,
+                    UVRegister.arduino_id,
+                    UVRegister.register_date,
+                    Location.city,
+                    Location.state,
+                    Location.country,
+                    UVRegister.frequency,
+                )
+                .join(Location, UVRegister.location_id == Location.id)
+                .where(*filtros, UVRegister.id > ultimo_id)
+                .order_by(UVRegister.id)
+                .limit(LOTE_EXPORTACAO)
+            ).all()
+            if not linhas:
+                break
+            for linha in linhas:
+                saida.writerow([linha.id, linha.arduino_id, linha.register_date.isoformat(),
+                                linha.city, linha.state, linha.country, linha.frequency])
+            exportados += len(linhas)
+            ultimo_id = linhas[-1].id
+            contexto.progresso(exportados, max(total, exportados))
+    os.replace(destino + '.tmp', destino)
+    return {'linhas': exportados}
@@ -0,0 +1,144 @@
+# app/templating.py
+"""
+Cache dos templates Jinja.
+
+Bytecode: os templates compilados ficam em JINJA_CACHE_DIR, compartilhado
+pelos workers; um worker novo só lê o bytecode em vez de compilar o
+template. `flask uv compilar-templates` preenche o cache no deploy.
+
+Fragmentos: {% cache 'nome', chave... %} ... {% endcache %} guarda o HTML
+renderizado do bloco em um LRU em memória da aplicação. A chave deve
+incluir `versao_dados('tabela', ...)`: cada flush que altera uma tabela
+acompanhada (TABELAS), ou um INSERT/UPDATE/DELETE em lote pelo ORM,
+incrementa a versão dela em data_version na mesma
+transação, então todos os processos deixam de usar o fragmento antigo
+assim que a alteração é gravada. Dados usados só dentro do bloco devem
+ser carregados dentro dele, para não consultar o banco quando o
+fragmento já está no cache.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import sqlalchemy as sa
+import sqlalchemy.orm as so
+from flask import current_app, g
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+
+from app.models import DataVersion
+
+# Tabelas cuja versão é acompanhada
+TABELAS = {'arduino', 'arduino_components', 'category', 'components'}
+
+
+class CacheFragmentos:
+    """
+    LRU de chave -> HTML renderizado.
+    """
+
+    def __init__(self, tamanho):
+        self.tamanho = tamanho
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave):
+        with self._lock:
+            html = self._itens.get(chave)
+            if html is not None:
+                self._itens.move_to_end(chave)
+            return html
+
+    def put(self, chave, html):
+        with self._lock:
+            self._itens[chave] = html
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.tamanho:
+                self._itens.popitem(last=False)
+
+
+class FragmentCacheExtension(Extension):
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        chave = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            chave.append(parser.parse_expression())
+        corpo = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method('_renderizar', [nodes.List(chave)]), [], [], corpo
+        ).set_lineno(lineno)
+
+    def _renderizar(self, chave, caller):
+        cache = current_app.extensions['fragmentos']
+        chave = tuple(chave)
+        html = cache.get(chave)
+        if html is None:
+            html = caller()
+            cache.put(chave, html)
+        return html
+
+
+def versao_dados(*tabelas):
+    """
+    Versões atuais das tabelas, lidas uma vez por requisição.
+    """
+    if 'versoes_dados' not in g:
+        from app import db
+        g.versoes_dados = dict(db.session.execute(sa.select(DataVersion.name, DataVersion.version)).all())
+    return tuple(g.versoes_dados.get(tabela, 0) for tabela in tabelas)
+
+
+def _incrementar(connection, tabelas):
+    for tabela in sorted(tabelas):
+        resultado = connection.execute(
+            sa.update(DataVersion)
+            .where(DataVersion.name == tabela)
+            .values(version=DataVersion.version + 1)
+        )
+        if resultado.rowcount == 0:
+            connection.execute(sa.insert(DataVersion).values(name=tabela, version=1))
+
+
+@sa.event.listens_for(so.Session, 'after_flush')
+def _depois_do_flush(session, flush_context):
+    tabelas = set()
+    for objeto in session.new | session.deleted:
+        tabelas.add(sa.inspect(objeto).mapper.local_table.name)
+    for objeto in session.dirty:
+        if session.is_modified(objeto):
+            tabelas.add(sa.inspect(objeto).mapper.local_table.name)
+    tabelas &= TABELAS
+    if tabelas:
+        _incrementar(session.connection(), tabelas)
+
+
+@sa.event.listens_for(so.Session, 'do_orm_execute')
+def _em_lote(estado):
+    # session.execute(sa.insert/update/delete(...)) não passa pelo flush
+    if not (estado.is_insert or estado.is_update or estado.is_delete) or estado.bind_mapper is None:
+        return
+    tabela = estado.bind_mapper.local_table.name
+    if tabela in TABELAS:
+        _incrementar(estado.session.connection(), {tabela})
+
+
+def init_app(app):
+    pasta = app.config['JINJA_CACHE_DIR']
+    os.makedirs(pasta, exist_ok=True)
+    # O ambiente Jinja já existe (CSRFProtect o usa); configura direto nele
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(pasta)
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.jinja_env.globals['versao_dados'] = versao_dados
+    app.extensions['fragmentos'] = CacheFragmentos(app.config['FRAGMENT_CACHE_SIZE'])
+
+
+def compilar(app):
+    """
+    Compila todos os templates, gravando o bytecode no cache. Retorna quantos.
+    """
+    nomes = app.jinja_env.list_templates(extensions=['html'])
+    for nome in nomes:
+        app.jinja_env.get_template(nome)
+    return len(nomes)
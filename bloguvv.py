@@ -1,8 +1,22 @@
-<<<<<<< HEAD
-# bloguvv.py
-
-=======
 # bloguvv.py
+import sqlalchemy as sa
+import sqlalchemy.orm as so
+from app import create_app, db
+from app.models import *
 
->>>>>>> upstream/main
-from app import app
\ No newline at end of file
+app = create_app()
+
+@app.shell_context_processor
+def make_shell_context():
+    return {
+            'sa': sa,
+            'db': db,
+            'User': User,
+            'Post': Post,
+            'Arduino': Arduino,
+            'Location': Location,
+            'UVRegister': UVRegister,
+            'Category': Category,
+            'Components': Components,
+            'Arduino_Components': Arduino_Components,
+        }
@@ -1,12 +1,3 @@
-<<<<<<< HEAD
-import os
-basedir = os.path.abspath(os.path.dirname(__file__))
-
-class Config:
-    SECRET_KEY = os.environ.get('SECRET_KEY') or 'voce-nunca-saberah'
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
-        'sqlite:///' + os.path.join(basedir, 'app.db')
-=======
 import os
 basedir = os.path.abspath(os.path.dirname(__file__))
 
@@ -14,4 +5,75 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'voce-nunca-saberah'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'app.db')
->>>>>>> upstream/main
+
+    # Estatísticas a partir do snapshot colunar (requer NumPy)
+    ANALYTICS_COLUMNAR = os.environ.get('ANALYTICS_COLUMNAR', '1') == '1'
+    ANALYTICS_DIR = os.environ.get('ANALYTICS_DIR') or \
+        os.path.join(basedir, 'analytics')
+
+    # Saúde dos arduinos: intervalo sem coletas considerado falha
+    DEVICE_GAP_SECONDS = int(os.environ.get('DEVICE_GAP_SECONDS') or 900)
+
+    # Detecção de leituras suspeitas (ver app.anomaly)
+    ANOMALY_ALPHA = float(os.environ.get('ANOMALY_ALPHA') or 0.05)
+    ANOMALY_Z = float(os.environ.get('ANOMALY_Z') or 4.0)
+    ANOMALY_FLATLINE = int(os.environ.get('ANOMALY_FLATLINE') or 20)
+    UV_MAX_FREQUENCY = float(os.environ.get('UV_MAX_FREQUENCY') or 20.0)
+
+    # Autenticação dos arduinos por chave de API (ver app.device_auth)
+    DEVICE_KEY_SECRET = os.environ.get('DEVICE_KEY_SECRET') or SECRET_KEY
+    DEVICE_KEY_CACHE_SIZE = int(os.environ.get('DEVICE_KEY_CACHE_SIZE') or 10000)
+    DEVICE_KEY_CACHE_TTL = int(os.environ.get('DEVICE_KEY_CACHE_TTL') or 300)
+    DEVICE_REQUIRE_SIGNATURE = os.environ.get('DEVICE_REQUIRE_SIGNATURE') == '1'
+    DEVICE_SIGNATURE_MAX_SKEW = int(os.environ.get('DEVICE_SIGNATURE_MAX_SKEW') or 300)
+
+    # Hash de senha no formato do werkzeug (ex.: scrypt:16384:8:1, pbkdf2:sha256:600000).
+    # Senhas com parâmetros diferentes são refeitas no próximo login.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt:32768:8:1'
+    # Quantas verificações de senha rodam ao mesmo tempo e quanto um login espera na fila
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or os.cpu_count() or 2)
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT') or 10)
+
+    # Cache da identidade do usuário logado (ver app.identity)
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL') or 60)
+    LAST_SEEN_INTERVAL = int(os.environ.get('LAST_SEEN_INTERVAL') or 60)
+
+    # Modo ASGI (app.asgi): threads para a aplicação Flask e espera máxima do long-polling
+    ASGI_THREADS = int(os.environ.get('ASGI_THREADS') or 16)
+    LONGPOLL_MAX_SECONDS = 30
+
+    # Bytecode dos templates compartilhado pelos workers e cache de fragmentos (ver app.templating)
+    JINJA_CACHE_DIR = os.environ.get('JINJA_CACHE_DIR') or os.path.join(basedir, 'jinja_cache')
+    FRAGMENT_CACHE_SIZE = 1000
+
+    # Organização de quem se cadastra sem informar o código de uma
+    DEFAULT_ORG_SLUG = os.environ.get('DEFAULT_ORG_SLUG') or 'padrao'
+
+    # Fuso dos dias nos gráficos dos painéis (ver app.series)
+    DASHBOARD_TIMEZONE = os.environ.get('DASHBOARD_TIMEZONE') or 'America/Sao_Paulo'
+    # Dias de rollups juntados nos quantis e histogramas da página de estatísticas
+    STATS_ROLLUP_DAYS = int(os.environ.get('STATS_ROLLUP_DAYS') or 90)
+
+    # Tarefas em segundo plano (ver app.jobs): tarefas simultâneas do worker,
+    # intervalo entre consultas à fila, sinal de vida, tempo sem sinal para
+    # retomar uma tarefa e espera antes de cada nova tentativa (dobra a cada falha)
+    JOBS_WORKERS = int(os.environ.get('JOBS_WORKERS') or 2)
+    JOBS_POLL_SECONDS = float(os.environ.get('JOBS_POLL_SECONDS') or 2)
+    JOBS_HEARTBEAT_SECONDS = float(os.environ.get('JOBS_HEARTBEAT_SECONDS') or 5)
+    JOBS_TIMEOUT_SECONDS = int(os.environ.get('JOBS_TIMEOUT_SECONDS') or 300)
+    JOBS_BACKOFF_SECONDS = int(os.environ.get('JOBS_BACKOFF_SECONDS') or 30)
+    JOBS_BACKOFF_MAX_SECONDS = int(os.environ.get('JOBS_BACKOFF_MAX_SECONDS') or 3600)
+    # Tarefas que o worker enfileira sozinho: tipo -> intervalo em segundos
+    JOBS_PERIODIC = {
+        'atualizar-rollups': int(os.environ.get('ROLLUPS_REFRESH_SECONDS') or 300),
+        'atualizar-snapshots': int(os.environ.get('ANALYTICS_REFRESH_SECONDS') or 60),
+    }
+    BACKUP_DIR = os.environ.get('BACKUP_DIR') or os.path.join(basedir, 'backup')
+    EXPORT_DIR = os.environ.get('EXPORT_DIR') or os.path.join(basedir, 'exports')
+
+    # Registros com mais dias que isso são comprimidos em blocos (ver app.arquivo)
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS') or 180)
+
+    # Exclusão de arduinos: registros apagados por lote e pausa entre os lotes (ver app.exclusao)
+    DELETE_BATCH_SIZE = int(os.environ.get('DELETE_BATCH_SIZE') or 5000)
+    DELETE_BATCH_PAUSE = float(os.environ.get('DELETE_BATCH_PAUSE') or 0.05)
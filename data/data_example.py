@@ -1,14 +1,18 @@
 from datetime import datetime, timezone
-from app.models import User, Arduino, Location, UVRegister, Category, Components, Arduino_Components
+from app.models import Organization, User, Arduino, Location, UVRegister, Category, Components, Arduino_Components
 from app import db
 
 
 def data_example():
+    # --- Organização padrão (criada pela migration) ---
+    organization = db.session.scalar(db.select(Organization).filter_by(slug="padrao"))
+
     # --- Criar um Usuário ---
     user = User(
         username = "Morgado",
         email    = "arthurmorgadoteixeira@exemplo.com",
-        about_me = "Usuário de teste."
+        about_me = "Usuário de teste.",
+        org_id   = organization.id
     )
     user.set_password("cripto_senha_hehe")  # Senha criptografada
     db.session.add(user)
@@ -17,6 +21,7 @@ def data_example():
     # --- Criar um Arduino ---
     arduino = Arduino(
         user_id      = user.id,
+        org_id       = user.org_id,
         register_day = datetime.now(timezone.utc)
     )
     db.session.add(arduino)
@@ -36,6 +41,7 @@ def data_example():
     # --- Criar Registro UV ---
     uv_register = UVRegister(
         arduino_id    = arduino.id,
+        org_id        = arduino.org_id,
         register_date = datetime.now(timezone.utc),
         location_id   = location.id,
         frequency     = 12.0  # Valor de exemplo
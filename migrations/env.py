@@ -94,9 +94,22 @@ def run_migrations_online():
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
 
+    # Índices de busca (app.busca) ficam fora dos models: tabelas FTS5 e as
+    # tabelas internas delas no SQLite, índices GIN de expressão no PostgreSQL
+    def include_name(name, type_, parent_names):
+        return not (name and '_fts' in name)
+
+    if conf_args.get("include_name") is None:
+        conf_args["include_name"] = include_name
+
     connectable = get_engine()
 
     with connectable.connect() as connection:
+        if connection.dialect.name == 'sqlite':
+            # O batch do SQLite recria tabelas (DROP + RENAME); com as chaves
+            # estrangeiras ligadas, apagar a tabela pai dispararia os ON DELETE
+            connection.exec_driver_sql('PRAGMA foreign_keys=OFF')
+            connection.commit()
         context.configure(
             connection=connection,
             target_metadata=get_metadata(),
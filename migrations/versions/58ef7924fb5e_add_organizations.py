@@ -0,0 +1,78 @@
+"""Add organizations
+
+Revision ID: 58ef7924fb5e
+Revises: c98a94877a40
+Create Date: 2026-10-19 18:31:43.261528
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '58ef7924fb5e'
+down_revision = 'c98a94877a40'
+branch_labels = None
+depends_on = None
+
+
+def _org_id(batch_op, tabela):
+    # Os dados que já existem ficam na organização padrão (id 1)
+    batch_op.add_column(sa.Column('org_id', sa.Integer(), server_default='1', nullable=False))
+    batch_op.create_foreign_key(f'fk_{tabela}_org_id_organization', 'organization', ['org_id'], ['id'])
+
+
+def upgrade():
+    organization = op.create_table('organization',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('slug', sa.String(length=40), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('slug')
+    )
+    op.bulk_insert(organization, [{'id': 1, 'name': 'Padrão', 'slug': 'padrao'}])
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        _org_id(batch_op, 'user')
+        batch_op.create_index(batch_op.f('ix_user_org_id'), ['org_id'], unique=False)
+
+    with op.batch_alter_table('arduino', schema=None) as batch_op:
+        _org_id(batch_op, 'arduino')
+        batch_op.create_index('ix_arduino_org_id_deleted_at', ['org_id', 'deleted_at'], unique=False)
+
+    # As consultas dos painéis são sempre de uma organização: os índices começam por org_id
+    with op.batch_alter_table('uv_register', schema=None) as batch_op:
+        _org_id(batch_op, 'uv_register')
+        batch_op.drop_index(batch_op.f('ix_uv_register_register_date'))
+        batch_op.create_index('ix_uv_register_org_id_id', ['org_id', 'id'], unique=False)
+        batch_op.create_index('ix_uv_register_org_id_register_date', ['org_id', 'register_date'], unique=False)
+
+    with op.batch_alter_table('uv_rollup', schema=None) as batch_op:
+        _org_id(batch_op, 'uv_rollup')
+        batch_op.create_index('ix_uv_rollup_org_id_day', ['org_id', 'day'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('uv_rollup', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_uv_rollup_org_id_organization', type_='foreignkey')
+        batch_op.drop_index('ix_uv_rollup_org_id_day')
+        batch_op.drop_column('org_id')
+
+    with op.batch_alter_table('uv_register', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_uv_register_org_id_organization', type_='foreignkey')
+        batch_op.drop_index('ix_uv_register_org_id_register_date')
+        batch_op.drop_index('ix_uv_register_org_id_id')
+        batch_op.create_index(batch_op.f('ix_uv_register_register_date'), ['register_date'], unique=False)
+        batch_op.drop_column('org_id')
+
+    with op.batch_alter_table('arduino', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_arduino_org_id_organization', type_='foreignkey')
+        batch_op.drop_index('ix_arduino_org_id_deleted_at')
+        batch_op.drop_column('org_id')
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_user_org_id_organization', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_user_org_id'))
+        batch_op.drop_column('org_id')
+
+    op.drop_table('organization')
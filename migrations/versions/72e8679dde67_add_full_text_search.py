@@ -0,0 +1,82 @@
+"""Add full text search
+
+Revision ID: 72e8679dde67
+Revises: 8dd46dfc2aae
+Create Date: 2026-10-19 18:26:22.621817
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '72e8679dde67'
+down_revision = '8dd46dfc2aae'
+branch_labels = None
+depends_on = None
+
+# Índice de busca -> (tabela de origem, colunas). Ver app.busca
+INDICES = {
+    'components_fts': ('components', ['name', 'especifies']),
+    'location_fts'  : ('location', ['city', 'state', 'country']),
+    'post_fts'      : ('post', ['body']),
+}
+
+
+def _sqlite(indice, tabela, colunas):
+    lista = ', '.join(colunas)
+    novos = ', '.join(f'new.{c}' for c in colunas)
+    antigos = ', '.join(f'old.{c}' for c in colunas)
+    # Conteúdo externo: o FTS5 guarda só o índice, o texto fica na tabela
+    op.execute(f"""
+        CREATE VIRTUAL TABLE {indice} USING fts5(
+            {lista}, content='{tabela}', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+    """)
+    op.execute(f"""
+        CREATE TRIGGER {indice}_ai AFTER INSERT ON {tabela} BEGIN
+            INSERT INTO {indice}(rowid, {lista}) VALUES (new.id, {novos});
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER {indice}_ad AFTER DELETE ON {tabela} BEGIN
+            INSERT INTO {indice}({indice}, rowid, {lista}) VALUES ('delete', old.id, {antigos});
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER {indice}_au AFTER UPDATE ON {tabela} BEGIN
+            INSERT INTO {indice}({indice}, rowid, {lista}) VALUES ('delete', old.id, {antigos});
+            INSERT INTO {indice}(rowid, {lista}) VALUES (new.id, {novos});
+        END
+    """)
+    op.execute(f"INSERT INTO {indice}({indice}) VALUES ('rebuild')")
+
+
+def _postgresql(indice, tabela, colunas):
+    # O índice de expressão se atualiza sozinho; a expressão é a mesma de app.busca
+    texto = " || ' ' || ".join(f"coalesce({c}, '')" for c in colunas)
+    op.execute(
+        f"CREATE INDEX ix_{indice} ON {tabela} "
+        f"USING gin (to_tsvector('simple'::regconfig, {texto}))"
+    )
+
+
+def upgrade():
+    dialeto = op.get_bind().dialect.name
+    for indice, (tabela, colunas) in INDICES.items():
+        if dialeto == 'sqlite':
+            _sqlite(indice, tabela, colunas)
+        elif dialeto == 'postgresql':
+            _postgresql(indice, tabela, colunas)
+
+
+def downgrade():
+    dialeto = op.get_bind().dialect.name
+    for indice, (tabela, _) in INDICES.items():
+        if dialeto == 'sqlite':
+            for sufixo in ('ai', 'ad', 'au'):
+                op.execute(f'DROP TRIGGER IF EXISTS {indice}_{sufixo}')
+            op.execute(f'DROP TABLE IF EXISTS {indice}')
+        elif dialeto == 'postgresql':
+            op.execute(f'DROP INDEX IF EXISTS ix_{indice}')
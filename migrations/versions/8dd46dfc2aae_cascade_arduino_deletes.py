@@ -0,0 +1,59 @@
+"""Cascade arduino deletes
+
+Revision ID: 8dd46dfc2aae
+Revises: 64bf9c0f2a42
+Create Date: 2026-10-19 18:23:10.291720
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8dd46dfc2aae'
+down_revision = '64bf9c0f2a42'
+branch_labels = None
+depends_on = None
+
+# As chaves estrangeiras foram criadas sem nome; no SQLite o batch dá a elas
+# o nome desta convenção ao refletir a tabela
+CONVENCAO = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+TABELAS = ['arduino_components', 'arduino_key', 'arduino_stats', 'uv_register', 'uv_rollup']
+
+
+def _trocar_fk(tabela, ondelete):
+    nome = f'fk_{tabela}_arduino_id_arduino'
+    for fk in sa.inspect(op.get_bind()).get_foreign_keys(tabela):
+        if fk['referred_table'] == 'arduino' and fk['constrained_columns'] == ['arduino_id']:
+            atual = fk['name'] or nome
+            break
+    else:
+        atual = None
+
+    with op.batch_alter_table(tabela, schema=None, naming_convention=CONVENCAO) as batch_op:
+        if atual is not None:
+            batch_op.drop_constraint(atual, type_='foreignkey')
+        batch_op.create_foreign_key(nome, 'arduino', ['arduino_id'], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    with op.batch_alter_table('arduino', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+    with op.batch_alter_table('uv_register', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_uv_register_arduino_id'), ['arduino_id'], unique=False)
+
+    for tabela in TABELAS:
+        _trocar_fk(tabela, 'CASCADE')
+
+
+def downgrade():
+    for tabela in reversed(TABELAS):
+        _trocar_fk(tabela, None)
+
+    with op.batch_alter_table('uv_register', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_uv_register_arduino_id'))
+
+    with op.batch_alter_table('arduino', schema=None) as batch_op:
+        batch_op.drop_column('deleted_at')
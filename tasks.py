@@ -1,107 +1,121 @@
-<<<<<<< HEAD
-from invoke import task
-import zipfile
-import os
-import os.path
-import shutil
-from datetime import datetime, timedelta
-
-@task
-def backup(c, source='.', destination='backup', dias_max=7):
-    """
-    Realiza backup compactado do projeto e remove backups antigos.
-
-    Args:
-    dias_max (int): Quantos dias manter os backups antigos.
-    """
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    temp_backup_dir = os.path.join(destination, f'temp_{timestamp}')
-    zip_filename = os.path.join(destination, f'backup_{timestamp}.zip')
-
-    os.makedirs(temp_backup_dir, exist_ok=True)
-
-    # Arquivos a incluir no backup
-    itens_para_backup = ['src', 'data', 'tasks.py']
-
-    for item in itens_para_backup:
-        if os.path.exists(item):
-            destino_item = os.path.join(temp_backup_dir, item)
-            try:
-                if os.path.isdir(item):
-                    shutil.copytree(item, destino_item)
-                else:
-                    shutil.copy2(item, destino_item)
-                print(f"Copiado: {item}")
-            except Exception as e:
-                print(f"Erro ao copiar {item}: {e}")
-
-    # Compacta o backup
-    with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for root, dirs, files in os.walk(temp_backup_dir):
-            for file in files:
-                file_path = os.path.join(root, file)
-                zipf.write(file_path, arcname=os.path.relpath(file_path, temp_backup_dir))
-
-    print(f"\n Backup compactado criado em: {zip_filename}")
-
-    # Remove diretório temporário
-    shutil.rmtree(temp_backup_dir)
-
-    # Limpeza de backups antigos
-    remover_antigos_backups(destination, dias_max)
-
-
-def remover_antigos_backups(pasta_backup, dias_max):
-    """
-    Remove arquivos de backup .zip com mais de X dias.
-    """
-    agora = datetime.now()
-    limite = agora - timedelta(days=int(dias_max))
-
-    for arquivo in os.listdir(pasta_backup):
-        if arquivo.endswith('.zip'):
-            caminho = os.path.join(pasta_backup, arquivo)
-            mod_time = datetime.fromtimestamp(os.path.getmtime(caminho))
-            if mod_time < limite:
-                os.remove(caminho)
-                print(f" Backup antigo removido: {arquivo}")        
-
-
-
-
-
-
-
-
-@task
-def descompactar(c, source='.', destination='backup'):
-    maior = ''
-    for f in os.listdir(destination):
-        if os.path.isfile(os.path.join(destination, f)):
-            aux = f
-            if aux > maior:
-                maior = aux
-
-    with zipfile.ZipFile(os.path.join(destination, maior), 'r') as zip_ref:
-        zip_ref.extractall('descompactado')
-
-    print(f"Arquivos extraídos com sucesso")
-
-=======
 from invoke import task
+from invoke.exceptions import Exit
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import sqlite3
+import tempfile
+import time
 import zipfile
+import zlib
 import os
 import os.path
 import shutil
 from datetime import datetime, timedelta
 
+# Arquivos a incluir no backup
+ITENS_PARA_BACKUP = ['src', 'data', 'tasks.py', 'app.db']
+
+MANIFESTO = 'manifesto.json'
+TAMANHO_BLOCO = 1024 * 1024
+CABECALHO_SQLITE = b'SQLite format 3\x00'
+
+
+def _listar_arquivos(itens):
+    """
+    Lista os caminhos relativos de todos os arquivos dos itens de backup.
+    """
+    arquivos = []
+    for item in itens:
+        if os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                for file in files:
+                    arquivos.append(os.path.join(root, file))
+        elif os.path.exists(item):
+            arquivos.append(item)
+    return arquivos
+
+
+def _eh_sqlite(caminho):
+    with open(caminho, 'rb') as arquivo:
+        return arquivo.read(len(CABECALHO_SQLITE)) == CABECALHO_SQLITE
+
+
+def _copia_sqlite(caminho, destino):
+    """
+    Cópia consistente de um banco SQLite em uso, pela API de backup do
+    SQLite. Copiar o arquivo direto pode pegar uma escrita pela metade, e o
+    sha256 do manifesto seria o da cópia já corrompida.
+    """
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    origem = sqlite3.connect(f'file:{caminho}?mode=ro', uri=True)
+    copia = sqlite3.connect(destino)
+    try:
+        with copia:
+            origem.backup(copia)
+    except sqlite3.Error as e:
+        raise OSError(f'Falha na cópia do banco: {e}') from e
+    finally:
+        copia.close()
+        origem.close()
+    return destino
+
+
+def _comprimir_arquivo(caminho, destino):
+    """
+    Comprime um arquivo em gzip calculando o sha256 do conteúdo original.
+
+    O zlib libera o GIL durante a compressão, então várias chamadas
+    em threads diferentes comprimem arquivos de fato em paralelo.
+    """
+    sha = hashlib.sha256()
+    tamanho = 0
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    with open(caminho, 'rb') as origem, open(destino, 'wb') as saida:
+        while bloco := origem.read(TAMANHO_BLOCO):
+            sha.update(bloco)
+            tamanho += len(bloco)
+            saida.write(compressor.compress(bloco))
+        saida.write(compressor.flush())
+
+    return sha.hexdigest(), tamanho
+
+
+def _sha256_arquivo(caminho):
+    sha = hashlib.sha256()
+    tamanho = 0
+    with open(caminho, 'rb') as origem:
+        while bloco := origem.read(TAMANHO_BLOCO):
+            sha.update(bloco)
+            tamanho += len(bloco)
+    return sha.hexdigest(), tamanho
+
+
 @task
-def backup(c, source='.', destination='backup', dias_max=7):
+def backup(c, source='.', destination='backup', dias_max=7, paralelo=False, threads=0):
     """
     Realiza backup compactado do projeto e remove backups antigos.
 
+    Todo backup leva um manifesto com o sha256 de cada arquivo, usado
+    pela restauração para verificar a integridade.
+
     Args:
     dias_max (int): Quantos dias manter os backups antigos.
+    paralelo (bool): Comprime cada arquivo em uma thread separada (gzip por arquivo).
+    threads (int): Quantidade de threads no modo paralelo (0 = número de CPUs).
+    """
+    fazer_backup(source, destination, dias_max, paralelo, threads)
+
+
+def fazer_backup(source='.', destination='backup', dias_max=7, paralelo=False, threads=0,
+                 ao_avancar=None):
+    """
+    Corpo da task backup, também usado pelo job `backup` (ver app.tarefas).
+
+    `ao_avancar(copiados, total)` é chamada a cada arquivo copiado.
+    Retorna o caminho do zip criado.
     """
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     temp_backup_dir = os.path.join(destination, f'temp_{timestamp}')
@@ -109,35 +123,82 @@ def backup(c, source='.', destination='backup', dias_max=7):
 
     os.makedirs(temp_backup_dir, exist_ok=True)
 
-    # Arquivos a incluir no backup
-    itens_para_backup = ['src', 'data', 'tasks.py']
-
-    for item in itens_para_backup:
-        if os.path.exists(item):
-            destino_item = os.path.join(temp_backup_dir, item)
-            try:
-                if os.path.isdir(item):
-                    shutil.copytree(item, destino_item)
-                else:
-                    shutil.copy2(item, destino_item)
-                print(f"Copiado: {item}")
-            except Exception as e:
-                print(f"Erro ao copiar {item}: {e}")
-
-    # Compacta o backup
-    with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for root, dirs, files in os.walk(temp_backup_dir):
-            for file in files:
-                file_path = os.path.join(root, file)
-                zipf.write(file_path, arcname=os.path.relpath(file_path, temp_backup_dir))
+    arquivos = _listar_arquivos(os.path.join(source, item) for item in ITENS_PARA_BACKUP)
+    manifesto = {
+        'versao': 1,
+        'criado_em': timestamp,
+        'modo': 'paralelo' if paralelo else 'serial',
+        'arquivos': {},
+    }
 
-    print(f"\n Backup compactado criado em: {zip_filename}")
+    def copiado():
+        if ao_avancar is not None:
+            ao_avancar(len(manifesto['arquivos']), len(arquivos))
+
+    def origem(arquivo):
+        # Bancos SQLite entram no backup por uma cópia consistente
+        if _eh_sqlite(arquivo):
+            relativo = os.path.relpath(arquivo, source)
+            return _copia_sqlite(arquivo, os.path.join(temp_backup_dir, 'sqlite', relativo))
+        return arquivo
+
+    try:
+        if paralelo:
+            # Cada arquivo vira um membro .gz já comprimido; o zip só armazena
+            def copiar_e_comprimir(arquivo):
+                return _comprimir_arquivo(
+                    origem(arquivo),
+                    os.path.join(temp_backup_dir, os.path.relpath(arquivo, source) + '.gz'),
+                )
+
+            with ThreadPoolExecutor(max_workers=int(threads) or os.cpu_count()) as pool:
+                futuros = {arquivo: pool.submit(copiar_e_comprimir, arquivo) for arquivo in arquivos}
 
-    # Remove diretório temporário
-    shutil.rmtree(temp_backup_dir)
+            with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_STORED) as zipf:
+                for arquivo, futuro in futuros.items():
+                    arcname = os.path.relpath(arquivo, source).replace(os.sep, '/')
+                    try:
+                        sha, tamanho = futuro.result()
+                    except OSError as e:
+                        print(f"Erro ao copiar {arcname}: {e}")
+                        continue
+                    zipf.write(os.path.join(temp_backup_dir, arcname + '.gz'), arcname=arcname + '.gz')
+                    manifesto['arquivos'][arcname] = {
+                        'membro': arcname + '.gz',
+                        'sha256': sha,
+                        'tamanho': tamanho,
+                    }
+                    print(f"Copiado: {arcname}")
+                    copiado()
+                zipf.writestr(MANIFESTO, json.dumps(manifesto, indent=2))
+        else:
+            with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zipf:
+                for arquivo in arquivos:
+                    arcname = os.path.relpath(arquivo, source).replace(os.sep, '/')
+                    try:
+                        lido = origem(arquivo)
+                        sha, tamanho = _sha256_arquivo(lido)
+                        zipf.write(lido, arcname=arcname)
+                    except OSError as e:
+                        print(f"Erro ao copiar {arcname}: {e}")
+                        continue
+                    manifesto['arquivos'][arcname] = {
+                        'membro': arcname,
+                        'sha256': sha,
+                        'tamanho': tamanho,
+                    }
+                    print(f"Copiado: {arcname}")
+                    copiado()
+                zipf.writestr(MANIFESTO, json.dumps(manifesto, indent=2))
+    finally:
+        # Remove diretório temporário
+        shutil.rmtree(temp_backup_dir)
+
+    print(f"\n Backup compactado criado em: {zip_filename}")
 
     # Limpeza de backups antigos
     remover_antigos_backups(destination, dias_max)
+    return zip_filename
 
 
 def remover_antigos_backups(pasta_backup, dias_max):
@@ -153,27 +214,213 @@ def remover_antigos_backups(pasta_backup, dias_max):
             mod_time = datetime.fromtimestamp(os.path.getmtime(caminho))
             if mod_time < limite:
                 os.remove(caminho)
-                print(f" Backup antigo removido: {arquivo}")        
+                print(f" Backup antigo removido: {arquivo}")
 
 
+def backup_mais_recente(pasta_backup):
+    """
+    Retorna o caminho do backup .zip modificado por último, ou None.
+    """
+    backups = [
+        os.path.join(pasta_backup, f)
+        for f in os.listdir(pasta_backup)
+        if f.startswith('backup_') and f.endswith('.zip')
+        and os.path.isfile(os.path.join(pasta_backup, f))
+    ]
+    if not backups:
+        return None
+    return max(backups, key=os.path.getmtime)
 
 
+def _restaurar_membro(zip_path, membro, destino, sha_esperado):
+    """
+    Extrai um membro do zip para `destino` calculando o sha256 no caminho.
+
+    Cada chamada abre o próprio ZipFile, então pode rodar em uma thread
+    separada. Se o conteúdo não confere com o manifesto o arquivo é
+    removido e a função retorna False.
+    """
+    sha = hashlib.sha256()
+    descompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if membro.endswith('.gz') else None
+
+    os.makedirs(os.path.dirname(destino) or '.', exist_ok=True)
+    with zipfile.ZipFile(zip_path, 'r') as zipf, \
+            zipf.open(membro) as origem, open(destino, 'wb') as saida:
+        while bloco := origem.read(TAMANHO_BLOCO):
+            if descompressor is not None:
+                bloco = descompressor.decompress(bloco)
+            sha.update(bloco)
+            saida.write(bloco)
+        if descompressor is not None:
+            resto = descompressor.flush()
+            sha.update(resto)
+            saida.write(resto)
+
+    if sha.hexdigest() != sha_esperado:
+        os.remove(destino)
+        return False
+    return True
+
+
+def _destino(saida, nome):
+    """
+    Caminho de `nome` (do manifesto) dentro de `saida`. Nomes absolutos ou
+    com .. que sairiam de `saida` são recusados.
+    """
+    base = os.path.realpath(saida)
+    destino = os.path.realpath(os.path.join(base, nome))
+    if os.path.isabs(nome) or '\\' in nome or os.path.commonpath([base, destino]) != base:
+        raise Exit(f"Nome inválido no manifesto: {nome!r}")
+    return destino
 
 
+def _restaurar_tabela(arquivo_db, tabela, banco):
+    """
+    Substitui o conteúdo de uma tabela do banco pelo da cópia em backup.
+
+    Copia só as colunas que existem nos dois, pelo nome: o backup pode ser
+    de antes de uma migração que acrescentou ou reordenou colunas. As
+    colunas novas ficam com o valor padrão.
+    """
+    con = sqlite3.connect(banco)
+    try:
+        con.execute('ATTACH DATABASE ? AS backup', (arquivo_db,))
+        # table_info: (cid, name, type, notnull, dflt_value, pk)
+        atuais = [linha[1] for linha in con.execute('SELECT * FROM pragma_table_info(?, ?)', (tabela, 'main'))]
+        antigas = {linha[1] for linha in con.execute('SELECT * FROM pragma_table_info(?, ?)', (tabela, 'backup'))}
+        if not antigas:
+            raise Exit(f"Tabela {tabela} não existe no backup")
+        if not atuais:
+            raise Exit(f"Tabela {tabela} não existe em {banco}")
+        comuns = [coluna for coluna in atuais if coluna in antigas]
+        if not comuns:
+            raise Exit(f"Tabela {tabela} não tem colunas em comum com o backup")
+        colunas = ', '.join('"{}"'.format(coluna.replace('"', '""')) for coluna in comuns)
+        try:
+            with con:
+                con.execute(f'DELETE FROM main."{tabela}"')
+                con.execute(f'INSERT INTO main."{tabela}" ({colunas}) SELECT {colunas} FROM backup."{tabela}"')
+        except sqlite3.IntegrityError as e:
+            # Ex.: coluna nova NOT NULL sem valor padrão
+            raise Exit(f"Tabela {tabela} não pôde ser restaurada: {e}")
+        total = con.execute(f'SELECT count(*) FROM main."{tabela}"').fetchone()[0]
+    finally:
+        con.close()
+    ignoradas = sorted(antigas - set(atuais))
+    if ignoradas:
+        print(f"Colunas do backup que não existem mais em {tabela}: {', '.join(ignoradas)}")
+    return total
 
 
 @task
-def descompactar(c, source='.', destination='backup'):
-    maior = ''
-    for f in os.listdir(destination):
-        if os.path.isfile(os.path.join(destination, f)):
-            aux = f
-            if aux > maior:
-                maior = aux
+def descompactar(c, source='.', destination='backup', arquivo='', saida='descompactado',
+                 item='', tabela='', banco='app.db', threads=0):
+    """
+    Restaura um backup verificando o sha256 de cada arquivo extraído.
+
+    Args:
+    arquivo (str): Backup a restaurar. Por padrão o mais recente de `destination`.
+    saida (str): Pasta onde os arquivos são extraídos.
+    item (str): Restaura apenas este arquivo ou pasta (ex.: data/data_example.py).
+    tabela (str): Restaura apenas esta tabela do app.db do backup para `banco`.
+    threads (int): Quantidade de threads na verificação (0 = número de CPUs).
+    """
+    zip_path = arquivo or backup_mais_recente(destination)
+    if not zip_path:
+        raise Exit(f"Nenhum backup encontrado em {destination}")
+
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        if MANIFESTO not in zip_ref.namelist():
+            # Backups antigos não têm manifesto: extrai sem verificação
+            if tabela or item:
+                raise Exit("Backup sem manifesto só pode ser restaurado por completo")
+            zip_ref.extractall(saida)
+            print(f"Arquivos extraídos sem verificação (backup sem manifesto)")
+            return
+        manifesto = json.loads(zip_ref.read(MANIFESTO))
+
+    arquivos = manifesto['arquivos']
+
+    if tabela:
+        if 'app.db' not in arquivos:
+            raise Exit("Backup não contém o app.db")
+        with tempfile.TemporaryDirectory() as tmp:
+            copia = os.path.join(tmp, 'app.db')
+            info = arquivos['app.db']
+            if not _restaurar_membro(zip_path, info['membro'], copia, info['sha256']):
+                raise Exit("Checksum do app.db não confere; restauração cancelada")
+            total = _restaurar_tabela(copia, tabela, banco)
+        print(f"Tabela {tabela} restaurada em {banco} ({total} linhas)")
+        return
+
+    if item:
+        prefixo = item.rstrip('/') + '/'
+        arquivos = {
+            nome: info for nome, info in arquivos.items()
+            if nome == item or nome.startswith(prefixo)
+        }
+        if not arquivos:
+            raise Exit(f"{item} não existe no backup")
+
+    # Todos os nomes são conferidos antes de extrair qualquer arquivo
+    destinos = {nome: _destino(saida, nome) for nome in arquivos}
+
+    with ThreadPoolExecutor(max_workers=int(threads) or os.cpu_count()) as pool:
+        resultados = {
+            nome: pool.submit(
+                _restaurar_membro,
+                zip_path,
+                info['membro'],
+                destinos[nome],
+                info['sha256'],
+            )
+            for nome, info in arquivos.items()
+        }
+    corrompidos = [nome for nome, futuro in resultados.items() if not futuro.result()]
+
+    if corrompidos:
+        for nome in corrompidos:
+            print(f"Checksum inválido: {nome}")
+        raise Exit(f"{len(corrompidos)} arquivo(s) corrompido(s) em {zip_path}")
+
+    print(f"Arquivos extraídos e verificados com sucesso ({len(resultados)} arquivos)")
+
+
+@task
+def benchmark_senhas(c, metodos='scrypt:32768:8:1,scrypt:16384:8:1,pbkdf2:sha256:600000,pbkdf2:sha256:100000',
+                     threads=0, segundos=3):
+    """
+    Mede quantos logins por segundo cada configuração de hash de senha aguenta.
+
+    Args:
+    metodos (str): Métodos do werkzeug separados por vírgula (valores de PASSWORD_HASH_METHOD).
+    threads (int): Verificações simultâneas, como PASSWORD_HASH_WORKERS (0 = número de CPUs).
+    segundos (int): Duração da medição de cada método.
+    """
+    from werkzeug.security import generate_password_hash, check_password_hash
+
+    threads = int(threads) or os.cpu_count()
+    print(f"{'Método':<28}{'1 verificação':>16}{'logins/s':>12}  ({threads} threads)")
+
+    for metodo in metodos.split(','):
+        hash_senha = generate_password_hash('senha-de-teste', method=metodo)
+
+        inicio = time.perf_counter()
+        check_password_hash(hash_senha, 'senha-de-teste')
+        latencia = time.perf_counter() - inicio
+
+        fim = time.perf_counter() + float(segundos)
 
-    with zipfile.ZipFile(os.path.join(destination, maior), 'r') as zip_ref:
-        zip_ref.extractall('descompactado')
+        def verificar_ate_fim():
+            total = 0
+            while time.perf_counter() < fim:
+                check_password_hash(hash_senha, 'senha-de-teste')
+                total += 1
+            return total
 
-    print(f"Arquivos extraídos com sucesso")
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            total = sum(pool.map(lambda _: verificar_ate_fim(), range(threads)))
+        duracao = time.perf_counter() - inicio
 
->>>>>>> upstream/main
+        print(f"{metodo:<28}{latencia * 1000:>13.1f} ms{total / duracao:>12.1f}")
@@ -0,0 +1,73 @@
+# tests/conftest.py
+"""
+Aplicações de teste, cada uma com o seu banco SQLite em memória.
+"""
+from datetime import datetime, timezone
+
+import pytest
+
+from app import create_app, db
+from app.models import Arduino, Category, Components, Location, Organization, User
+from config import Config
+
+
+@pytest.fixture
+def config(tmp_path):
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = 'sqlite://'
+        WTF_CSRF_ENABLED = False
+        PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+        ANALYTICS_DIR = str(tmp_path / 'analytics')
+        JINJA_CACHE_DIR = str(tmp_path / 'jinja_cache')
+        BACKUP_DIR = str(tmp_path / 'backup')
+        EXPORT_DIR = str(tmp_path / 'exports')
+
+    return TestConfig
+
+
+@pytest.fixture
+def app(config):
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def dados(app):
+    """
+    Uma organização com um usuário (t / p), um componente, uma
+    localização e um arduino.
+    """
+    organizacao = Organization(name='Padrão', slug='padrao')
+    db.session.add(organizacao)
+    db.session.flush()
+    usuario = User(username='t', email='t@example.com', org_id=organizacao.id)
+    usuario.set_password('p')
+    categoria = Category(name='Sensor')
+    db.session.add_all([usuario, categoria])
+    db.session.flush()
+    componente = Components(name='GUVA-S12SD', especifies='Sensor UV', price=10.0,
+                            category_id=categoria.id)
+    local = Location(country='Brasil', state='ES', city='Vila Velha', longitude=1.0, latitude=2.0)
+    arduino = Arduino(user_id=usuario.id, org_id=organizacao.id,
+                      register_day=datetime.now(timezone.utc))
+    db.session.add_all([componente, local, arduino])
+    db.session.commit()
+    return {'org_id': organizacao.id, 'user_id': usuario.id, 'arduino_id': arduino.id,
+            'location_id': local.id, 'component_id': componente.id}
+
+
+@pytest.fixture
+def logado(client, dados):
+    resposta = client.post('/login', data={'username': 't', 'password': 'p'})
+    assert resposta.status_code == 302
+    return client
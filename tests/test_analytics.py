@@ -0,0 +1,53 @@
+# tests/test_analytics.py
+import os
+from datetime import datetime, timezone
+
+import pytest
+import sqlalchemy as sa
+
+from app import analytics, db, jobs
+from app.models import Job, UVRegister
+
+pytestmark = pytest.mark.skipif(not analytics.disponivel(), reason='NumPy ausente')
+
+
+def _inserir(dados, ids):
+    db.session.execute(sa.insert(UVRegister), [
+        {'id': id, 'arduino_id': dados['arduino_id'], 'org_id': dados['org_id'],
+         'location_id': dados['location_id'], 'register_date': datetime.now(timezone.utc),
+         'frequency': float(id), 'flag': 0}
+        for id in ids
+    ])
+    db.session.commit()
+
+
+def test_id_menor_visivel_depois(app, dados):
+    # O id 3 faz commit depois do 5 (outra transação): entra na atualização seguinte
+    snapshot = analytics.get_snapshot(app.config['ANALYTICS_DIR'], dados['org_id'])
+    _inserir(dados, [1, 2, 4, 5])
+    assert snapshot.refresh(db.session) == 4
+
+    _inserir(dados, [3])
+    assert snapshot.refresh(db.session) == 1
+    assert sorted(snapshot.colunas()['id'].tolist()) == [1, 2, 3, 4, 5]
+    assert snapshot.refresh(db.session) == 0
+
+
+def test_pagina_so_le_o_snapshot(app, logado, dados):
+    _inserir(dados, [1, 2, 3])
+    assert logado.get('/estatistica').status_code == 200
+    # Sem snapshot, a página usa o SQL e não grava nada
+    assert not os.path.exists(app.config['ANALYTICS_DIR'])
+
+    job = jobs.enfileirar(db.session, 'atualizar-snapshots', {})
+    db.session.commit()
+    jobs.Worker(app, paralelo=1).rodar(ate_esvaziar=True)
+    db.session.expire_all()
+    assert db.session.get(Job, job.id).result == {'registros': 3}
+
+    snapshot = analytics.get_snapshot(app.config['ANALYTICS_DIR'], dados['org_id'])
+    assert snapshot.pronto()
+    _inserir(dados, [4])
+    assert logado.get('/estatistica').status_code == 200
+    # A leitura nova só entra na próxima execução da tarefa
+    assert analytics.resumo(snapshot.colunas())['count'] == 3
@@ -0,0 +1,74 @@
+# tests/test_anomaly.py
+from datetime import datetime, timedelta, timezone
+
+from app import anomaly, db, exclusao, ingest
+from app.main import routes as main_routes
+
+
+def _leituras(dados, frequencias, inicio=datetime(2026, 1, 1, tzinfo=timezone.utc)):
+    return [
+        {'register_date': inicio + timedelta(minutes=i), 'location_id': dados['location_id'],
+         'frequency': frequencia}
+        for i, frequencia in enumerate(frequencias)
+    ]
+
+
+def _estado(app, arduino_id):
+    estado = anomaly.get_detector(app)._estados.get(arduino_id)
+    return estado and (estado.n, estado.media, estado.variancia)
+
+
+def test_nao_finito_fora_da_faixa():
+    detector = anomaly.Detector()
+    leituras = [{'register_date': datetime(2026, 1, 1, 0, i), 'frequency': 1.0 + i % 3}
+                for i in range(40)]
+    estado = detector.avaliar(1, leituras)
+    detector.aplicar(1, estado)
+    antes = (estado.n, estado.media, estado.variancia)
+
+    leituras = [{'register_date': datetime(2026, 1, 1, 1), 'frequency': float('nan')},
+                {'register_date': datetime(2026, 1, 1, 2), 'frequency': float('inf')}]
+    estado = detector.avaliar(1, leituras)
+    assert [leitura['flag'] for leitura in leituras] == [anomaly.FORA_FAIXA] * 2
+    assert (estado.n, estado.media, estado.variancia) == antes
+
+    # Picos continuam sendo detectados
+    leituras = [{'register_date': datetime(2026, 1, 1, 3), 'frequency': 15.0}]
+    detector.avaliar(1, leituras)
+    assert leituras[0]['flag'] & anomaly.PICO
+
+
+def test_estado_so_muda_com_commit(app, dados):
+    arduino_id = dados['arduino_id']
+    ingest.registrar_leituras(db.session, arduino_id, _leituras(dados, [1.0, 2.0, 3.0]))
+    assert _estado(app, arduino_id) is None
+    db.session.commit()
+    gravado = _estado(app, arduino_id)
+    assert gravado[0] == 3
+
+    # Um envio desfeito não altera o detector
+    ingest.registrar_leituras(db.session, arduino_id,
+                              _leituras(dados, [9.0] * 5, datetime(2026, 1, 2, tzinfo=timezone.utc)))
+    db.session.rollback()
+    assert _estado(app, arduino_id) == gravado
+
+    ingest.registrar_leituras(db.session, arduino_id,
+                              _leituras(dados, [2.0], datetime(2026, 1, 3, tzinfo=timezone.utc)))
+    db.session.commit()
+    assert _estado(app, arduino_id)[0] == 4
+
+
+def test_exclusao_esquece_o_estado(app, logado, dados, monkeypatch):
+    monkeypatch.setattr(main_routes, 'validate_csrf', lambda token: None)
+    ingest.registrar_leituras(db.session, dados['arduino_id'], _leituras(dados, [1.0, 2.0]))
+    db.session.commit()
+    assert _estado(app, dados['arduino_id']) is not None
+
+    logado.post(f"/excluir_arduino/{dados['arduino_id']}")
+    assert _estado(app, dados['arduino_id']) is None
+
+    # E no processo que apaga os registros
+    ingest.registrar_leituras(db.session, dados['arduino_id'], _leituras(dados, [1.0]))
+    db.session.commit()
+    exclusao.apagar(db.session, dados['arduino_id'], 100)
+    assert _estado(app, dados['arduino_id']) is None
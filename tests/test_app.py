@@ -0,0 +1,61 @@
+# tests/test_app.py
+from datetime import datetime, timedelta, timezone
+
+import sqlalchemy as sa
+
+from app import create_app, db
+from app.models import Components, UVRegister
+
+
+def test_apps_isoladas(config, dados):
+    # Outra aplicação no mesmo processo, com o seu próprio banco em memória
+    outra = create_app(config)
+    with outra.app_context():
+        db.create_all()
+        assert db.session.scalar(sa.select(sa.func.count()).select_from(Components)) == 0
+        db.session.remove()
+    assert db.session.scalar(sa.select(sa.func.count()).select_from(Components)) == 1
+
+
+def test_paginas(logado):
+    for pagina in ('/index', '/estatistica', '/frota', '/user/t'):
+        assert logado.get(pagina).status_code == 200
+
+
+def _leituras(dados, n=3):
+    agora = datetime.now(timezone.utc)
+    return {'registros': [
+        {'register_date': (agora - timedelta(minutes=i)).isoformat(),
+         'location_id': dados['location_id'], 'frequency': 1.5 + i}
+        for i in range(n)
+    ]}
+
+
+def test_envio_de_registros(logado, dados):
+    resposta = logado.post(f"/api/arduino/{dados['arduino_id']}/registros", json=_leituras(dados))
+    assert resposta.status_code == 201
+    assert resposta.json == {'inseridos': 3}
+    assert db.session.scalar(sa.select(sa.func.count()).select_from(UVRegister)) == 3
+
+
+def test_envio_invalido(logado, dados):
+    resposta = logado.post(f"/api/arduino/{dados['arduino_id']}/registros", json={'registros': 'x'})
+    assert resposta.status_code == 400
+
+
+def test_envio_de_outro_arduino(logado, dados):
+    resposta = logado.post('/api/arduino/999/registros', json=_leituras(dados))
+    assert resposta.status_code == 404
+
+
+def test_busca(logado, dados):
+    resposta = logado.get('/api/busca', query_string={'tipo': 'componentes', 'q': 'guva'})
+    assert resposta.status_code == 200
+    assert [item['id'] for item in resposta.json['resultados']] == [dados['component_id']]
+
+    resposta = logado.get('/api/busca', query_string={'q': 'vila'})
+    assert [item['city'] for item in resposta.json['locais']] == ['Vila Velha']
+
+
+def test_busca_vazia(logado, dados):
+    assert logado.get('/api/busca', query_string={'tipo': 'componentes'}).status_code == 400
@@ -0,0 +1,136 @@
+# tests/test_arquivo.py
+import csv
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import sqlalchemy as sa
+
+from app import analytics, arquivo, db, health, ingest, jobs, rollups, tarefas
+from app.main.routes import _estatistica_sql
+from app.models import ArduinoStats, Job, Location, UVChunk, UVRegister
+
+CAMPOS_SAUDE = ('arduino_id', 'readings_count', 'outlier_count', 'gap_count', 'max_gap_seconds',
+                'first_reading', 'last_reading', 'hour_start', 'hour_count', 'previous_hour_count')
+
+
+@pytest.fixture
+def registros(dados):
+    # ~45 dias de leituras em duas localizações, algumas suspeitas
+    outro = Location(country='Brasil', state='ES', city='Vitória', longitude=1.0, latitude=2.0)
+    db.session.add(outro)
+    db.session.flush()
+    agora = datetime.now(timezone.utc)
+    db.session.execute(sa.insert(UVRegister), [
+        {'arduino_id': dados['arduino_id'], 'org_id': dados['org_id'],
+         'location_id': outro.id if i % 3 else dados['location_id'],
+         'register_date': agora - timedelta(hours=7 * i, microseconds=i),
+         'frequency': 1.0 + (i * 37 % 11) / 4, 'flag': int(i % 13 == 0)}
+        for i in range(150)
+    ])
+    db.session.commit()
+
+
+def _arquivar():
+    arquivados = arquivo.arquivar(db.session, 3)
+    assert arquivados > 100
+    assert db.session.scalar(sa.select(sa.func.count()).select_from(UVChunk)) > 0
+
+
+def _saude():
+    health.reconstruir(db.session, 3600)
+    return [
+        (tuple(getattr(stats, campo) for campo in CAMPOS_SAUDE), stats.mean, stats.m2)
+        for stats in db.session.scalars(sa.select(ArduinoStats))
+    ]
+
+
+def _exportar(app, org_id):
+    job = jobs.enfileirar(db.session, 'exportar-registros', {'org_id': org_id})
+    db.session.commit()
+    jobs.Worker(app, paralelo=1).rodar(ate_esvaziar=True)
+    db.session.expire_all()
+    assert db.session.get(Job, job.id).state == jobs.CONCLUIDO
+    with open(tarefas.arquivo_exportacao(job.id), newline='', encoding='utf-8') as f:
+        linhas = list(csv.DictReader(f))
+    return linhas
+
+
+def _estatisticas(org_id):
+    estatisticas = _estatistica_sql(org_id)
+    estatisticas['top_locations'] = [
+        (location.id, count, pytest.approx(media)) for location, count, media in estatisticas['top_locations']
+    ]
+    estatisticas['average_frequency'] = pytest.approx(estatisticas['average_frequency'])
+    estatisticas['chart_values'] = [v if v is None else pytest.approx(v) for v in estatisticas['chart_values']]
+    return estatisticas
+
+
+def test_blocos(registros, dados):
+    _arquivar()
+    lidas = [
+        (bloco.arduino_id, data, frequencia)
+        for bloco, datas, frequencias in arquivo.blocos(db.session, tamanho_lote=2)
+        for data, frequencia in zip(datas, frequencias)
+    ]
+    contagem = db.session.scalar(sa.select(sa.func.sum(UVChunk.count)))
+    assert len(lidas) == contagem
+    assert all(type(data) is datetime and data.tzinfo is None for _, data, _ in lidas)
+
+
+def test_exportacao_com_arquivados(app, registros, dados):
+    def sem_id(linhas):
+        return sorted(tuple(v for k, v in linha.items() if k != 'id') for linha in linhas)
+
+    antes = _exportar(app, dados['org_id'])
+    _arquivar()
+    depois = _exportar(app, dados['org_id'])
+    assert sem_id(depois) == sem_id(antes)
+    # Os arquivados perdem o id
+    assert sum(1 for linha in depois if linha['id'] == '') > 100
+
+
+def test_saude_com_arquivados(registros):
+    antes = _saude()
+    _arquivar()
+    depois = _saude()
+    assert [campos for campos, _, _ in depois] == [campos for campos, _, _ in antes]
+    assert [(media, m2) for _, media, m2 in depois] == \
+        [(pytest.approx(media), pytest.approx(m2)) for _, media, m2 in antes]
+
+
+def test_estatistica_com_arquivados(app, registros, dados, monkeypatch):
+    # Os rollups são por dia UTC; no gráfico, os dias arquivados caem no dia de mesma data
+    app.config['DASHBOARD_TIMEZONE'] = 'UTC'
+    rollups.atualizar(db.session)
+    antes = _estatisticas(dados['org_id'])
+    assert antes['uv_registers_count'] == 150 - 12
+    _arquivar()
+
+    def sem_blocos(*args, **kwargs):
+        raise AssertionError('A página não deve descomprimir os blocos')
+
+    monkeypatch.setattr(arquivo, 'blocos', sem_blocos)
+    assert _estatisticas(dados['org_id']) == antes
+
+    # Um registro atrasado para um dia arquivado entra pelos rollups, uma vez só
+    ingest.registrar_leituras(db.session, dados['arduino_id'], [{
+        'register_date': datetime.now(timezone.utc) - timedelta(days=20),
+        'location_id': dados['location_id'], 'frequency': 1.0,
+    }])
+    db.session.commit()
+    assert _estatistica_sql(dados['org_id'])['uv_registers_count'] == 150 - 12 + 1
+
+
+@pytest.mark.skipif(not analytics.disponivel(), reason='NumPy ausente')
+def test_snapshot_reconstruido_com_arquivados(app, registros, dados):
+    rollups.atualizar(db.session)
+    snapshot = analytics.get_snapshot(app.config['ANALYTICS_DIR'], dados['org_id'])
+    snapshot.refresh(db.session)
+    antes = analytics.resumo(snapshot.colunas())
+    _arquivar()
+
+    snapshot.invalidar()
+    snapshot.refresh(db.session)
+    depois = analytics.resumo(snapshot.colunas())
+    assert depois == pytest.approx(antes)
+    assert depois['count'] == _estatistica_sql(dados['org_id'])['uv_registers_count']
@@ -0,0 +1,31 @@
+# tests/test_auth.py
+import sqlalchemy as sa
+
+from app import db
+from app.models import Organization, User
+
+
+def _cadastro(client, **campos):
+    dados = {'username': 'novo', 'email': 'novo@example.com', 'password': 'x', 'password2': 'x'}
+    dados.update(campos)
+    return client.post('/register', data=dados)
+
+
+def test_cadastro_na_organizacao_padrao(client, dados):
+    assert _cadastro(client).status_code == 302
+    usuario = db.session.scalar(sa.select(User).where(User.username == 'novo'))
+    assert usuario.org_id == dados['org_id']
+
+
+def test_cadastro_sem_organizacao_padrao(client):
+    # Banco sem a organização de DEFAULT_ORG_SLUG
+    resposta = _cadastro(client)
+    assert resposta.status_code == 200
+    assert 'Informe o código da sua organização.' in resposta.get_data(as_text=True)
+    assert db.session.scalar(sa.select(sa.func.count()).select_from(User)) == 0
+
+    db.session.add(Organization(name='Escola', slug='escola'))
+    db.session.commit()
+    assert _cadastro(client, organization='escola').status_code == 302
+    assert _cadastro(client, username='outro', email='o@example.com',
+                     organization='inexistente').status_code == 200
@@ -0,0 +1,102 @@
+# tests/test_backup.py
+import hashlib
+import json
+import os
+import sqlite3
+import zipfile
+
+import pytest
+from invoke import Context
+from invoke.exceptions import Exit
+
+import tasks
+
+
+@pytest.fixture
+def projeto(tmp_path):
+    raiz = tmp_path / 'projeto'
+    (raiz / 'data').mkdir(parents=True)
+    (raiz / 'data' / 'exemplo.txt').write_text('dados')
+    con = sqlite3.connect(raiz / 'app.db')
+    with con:
+        con.execute('CREATE TABLE t (x INTEGER)')
+        con.executemany('INSERT INTO t VALUES (?)', [(i,) for i in range(1000)])
+    con.close()
+    return raiz
+
+
+@pytest.mark.parametrize('paralelo', [False, True])
+def test_backup_com_banco_em_escrita(tmp_path, projeto, paralelo):
+    # Uma transação aberta no meio do backup: a cópia tem só o que já foi confirmado
+    escritor = sqlite3.connect(projeto / 'app.db')
+    escritor.execute('BEGIN')
+    escritor.executemany('INSERT INTO t VALUES (?)', [(i,) for i in range(5000)])
+    try:
+        zip_path = tasks.fazer_backup(str(projeto), str(tmp_path / 'backup'), paralelo=paralelo)
+    finally:
+        escritor.rollback()
+        escritor.close()
+
+    saida = tmp_path / 'saida'
+    tasks.descompactar(Context(), arquivo=zip_path, saida=str(saida))
+    assert (saida / 'data' / 'exemplo.txt').read_text() == 'dados'
+    con = sqlite3.connect(saida / 'app.db')
+    assert con.execute('PRAGMA integrity_check').fetchone() == ('ok',)
+    assert con.execute('SELECT count(*) FROM t').fetchone() == (1000,)
+    con.close()
+
+
+@pytest.mark.parametrize('nome', ['../fora.txt', 'data/../../fora.txt', '/tmp/fora_do_backup.txt'])
+def test_restauracao_recusa_nomes_fora_da_saida(tmp_path, nome):
+    zip_path = tmp_path / 'backup_20260101_000000.zip'
+    with zipfile.ZipFile(zip_path, 'w') as zipf:
+        zipf.writestr('membro', 'x')
+        zipf.writestr(tasks.MANIFESTO, json.dumps({
+            'versao': 1,
+            'arquivos': {nome: {'membro': 'membro', 'sha256': hashlib.sha256(b'x').hexdigest(),
+                                'tamanho': 1}},
+        }))
+
+    with pytest.raises(Exit):
+        tasks.descompactar(Context(), arquivo=str(zip_path), saida=str(tmp_path / 'saida'))
+    assert not (tmp_path / 'fora.txt').exists()
+    assert not os.path.exists('/tmp/fora_do_backup.txt')
+
+
+def _banco(caminho, ddl, linhas=()):
+    con = sqlite3.connect(caminho)
+    with con:
+        con.execute(ddl)
+        for linha in linhas:
+            con.execute(f'INSERT INTO t VALUES ({", ".join("?" * len(linha))})', linha)
+    con.close()
+
+
+def test_restauracao_de_tabela_pelo_nome_das_colunas(tmp_path):
+    # Backup de antes de uma migração que reordenou e acrescentou colunas
+    backup = str(tmp_path / 'backup.db')
+    banco = str(tmp_path / 'app.db')
+    _banco(backup, 'CREATE TABLE t (id INTEGER PRIMARY KEY, b TEXT, a TEXT, velha TEXT)',
+           [(1, 'b1', 'a1', 'x'), (2, 'b2', 'a2', 'y')])
+    _banco(banco, "CREATE TABLE t (id INTEGER PRIMARY KEY, a TEXT, b TEXT, c TEXT DEFAULT 'padrao')",
+           [(9, 'a9', 'b9', 'c9')])
+
+    assert tasks._restaurar_tabela(backup, 't', banco) == 2
+    con = sqlite3.connect(banco)
+    assert con.execute('SELECT id, a, b, c FROM t ORDER BY id').fetchall() == \
+        [(1, 'a1', 'b1', 'padrao'), (2, 'a2', 'b2', 'padrao')]
+    con.close()
+
+
+def test_restauracao_de_tabela_sem_valor_para_coluna_nova(tmp_path):
+    backup = str(tmp_path / 'backup.db')
+    banco = str(tmp_path / 'app.db')
+    _banco(backup, 'CREATE TABLE t (id INTEGER PRIMARY KEY, a TEXT)', [(1, 'a1')])
+    _banco(banco, 'CREATE TABLE t (id INTEGER PRIMARY KEY, a TEXT, c TEXT NOT NULL)', [(9, 'a9', 'c9')])
+
+    with pytest.raises(Exit):
+        tasks._restaurar_tabela(backup, 't', banco)
+    # Nada mudou
+    con = sqlite3.connect(banco)
+    assert con.execute('SELECT * FROM t').fetchall() == [(9, 'a9', 'c9')]
+    con.close()
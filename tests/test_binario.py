@@ -0,0 +1,162 @@
+# tests/test_binario.py
+import struct
+from datetime import datetime, timedelta
+
+import pytest
+import sqlalchemy as sa
+
+from app import binario, db
+from app.ingest import MAX_LEITURAS, LeituraInvalida
+from app.models import UVRegister
+
+T0 = datetime(2024, 5, 1, 12, 0, 0)
+
+decodificadores = [
+    pytest.param('numpy', marks=pytest.mark.skipif(binario.np is None, reason='NumPy ausente')),
+    'struct',
+]
+
+
+@pytest.fixture(params=decodificadores)
+def decodificador(request, monkeypatch):
+    # ler usa NumPy quando ele está instalado; sem ele, struct
+    if request.param == 'struct':
+        monkeypatch.setattr(binario, 'np', None)
+    return request.param
+
+
+def _lote(arduino_id=7, n=3, **kwargs):
+    return binario.codificar(arduino_id, [
+        (T0 + timedelta(seconds=i), 1, 1.5) for i in range(n)
+    ], **kwargs)
+
+
+def _bruto(n, varints, t0=T0):
+    # Cabeçalho e frequências válidos, com os varints dados
+    return (binario._CABECALHO.pack(b'UV', binario.VERSAO, 3, n, binario._ms(t0))
+            + bytes(2 * n) + b''.join(binario._varint(v) for v in varints))
+
+
+def _trocar(dados, offset, novo):
+    return dados[:offset] + novo + dados[offset + len(novo):]
+
+
+def test_varint_e_zigzag():
+    assert [binario._zigzag(v) for v in (0, -1, 1, -2, 2)] == [0, 1, 2, 3, 4]
+    assert binario._zigzag(2 ** 62) == 2 ** 63
+    assert binario._zigzag(-2 ** 62) == 2 ** 63 - 1
+    assert binario._varint(0) == b'\x00'
+    assert binario._varint(127) == b'\x7f'
+    assert binario._varint(128) == b'\x80\x01'
+    assert binario._varint(300) == b'\xac\x02'
+    assert len(binario._varint(2 ** 63 - 1)) == 9
+
+
+@pytest.mark.parametrize('leituras,casas', [
+    # Uma leitura só
+    ([(T0, 1, 0.0)], 3),
+    # Intervalos negativos, nulos e nas bordas dos varints de 1 e 2 bytes
+    ([(T0, 1, 1.0), (T0 - timedelta(milliseconds=64), 127, 2.0),
+      (T0 - timedelta(milliseconds=64), 128, 3.0),
+      (T0 + timedelta(milliseconds=8191), 16383, 4.0),
+      (T0 + timedelta(milliseconds=8192), 16384, 5.0)], 3),
+    # Do começo da época ao fim do datetime e de volta
+    ([(datetime(1970, 1, 1), 1, 0.0),
+      (datetime(9999, 12, 31, 23, 59, 59, 999000), 2 ** 62, 65.535),
+      (datetime(1970, 1, 1), 1, 0.001)], 3),
+    # Frequências no limite do uint16 com cada quantidade de casas
+    ([(T0, 5, 65535.0), (T0, 5, 0.0)], 0),
+    ([(T0, 5, 0.065535), (T0, 5, 0.000001)], 6),
+])
+def test_ida_e_volta(decodificador, leituras, casas):
+    lido = binario.ler(binario.codificar(2 ** 40, leituras, casas=casas), 2 ** 40)
+    assert [(l['register_date'], l['location_id']) for l in lido] == \
+        [(data, local) for data, local, _ in leituras]
+    assert [l['frequency'] for l in lido] == pytest.approx([f for _, _, f in leituras])
+    assert all(type(l['register_date']) is datetime and l['register_date'].tzinfo is None for l in lido)
+
+
+def test_lote_maximo(decodificador):
+    leituras = [(T0 + timedelta(seconds=i), i % 300 + 1, i / 100) for i in range(MAX_LEITURAS)]
+    lido = binario.ler(binario.codificar(1, leituras), 1)
+    assert len(lido) == MAX_LEITURAS
+    assert lido[-1]['register_date'] == leituras[-1][0]
+
+
+def test_decodificadores_iguais():
+    if binario.np is None:
+        pytest.skip('NumPy ausente')
+    dados = binario.codificar(3, [(T0 + timedelta(seconds=i * (-1) ** i * 37), i + 1, i * 0.25)
+                                  for i in range(50)])
+    n = 50
+    assert binario._ler_numpy(dados, n, 3, binario._ms(T0)) == \
+        binario._ler_struct(dados, n, 3, binario._ms(T0))
+
+
+@pytest.mark.parametrize('dados', [
+    pytest.param(b'', id='vazio'),
+    pytest.param(_lote()[:13], id='cabecalho-incompleto'),
+    pytest.param(_lote()[:-1], id='sem-o-ultimo-byte'),
+    pytest.param(_lote()[:20], id='sem-os-varints'),
+    pytest.param(_lote() + b'\x00', id='byte-sobrando'),
+    pytest.param(_trocar(_lote(), 0, b'XX'), id='magico'),
+    pytest.param(_trocar(_lote(), 2, b'\x02'), id='versao'),
+    pytest.param(_trocar(_lote(), 3, b'\x07'), id='casas'),
+    pytest.param(_trocar(_lote(), 4, struct.pack('<H', 0)), id='sem-leituras'),
+    pytest.param(_trocar(_lote(), 4, struct.pack('<H', MAX_LEITURAS + 1)), id='leituras-demais'),
+    pytest.param(_trocar(_lote(), 4, struct.pack('<H', 4)), id='leituras-a-mais'),
+    pytest.param(_trocar(_lote(), 6, struct.pack('<q', -1)), id='data-negativa'),
+    pytest.param(_trocar(_lote(), 6, struct.pack('<q', 2 ** 63 - 1)), id='data-enorme'),
+    # Último varint sem fim (bit de continuação no último byte)
+    pytest.param(_lote()[:-1] + b'\x81', id='varint-aberto'),
+    # Varint de 10 bytes no arduino_id
+    pytest.param(_bruto(1, []) + b'\xff' * 9 + b'\x01' + b'\x01', id='varint-longo'),
+    # Intervalos que passam do fim do datetime ou de antes da época
+    pytest.param(_bruto(2, [7, binario._zigzag(2 ** 62), 1, 1]), id='intervalo-enorme'),
+    pytest.param(_bruto(2, [7, binario._zigzag(-binario._ms(T0) - 1), 1, 1]), id='antes-da-epoca'),
+    pytest.param(_bruto(3, [7, binario._zigzag(binario._MAX_MS), binario._zigzag(binario._MAX_MS), 1, 1, 1],
+                        t0=datetime(1970, 1, 1)), id='soma-enorme'),
+    # location_id acima do limite
+    pytest.param(_bruto(1, [7, 2 ** 63 - 1]), id='local-enorme'),
+])
+def test_lote_invalido(decodificador, dados):
+    with pytest.raises(LeituraInvalida):
+        binario.ler(dados, 7)
+
+
+def test_lote_de_outro_arduino(decodificador):
+    with pytest.raises(LeituraInvalida, match='arduino 8'):
+        binario.ler(_lote(arduino_id=8), 7)
+
+
+def test_envio_binario(logado, dados):
+    lote = binario.codificar(dados['arduino_id'], [
+        (T0 + timedelta(seconds=i), dados['location_id'], 2.5 + i) for i in range(4)
+    ])
+    resposta = logado.post(f"/api/arduino/{dados['arduino_id']}/registros",
+                           data=lote, content_type=binario.TIPO)
+    assert resposta.status_code == 201
+    assert resposta.get_json() == {'inseridos': 4}
+    assert db.session.scalars(sa.select(UVRegister.frequency).order_by(UVRegister.id)).all() == \
+        [2.5, 3.5, 4.5, 5.5]
+
+
+@pytest.mark.parametrize('lote', [
+    b'',
+    b'UV\x01',
+    _lote()[:-2],
+    _lote(arduino_id=999),
+])
+def test_envio_binario_invalido(logado, dados, lote):
+    resposta = logado.post(f"/api/arduino/{dados['arduino_id']}/registros",
+                           data=lote, content_type=binario.TIPO)
+    assert resposta.status_code == 400
+    assert 'erro' in resposta.get_json()
+    assert db.session.scalar(sa.select(sa.func.count()).select_from(UVRegister)) == 0
+
+
+def test_envio_binario_local_inexistente(logado, dados):
+    lote = binario.codificar(dados['arduino_id'], [(T0, dados['location_id'] + 1, 1.0)])
+    resposta = logado.post(f"/api/arduino/{dados['arduino_id']}/registros",
+                           data=lote, content_type=binario.TIPO)
+    assert resposta.status_code == 400
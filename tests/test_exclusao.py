@@ -0,0 +1,102 @@
+# tests/test_exclusao.py
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import sqlalchemy as sa
+
+from app import analytics, db, exclusao, jobs
+from app.main import routes as main_routes
+from app.models import Arduino, Job, UVRegister
+
+
+def _registros(dados, arduino_id, n, inicio=1.0):
+    agora = datetime.now(timezone.utc)
+    db.session.execute(sa.insert(UVRegister), [
+        {'arduino_id': arduino_id, 'org_id': dados['org_id'],
+         'location_id': dados['location_id'], 'register_date': agora - timedelta(minutes=i),
+         'frequency': inicio + i}
+        for i in range(n)
+    ])
+    db.session.commit()
+
+
+@pytest.fixture(autouse=True)
+def sem_csrf(monkeypatch):
+    # excluir_arduino valida o token mesmo com WTF_CSRF_ENABLED desligado
+    monkeypatch.setattr(main_routes, 'validate_csrf', lambda token: None)
+
+
+def _outro_arduino(dados):
+    arduino = Arduino(user_id=dados['user_id'], org_id=dados['org_id'],
+                      register_day=datetime.now(timezone.utc))
+    db.session.add(arduino)
+    db.session.commit()
+    return arduino.id
+
+
+def test_exclusao_pela_fila(app, logado, dados):
+    app.config['DELETE_BATCH_SIZE'] = 3
+    app.config['DELETE_BATCH_PAUSE'] = 0
+    _registros(dados, dados['arduino_id'], 10)
+
+    resposta = logado.post(f"/excluir_arduino/{dados['arduino_id']}")
+    assert resposta.status_code == 302
+    job = db.session.scalar(sa.select(Job))
+    assert (job.kind, job.params, job.org_id) == (
+        'excluir-arduino', {'arduino_id': dados['arduino_id'], 'org_id': dados['org_id']}, dados['org_id'])
+    assert logado.get(f"/api/arduino/{dados['arduino_id']}/exclusao").get_json()['concluida'] is False
+
+    jobs.Worker(app, paralelo=1).rodar(ate_esvaziar=True)
+    db.session.expire_all()
+    assert db.session.get(Arduino, dados['arduino_id']) is None
+    assert db.session.scalar(sa.select(sa.func.count()).select_from(UVRegister)) == 0
+
+    progresso = logado.get(f"/api/arduino/{dados['arduino_id']}/exclusao").get_json()
+    assert progresso['concluida'] is True
+    assert (progresso['apagados'], progresso['total'], progresso['erro']) == (10, 10, None)
+
+
+def test_exclusao_de_outro_usuario(logado, dados):
+    assert logado.get('/api/arduino/999/exclusao').status_code == 404
+
+
+@pytest.mark.skipif(not analytics.disponivel(), reason='NumPy ausente')
+def test_snapshot_sem_registros_apagados(app, logado, dados):
+    app.config['DELETE_BATCH_PAUSE'] = 0
+    restante = _outro_arduino(dados)
+    _registros(dados, dados['arduino_id'], 5, inicio=100.0)
+    _registros(dados, restante, 4)
+
+    snapshot = analytics.get_snapshot(app.config['ANALYTICS_DIR'], dados['org_id'])
+    snapshot.refresh(db.session)
+    assert analytics.resumo(snapshot.colunas())['count'] == 9
+
+    logado.post(f"/excluir_arduino/{dados['arduino_id']}")
+    jobs.Worker(app, paralelo=1).rodar(ate_esvaziar=True)
+
+    # Os registros que restam têm ids maiores que os apagados: sem descartar
+    # o snapshot, a cópia incremental não perceberia a exclusão
+    snapshot.refresh(db.session)
+    resumo = analytics.resumo(snapshot.colunas())
+    media = db.session.scalar(sa.select(sa.func.avg(UVRegister.frequency)))
+    assert resumo['count'] == 4
+    assert resumo['average'] == pytest.approx(media)
+
+
+def test_snapshot_descartado_depois_do_commit(app, dados, monkeypatch):
+    _registros(dados, dados['arduino_id'], 3)
+    chamadas = []
+
+    def invalidar(pasta, org_id):
+        # Os blocos arquivados do arduino já saíram com ele
+        existe = db.session.scalar(sa.select(Arduino.id).where(Arduino.id == dados['arduino_id']))
+        chamadas.append((org_id, existe))
+
+    monkeypatch.setattr(analytics, 'invalidar', invalidar)
+    exclusao.apagar(db.session, dados['arduino_id'], 2)
+    assert chamadas == [(dados['org_id'], None)]
+
+    # Nova tentativa depois do commit final: o arduino não existe mais
+    chamadas.clear()
+    exclusao.apagar(db.session, dados['arduino_id'], 2, org_id=dados['org_id'])
+    assert chamadas == [(dados['org_id'], None)]
@@ -0,0 +1,54 @@
+# tests/test_ingest.py
+from datetime import datetime, timezone
+
+import pytest
+import sqlalchemy as sa
+
+from app import db, ingest
+from app.models import UVRegister
+
+
+def _registro(dados, **campos):
+    registro = {'register_date': '2026-01-01T12:00:00+00:00',
+                'location_id': dados['location_id'], 'frequency': 2.0}
+    registro.update(campos)
+    return registro
+
+
+def test_data_em_segundos_e_iso():
+    leituras = ingest.ler_leituras([
+        {'register_date': 1767268800, 'location_id': 1, 'frequency': 1},
+        {'register_date': '2026-01-01T09:00:00-03:00', 'location_id': 1, 'frequency': 1},
+    ])
+    esperado = datetime(2026, 1, 1, 12, tzinfo=timezone.utc)
+    assert [leitura['register_date'] for leitura in leituras] == [esperado, esperado]
+
+
+@pytest.mark.parametrize('frequencia', [float('nan'), float('inf'), float('-inf'), 'NaN', 'inf'])
+def test_frequencia_nao_finita(frequencia):
+    with pytest.raises(ingest.LeituraInvalida):
+        ingest.ler_leituras([{'register_date': 0, 'location_id': 1, 'frequency': frequencia}])
+
+
+@pytest.mark.parametrize('data', [1e20, -1e20, float('nan'), 10 ** 30])
+def test_data_fora_do_intervalo(data):
+    with pytest.raises(ingest.LeituraInvalida):
+        ingest.ler_leituras([{'register_date': data, 'location_id': 1, 'frequency': 1.0}])
+
+
+@pytest.mark.parametrize('corpo', [
+    '{"registros": [{"register_date": "2026-01-01T12:00:00", "location_id": %d, "frequency": NaN}]}',
+    '{"registros": [{"register_date": "2026-01-01T12:00:00", "location_id": %d, "frequency": Infinity}]}',
+    '{"registros": [{"register_date": 1e20, "location_id": %d, "frequency": 1.0}]}',
+])
+def test_envio_com_valores_invalidos(logado, dados, corpo):
+    resposta = logado.post(f"/api/arduino/{dados['arduino_id']}/registros",
+                           data=corpo % dados['location_id'], content_type='application/json')
+    assert resposta.status_code == 400
+    assert 'erro' in resposta.json
+    assert db.session.scalar(sa.select(sa.func.count()).select_from(UVRegister)) == 0
+
+    # O arduino continua recebendo normalmente
+    resposta = logado.post(f"/api/arduino/{dados['arduino_id']}/registros",
+                           json={'registros': [_registro(dados)]})
+    assert resposta.status_code == 201
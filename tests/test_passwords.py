@@ -0,0 +1,45 @@
+# tests/test_passwords.py
+import pytest
+
+from app import create_app, db, passwords
+from app.models import User
+
+
+@pytest.mark.parametrize('metodo', ['pbkdf2:sha256', 'pbkdf2', 'pbkdf2:sha256:1000'])
+def test_metodo_sem_parametros_nao_refaz(app, metodo):
+    app.config['PASSWORD_HASH_METHOD'] = metodo
+    usuario = User(username='u', email='u@example.com')
+    usuario.set_password('segredo')
+    assert not usuario.needs_rehash()
+
+    app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:2000'
+    assert usuario.needs_rehash()
+
+
+def test_login_refaz_so_quando_muda(app, client, dados):
+    # "scrypt" sem parâmetros: o hash gravado é scrypt:32768:8:1
+    app.config['PASSWORD_HASH_METHOD'] = 'scrypt'
+    usuario = db.session.get(User, dados['user_id'])
+    usuario.set_password('p')
+    db.session.commit()
+    original = usuario.password_hash
+
+    assert client.post('/login', data={'username': 't', 'password': 'p'}).status_code == 302
+    db.session.expire_all()
+    assert db.session.get(User, dados['user_id']).password_hash == original
+    client.get('/logout')
+
+    app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1500'
+    assert client.post('/login', data={'username': 't', 'password': 'p'}).status_code == 302
+    db.session.expire_all()
+    assert db.session.get(User, dados['user_id']).password_hash.startswith('pbkdf2:sha256:1500$')
+
+
+def test_pool_por_aplicacao(app, config):
+    with app.app_context():
+        pool = passwords._executor()
+    outra = create_app(type('Outra', (config,), {'PASSWORD_HASH_WORKERS': 1}))
+    with outra.app_context():
+        assert passwords._executor() is not pool
+        assert passwords._executor()._max_workers == 1
+    assert app.extensions['passwords'] is pool
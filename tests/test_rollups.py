@@ -0,0 +1,74 @@
+# tests/test_rollups.py
+from datetime import datetime, timedelta, timezone
+
+import sqlalchemy as sa
+
+from app import db, jobs, rollups
+from app.models import Job, UVRegister, UVRollup
+
+
+def _contar(modelo):
+    return db.session.scalar(sa.select(sa.func.count()).select_from(modelo))
+
+
+def _carga(dados, n=5):
+    # Registros gravados por fora do ingest, como numa carga em lote
+    agora = datetime.now(timezone.utc)
+    db.session.execute(sa.insert(UVRegister), [
+        {'arduino_id': dados['arduino_id'], 'org_id': dados['org_id'],
+         'location_id': dados['location_id'], 'register_date': agora - timedelta(hours=i),
+         'frequency': 1.0 + i}
+        for i in range(n)
+    ])
+    db.session.commit()
+
+
+def test_ingest_atualiza_rollups(logado, dados):
+    agora = datetime.now(timezone.utc)
+    resposta = logado.post(f"/api/arduino/{dados['arduino_id']}/registros", json=[
+        {'register_date': agora.isoformat(), 'location_id': dados['location_id'], 'frequency': 2.0},
+    ])
+    assert resposta.status_code == 201
+    assert db.session.scalar(sa.select(sa.func.sum(UVRollup.count))) == 1
+
+
+def test_estatistica_nao_grava(logado, dados):
+    _carga(dados)
+    assert logado.get('/estatistica').status_code == 200
+    db.session.rollback()
+    assert _contar(UVRollup) == 0
+
+
+def test_tarefa_periodica(app, dados):
+    _carga(dados)
+    assert jobs.enfileirar_periodica(db.session, 'atualizar-rollups') is not None
+    # Já há uma pendente
+    assert jobs.enfileirar_periodica(db.session, 'atualizar-rollups') is None
+
+    jobs.Worker(app, paralelo=1).rodar(ate_esvaziar=True)
+    assert db.session.scalar(sa.select(sa.func.sum(UVRollup.count))) == 5
+    assert db.session.scalars(
+        sa.select(Job.state).where(Job.kind == 'atualizar-rollups')
+    ).all() == [jobs.CONCLUIDO]
+
+
+def test_resumos_limitados_ao_periodo(logado, dados):
+    agora = datetime.now(timezone.utc)
+    db.session.execute(sa.insert(UVRegister), [
+        {'arduino_id': dados['arduino_id'], 'org_id': dados['org_id'],
+         'location_id': dados['location_id'], 'register_date': agora - timedelta(days=dias),
+         'frequency': 2.0}
+        for dias in (0, 1, 200)
+    ])
+    db.session.commit()
+    rollups.atualizar(db.session)
+
+    da_org = UVRollup.org_id == dados['org_id']
+    assert rollups.resumo_geral(db.session, da_org)['count'] == 3
+    assert rollups.resumo_geral(db.session, da_org, rollups.desde(90))['count'] == 2
+    por_local = rollups.resumo_por(db.session, UVRollup.location_id, da_org, rollups.desde(90))
+    assert {local: resumo['count'] for local, resumo in por_local.items()} == {dados['location_id']: 2}
+
+    resposta = logado.get('/estatistica')
+    assert resposta.status_code == 200
+    assert 'últimos 90 dias' in resposta.get_data(as_text=True)